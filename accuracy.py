@@ -0,0 +1,310 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import unicodedata
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import N_SAMPLES
+
+from converter import WhisperConverter
+from features import FeatureStage
+from whisper_hooks import precomputed_mel
+from repetition import repetition_guard
+from encoder_reuse import reuse_encoder_features
+from hardware import get_hardware_profile, configure_torch_threads
+
+# 기본 고정 음성/정답 위치 (manifest.json + 음성/정답 파일)
+DEFAULT_FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "accuracy")
+# 기준 설정 대비 허용하는 CER 증가량 (절대값, 0.02 = 2%p)
+DEFAULT_MAX_CER_LOSS = 0.02
+# 정확도 예산 초과 / 고정 데이터 오류 시 종료 코드
+EXIT_BUDGET_EXCEEDED = 1
+EXIT_FIXTURE_ERROR = 2
+
+# 미리 내려받은 Whisper 모델 위치 (whisper.load_model 기본 위치)
+DEFAULT_MODEL_DIR = os.path.join(os.path.expanduser("~"), ".cache", "whisper")
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s]")
+
+
+def normalize_text(text):
+    """채점용 정규화 (NFKC, 소문자, 문장부호 제거, 공백 정리)"""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def edit_distance(reference, hypothesis):
+    """두 토큰 목록의 레벤슈타인 거리 (행 단위 numpy 벡터화)
+
+    한 행 안에서 치환/삭제는 이전 행으로 바로 계산하고, 같은 행 안의 삽입 연쇄는
+    cur[j] - j의 누적 최소값으로 한 번에 구하므로 파이썬 루프는 참조 길이만큼만 돕니다.
+    """
+    if not reference:
+        return len(hypothesis)
+    if not hypothesis:
+        return len(reference)
+
+    vocabulary = {}
+    ref = np.array([vocabulary.setdefault(token, len(vocabulary)) for token in reference], dtype=np.int64)
+    hyp = np.array([vocabulary.setdefault(token, len(vocabulary)) for token in hypothesis], dtype=np.int64)
+    offsets = np.arange(len(hyp) + 1, dtype=np.int64)
+    previous = offsets.copy()
+    current = np.empty_like(previous)
+    for i, token in enumerate(ref, start=1):
+        current[0] = i
+        np.minimum(previous[:-1] + (hyp != token), previous[1:] + 1, out=current[1:])
+        # 삽입: current[j] = min(current[j], current[j-1] + 1)
+        current = np.minimum.accumulate(current - offsets) + offsets
+        previous, current = current, previous
+    return int(previous[-1])
+
+
+def error_rate(errors, length):
+    """편집 수 / 정답 길이 (정답이 비어 있으면 (무음 등) 출력된 토큰을 모두 오류로 셈)"""
+    return errors / max(length, 1)
+
+
+def error_counts(reference, hypothesis):
+    """(글자 편집 수, 글자 수, 단어 편집 수, 단어 수) - CER은 공백을 뺀 글자 기준"""
+    reference = normalize_text(reference)
+    hypothesis = normalize_text(hypothesis)
+    ref_chars = list(reference.replace(" ", ""))
+    hyp_chars = list(hypothesis.replace(" ", ""))
+    ref_words = reference.split()
+    hyp_words = hypothesis.split()
+    return (edit_distance(ref_chars, hyp_chars), len(ref_chars),
+            edit_distance(ref_words, hyp_words), len(ref_words))
+
+
+class AccuracyConfig:
+    """평가할 설정 하나 (모델 크기 + 속도 최적화 + 정밀도)
+
+    "모델[:fast|accurate][:fp16|fp32]" 형식 문자열로 만들 수 있습니다. 정밀도를 생략하면
+    변환기와 같은 규칙(하드웨어 프로필)을 따릅니다.
+    """
+
+    def __init__(self, model_size, optimize_speed=True, fp16=None):
+        self.model_size = model_size
+        self.optimize_speed = optimize_speed
+        self.fp16 = fp16
+
+    @classmethod
+    def parse(cls, spec):
+        parts = spec.split(":")
+        config = cls(parts[0])
+        for part in parts[1:]:
+            if part in ("fast", "accurate"):
+                config.optimize_speed = part == "fast"
+            elif part in ("fp16", "fp32"):
+                config.fp16 = part == "fp16"
+            else:
+                raise ValueError(f"알 수 없는 설정 항목: {part} ({spec})")
+        return config
+
+    @property
+    def label(self):
+        label = f"{self.model_size}:{'fast' if self.optimize_speed else 'accurate'}"
+        if self.fp16 is not None:
+            label += ":fp16" if self.fp16 else ":fp32"
+        return label
+
+
+def load_fixtures(fixtures_dir):
+    """manifest.json 읽기: [{"id", "audio", "reference"}] (경로는 고정 데이터 폴더 기준)
+
+    빠진 파일이 있거나 정답 글자 수의 합이 0이면 (CER 예산을 넘을 수 없는 검사) ValueError를 발생시킵니다.
+    네트워크에서 받지 않습니다.
+    """
+    manifest_path = os.path.join(fixtures_dir, "manifest.json")
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    fixtures = []
+    missing = []
+    for entry in entries:
+        audio = os.path.join(fixtures_dir, entry["audio"])
+        reference = os.path.join(fixtures_dir, entry["reference"])
+        for path in (audio, reference):
+            if not os.path.exists(path):
+                missing.append(path)
+        fixtures.append({"id": entry.get("id", os.path.splitext(entry["audio"])[0]),
+                         "audio": audio, "reference": reference})
+    if missing:
+        raise ValueError("고정 데이터 파일이 없습니다: " + ", ".join(missing))
+    if not fixtures:
+        raise ValueError(f"{manifest_path}에 평가할 항목이 없습니다.")
+    for fixture in fixtures:
+        with open(fixture["reference"], "r", encoding="utf-8") as f:
+            fixture["reference_text"] = f.read()
+    if not any(normalize_text(fixture["reference_text"]) for fixture in fixtures):
+        raise ValueError(f"{manifest_path}의 정답이 모두 비어 있어 정확도를 잴 수 없습니다. "
+                         "정답이 있는 녹음 파일을 추가하세요.")
+    return fixtures
+
+
+def _local_model_path(model_size, model_dir):
+    """오프라인 실행용: 내려받아 둔 모델 체크포인트 경로 (없으면 ValueError)"""
+    url = whisper._MODELS.get(model_size)
+    if url is None:
+        raise ValueError(f"알 수 없는 모델: {model_size}")
+    path = os.path.join(model_dir, os.path.basename(url))
+    if not os.path.exists(path):
+        raise ValueError(f"{model_size} 모델 파일이 없습니다: {path} (오프라인 평가는 미리 내려받은 모델만 사용)")
+    return path
+
+
+class AccuracyHarness:
+    """고정 음성/정답 세트로 설정별 CER/WER와 실시간 배율(RTF)을 측정하는 클래스
+
+    변환기와 같은 옵션(build_transcribe_options, 반복 루프 차단)으로 변환하므로
+    속도 옵션이 정확도에 주는 영향을 그대로 잴 수 있습니다.
+    """
+
+    def __init__(self, fixtures, model_dir=None, device=None, feature_stage=None, progress_callback=print):
+        self.fixtures = fixtures
+        self.model_dir = model_dir or DEFAULT_MODEL_DIR
+        self.device = device or get_hardware_profile().device
+        self.feature_stage = feature_stage or FeatureStage()
+        self.progress_callback = progress_callback or (lambda message: None)
+
+    def _evaluate_config(self, model, config):
+        options = WhisperConverter.build_transcribe_options(self.device, config.optimize_speed)
+        options["verbose"] = None
+        if config.fp16 is not None:
+            options["fp16"] = config.fp16 and self.device == "cuda"
+
+        totals = {"char_errors": 0, "chars": 0, "word_errors": 0, "words": 0,
+                  "audio_seconds": 0.0, "transcribe_seconds": 0.0}
+        files = []
+        for fixture in self.fixtures:
+            mel = self.feature_stage.get_mel_tensor(fixture["audio"], model.dims.n_mels)
+            duration = FeatureStage.mel_duration(mel)
+            start = time.time()
+            with precomputed_mel(mel, N_SAMPLES), repetition_guard(), reuse_encoder_features():
+                result = model.transcribe(fixture["audio"], **options)
+            elapsed = time.time() - start
+
+            char_errors, chars, word_errors, words = error_counts(fixture["reference_text"], result["text"])
+            files.append({
+                "id": fixture["id"],
+                "cer": error_rate(char_errors, chars),
+                "wer": error_rate(word_errors, words),
+                "real_time_factor": elapsed / duration if duration else None,
+                "hypothesis": result["text"].strip(),
+            })
+            for key, value in (("char_errors", char_errors), ("chars", chars), ("word_errors", word_errors),
+                               ("words", words), ("audio_seconds", duration), ("transcribe_seconds", elapsed)):
+                totals[key] += value
+
+        return {
+            "label": config.label,
+            "model_size": config.model_size,
+            "optimize_speed": config.optimize_speed,
+            "fp16": options["fp16"],
+            # 파일 평균이 아닌 전체 편집 수 / 전체 길이 (긴 파일이 더 큰 비중)
+            "cer": error_rate(totals["char_errors"], totals["chars"]),
+            "wer": error_rate(totals["word_errors"], totals["words"]),
+            "real_time_factor": (totals["transcribe_seconds"] / totals["audio_seconds"]
+                                 if totals["audio_seconds"] else None),
+            "audio_seconds": totals["audio_seconds"],
+            "files": files,
+        }
+
+    def run(self, configs):
+        """모든 설정을 평가해 결과 목록 반환 (같은 모델 크기는 모델을 한 번만 로드)"""
+        if self.device == "cpu":
+            configure_torch_threads()
+        results = {}
+        for model_size in dict.fromkeys(config.model_size for config in configs):
+            self.progress_callback(f"📥 {model_size} 모델 로드 중...")
+            model = whisper.load_model(_local_model_path(model_size, self.model_dir), device=self.device)
+            for config in configs:
+                if config.model_size == model_size:
+                    self.progress_callback(f"🔄 {config.label} 평가 중... ({len(self.fixtures)}개 파일)")
+                    results[config.label] = self._evaluate_config(model, config)
+            del model
+            if self.device == "cuda":
+                torch.cuda.empty_cache()
+        return [results[config.label] for config in configs]
+
+
+def check_budget(results, baseline_label, max_cer_loss):
+    """기준 설정보다 CER이 max_cer_loss를 넘게 나빠진 설정 목록 반환"""
+    baseline = next(result for result in results if result["label"] == baseline_label)
+    violations = []
+    for result in results:
+        loss = result["cer"] - baseline["cer"]
+        result["cer_loss"] = loss
+        if result is not baseline and loss > max_cer_loss:
+            violations.append(result)
+    return violations
+
+
+def format_table(results, baseline_label, max_cer_loss):
+    """정확도 대 실시간 배율 마크다운 표"""
+    lines = [
+        f"기준: {baseline_label}, 허용 CER 증가: {max_cer_loss * 100:.1f}%p",
+        "",
+        "| 설정 | CER | WER | CER 증가 | RTF | 판정 |",
+        "|------|-----|-----|----------|-----|------|",
+    ]
+    for result in results:
+        rtf = f"{result['real_time_factor']:.3f}" if result["real_time_factor"] is not None else "-"
+        if result["label"] == baseline_label:
+            verdict = "기준"
+        else:
+            verdict = "❌ 초과" if result["cer_loss"] > max_cer_loss else "✅"
+        lines.append(
+            f"| {result['label']} | {result['cer'] * 100:.2f}% | {result['wer'] * 100:.2f}% "
+            f"| {result['cer_loss'] * 100:+.2f}%p | {rtf} | {verdict} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="고정 음성/정답 세트로 속도 옵션의 정확도 손실 검증")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES_DIR, help="manifest.json이 있는 고정 데이터 폴더")
+    parser.add_argument("--configs", nargs="+", default=["small:accurate", "small:fast", "base:fast"],
+                        help="평가할 설정 (모델[:fast|accurate][:fp16|fp32])")
+    parser.add_argument("--baseline", help="기준 설정 (기본: 첫 번째 설정)")
+    parser.add_argument("--max-cer-loss", type=float, default=DEFAULT_MAX_CER_LOSS,
+                        help="기준 대비 허용 CER 증가량 (0.02 = 2%%p)")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL_DIR, help="내려받아 둔 Whisper 모델 폴더")
+    parser.add_argument("--json", dest="json_path", help="JSON 결과 저장 경로")
+    args = parser.parse_args()
+
+    try:
+        configs = [AccuracyConfig.parse(spec) for spec in args.configs]
+        baseline_label = AccuracyConfig.parse(args.baseline).label if args.baseline else configs[0].label
+        if baseline_label not in [config.label for config in configs]:
+            configs.insert(0, AccuracyConfig.parse(args.baseline))
+        fixtures = load_fixtures(args.fixtures)
+        for config in configs:
+            _local_model_path(config.model_size, args.model_dir)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(EXIT_FIXTURE_ERROR)
+
+    harness = AccuracyHarness(fixtures, model_dir=args.model_dir)
+    results = harness.run(configs)
+    violations = check_budget(results, baseline_label, args.max_cer_loss)
+    print(format_table(results, baseline_label, args.max_cer_loss))
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"baseline": baseline_label, "max_cer_loss": args.max_cer_loss,
+                       "device": harness.device, "results": results}, f, ensure_ascii=False, indent=2)
+
+    if violations:
+        print("❌ 정확도 손실 예산 초과: " + ", ".join(result["label"] for result in violations), file=sys.stderr)
+        sys.exit(EXIT_BUDGET_EXCEEDED)
+
+
+if __name__ == "__main__":
+    main()
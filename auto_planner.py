@@ -0,0 +1,151 @@
+import os
+import socket
+import threading
+
+from cache_utils import get_cache_dir, atomic_write_json, read_json
+
+AUTO_MODEL = "auto"
+
+# 정확도가 높은 순서의 후보 설정 (모델 크기, 속도 최적화 여부)
+CANDIDATES = [
+    ("large", False), ("large", True),
+    ("medium", False), ("medium", True),
+    ("small", False), ("small", True),
+    ("base", False), ("base", True),
+]
+
+# 측정값이 없을 때 사용하는 기본 실시간 배율 (변환 시간 / 음성 길이, 속도 최적화 기준)
+DEFAULT_RTF = {
+    "cuda": {"base": 0.03, "small": 0.06, "medium": 0.12, "large": 0.2},
+    "cpu": {"base": 0.15, "small": 0.4, "medium": 1.2, "large": 2.5},
+}
+# 정확도 우선(빔 검색) 옵션의 기본 비용 배수
+ACCURATE_COST_FACTOR = 2.0
+# 측정값이 없을 때 사용하는 기본 모델 로드 시간 (초)
+DEFAULT_LOAD_TIME = {"base": 2.0, "small": 5.0, "medium": 12.0, "large": 25.0}
+
+# 새 측정값 반영 비율 (지수 이동 평균)
+PROFILE_SMOOTHING = 0.3
+# 계획 시 예상 시간에 곱하는 안전 계수
+SAFETY_MARGIN = 1.15
+
+
+def _profile_key(device, model_size, optimize_speed):
+    return f"{device}|{model_size}|{'fast' if optimize_speed else 'accurate'}"
+
+
+class PerformanceProfile:
+    """호스트별로 측정한 실시간 배율(RTF)과 모델 로드 시간 저장소"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(get_cache_dir("profiles"), f"{socket.gethostname()}.json")
+        self._lock = threading.Lock()
+        data = read_json(self.path, {}) or {}
+        self.rtf = data.get("rtf", {})
+        self.load_time = data.get("load_time", {})
+
+    def get_rtf(self, device, model_size, optimize_speed):
+        """실시간 배율 반환 (측정값이 없으면 기본값)"""
+        entry = self.rtf.get(_profile_key(device, model_size, optimize_speed))
+        if entry:
+            return entry["rtf"]
+        rtf = DEFAULT_RTF.get(device, DEFAULT_RTF["cpu"])[model_size]
+        return rtf if optimize_speed else rtf * ACCURATE_COST_FACTOR
+
+    def get_load_time(self, device, model_size):
+        """모델 로드 시간 반환 (측정값이 없으면 기본값)"""
+        entry = self.load_time.get(f"{device}|{model_size}")
+        return entry["seconds"] if entry else DEFAULT_LOAD_TIME[model_size]
+
+    def is_measured(self, device, model_size, optimize_speed):
+        """실측값이 있는지 여부"""
+        return _profile_key(device, model_size, optimize_speed) in self.rtf
+
+    def record(self, device, model_size, optimize_speed, audio_seconds, transcribe_seconds):
+        """변환 한 건의 측정값 반영"""
+        if audio_seconds <= 0 or transcribe_seconds <= 0:
+            return
+        key = _profile_key(device, model_size, optimize_speed)
+        measured = transcribe_seconds / audio_seconds
+        with self._lock:
+            entry = self.rtf.get(key)
+            if entry:
+                entry["rtf"] = entry["rtf"] * (1 - PROFILE_SMOOTHING) + measured * PROFILE_SMOOTHING
+                entry["samples"] += 1
+            else:
+                self.rtf[key] = {"rtf": measured, "samples": 1}
+            self._save()
+
+    def record_load_time(self, device, model_size, seconds):
+        """모델 로드 시간 측정값 반영"""
+        key = f"{device}|{model_size}"
+        with self._lock:
+            entry = self.load_time.get(key)
+            if entry:
+                entry["seconds"] = entry["seconds"] * (1 - PROFILE_SMOOTHING) + seconds * PROFILE_SMOOTHING
+            else:
+                self.load_time[key] = {"seconds": seconds}
+            self._save()
+
+    def _save(self):
+        atomic_write_json(self.path, {"rtf": self.rtf, "load_time": self.load_time})
+
+
+class Plan:
+    """자동 선택 결과"""
+
+    def __init__(self, model_size, optimize_speed, estimated_seconds, meets_deadline):
+        self.model_size = model_size
+        self.optimize_speed = optimize_speed
+        self.estimated_seconds = estimated_seconds
+        self.meets_deadline = meets_deadline
+
+    def describe(self):
+        option = "속도 최적화" if self.optimize_speed else "정확도 우선"
+        return f"{self.model_size} + {option} (예상 {self.estimated_seconds:.0f}초)"
+
+    def __repr__(self):
+        return f"Plan({self.model_size!r}, optimize_speed={self.optimize_speed}, est={self.estimated_seconds:.1f})"
+
+
+class AutoPlanner:
+    """목표 완료 시간 안에 끝나는 가장 정확한 모델/옵션 조합을 고르는 플래너"""
+
+    def __init__(self, profile=None, device="cpu"):
+        self.profile = profile or PerformanceProfile()
+        self.device = device
+        self.slowdown = 1.0  # 실행 중 관측한 속도 / 프로필 속도 비율
+
+    def estimate(self, model_size, optimize_speed, audio_seconds, loaded_model=None):
+        """예상 소요 시간 (모델 로드 포함, 이미 로드된 모델이면 제외)"""
+        load = 0.0 if loaded_model == model_size else self.profile.get_load_time(self.device, model_size)
+        rtf = self.profile.get_rtf(self.device, model_size, optimize_speed) * self.slowdown
+        return load + audio_seconds * rtf
+
+    def plan(self, audio_seconds, deadline_seconds, loaded_model=None):
+        """남은 음성 길이와 남은 시간으로 설정 선택"""
+        fastest = None
+        for model_size, optimize_speed in CANDIDATES:
+            estimated = self.estimate(model_size, optimize_speed, audio_seconds, loaded_model)
+            if estimated * SAFETY_MARGIN <= deadline_seconds:
+                return Plan(model_size, optimize_speed, estimated, True)
+            if fastest is None or estimated < fastest.estimated_seconds:
+                fastest = Plan(model_size, optimize_speed, estimated, False)
+        # 어떤 조합도 맞출 수 없으면 가장 빠른 조합
+        return fastest
+
+    def replan(self, current, processed_audio, processed_seconds, remaining_audio, remaining_seconds):
+        """실행 중 관측한 처리 속도로 남은 구간의 설정을 다시 선택
+
+        관측 속도가 프로필보다 느리면 모든 후보의 예상 시간을 같은 비율로 보정합니다.
+        현재 설정으로 남은 시간 안에 끝낼 수 있으면 그대로 유지합니다.
+        """
+        if processed_audio > 0 and processed_seconds > 0:
+            expected_rtf = self.profile.get_rtf(self.device, current.model_size, current.optimize_speed)
+            observed_rtf = processed_seconds / processed_audio
+            self.slowdown = max(observed_rtf / expected_rtf, 0.25)
+
+        estimated = self.estimate(current.model_size, current.optimize_speed, remaining_audio, current.model_size)
+        if estimated * SAFETY_MARGIN <= remaining_seconds:
+            return Plan(current.model_size, current.optimize_speed, estimated, True)
+        return self.plan(remaining_audio, remaining_seconds, loaded_model=current.model_size)
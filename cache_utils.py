@@ -0,0 +1,67 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+# 캐시 루트 디렉터리 (환경 변수로 변경 가능)
+CACHE_ENV_VAR = "WHISPER_STT_CACHE_DIR"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "korean-stt")
+
+# 파일 해시 계산 시 읽는 블록 크기
+HASH_BLOCK_SIZE = 1024 * 1024
+# 프로세스 내에 기억해 두는 파일 해시 수 (오래 도는 감시 폴더/작업자에서 무한히 늘지 않도록 LRU로 제한)
+HASH_MEMO_SIZE = 4096
+
+_hash_memo = OrderedDict()  # (경로, 크기, 수정시각) → 해시
+_hash_lock = threading.Lock()
+
+
+def get_cache_dir(*parts):
+    """캐시 디렉터리 경로 반환 (없으면 생성)"""
+    root = os.environ.get(CACHE_ENV_VAR) or DEFAULT_CACHE_DIR
+    path = os.path.join(root, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def file_content_hash(path):
+    """파일 내용 해시 반환 (경로/크기/수정시각이 같으면 프로세스 내에서 재사용)"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _hash_lock:
+        cached = _hash_memo.get(memo_key)
+        if cached is not None:
+            _hash_memo.move_to_end(memo_key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    content_hash = digest.hexdigest()
+
+    with _hash_lock:
+        _hash_memo[memo_key] = content_hash
+        _hash_memo.move_to_end(memo_key)
+        while len(_hash_memo) > HASH_MEMO_SIZE:
+            _hash_memo.popitem(last=False)
+    return content_hash
+
+
+def atomic_write_json(path, data):
+    """JSON 파일을 원자적으로 저장 (임시 파일 작성 후 교체)"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def read_json(path, default=None):
+    """JSON 파일 읽기 (없거나 손상된 경우 기본값 반환)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
@@ -0,0 +1,97 @@
+from whisper.audio import N_SAMPLES
+
+from whisper_hooks import precomputed_mel
+
+# 구간 단위 변환 시 기본 구간 길이 (Whisper 한 창 = 30초)
+DEFAULT_CHUNK_SECONDS = 30.0
+# 구간 경계에 걸친 말이 잘리지 않도록 앞뒤로 더 디코딩하는 길이 (초)
+CHUNK_OVERLAP_SECONDS = 2.0
+
+
+class Chunk:
+    """파일 내 시간 구간 하나
+
+    [start, end)는 이 구간이 책임지는 범위이고, [decode_start, decode_end)는 경계의 말이
+    잘리지 않도록 앞뒤로 겹쳐 실제로 디코딩하는 범위입니다. 겹친 부분에서 두 구간이 같은 말을
+    내면 세그먼트 중간 시각이 속한 구간의 것만 남깁니다 (owns()).
+    """
+
+    def __init__(self, index, start, end, decode_start=None, decode_end=None):
+        self.index = index
+        self.start = start
+        self.end = end
+        self.decode_start = start if decode_start is None else decode_start
+        self.decode_end = end if decode_end is None else decode_end
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def decode_duration(self):
+        return self.decode_end - self.decode_start
+
+    def owns(self, segment):
+        """세그먼트가 이 구간 몫인지 (중간 시각 기준, 뒤에 겹치는 구간이 없으면 끝 이후도 포함)"""
+        middle = (segment["start"] + segment["end"]) / 2
+        return self.start <= middle and (middle < self.end or self.decode_end <= self.end)
+
+    def __repr__(self):
+        return f"Chunk({self.index}, {self.start:.1f}-{self.end:.1f})"
+
+
+def plan_chunks(duration, chunk_seconds=DEFAULT_CHUNK_SECONDS, overlap=CHUNK_OVERLAP_SECONDS):
+    """음성 길이를 일정한 구간으로 나눔 (디코딩 범위는 앞뒤로 overlap초씩 겹침)"""
+    chunks = []
+    start = 0.0
+    while start < duration:
+        end = min(start + chunk_seconds, duration)
+        chunks.append(Chunk(len(chunks), start, end, max(start - overlap, 0.0), min(end + overlap, duration)))
+        start = end
+    return chunks
+
+
+def transcribe_range(model, audio_path, mel, start, end, options):
+    """파일 전체 멜 특징에서 [start, end) 구간만 변환해 세그먼트 목록 반환
+
+    whisper의 clip_timestamps를 사용하므로 세그먼트 시간은 파일 기준 절대 시간입니다.
+    멜 특징은 precomputed_mel 훅으로 전달되어 음성을 다시 디코딩하지 않습니다.
+    """
+    options = dict(options)
+    options["clip_timestamps"] = [start, end]
+    options["condition_on_previous_text"] = False  # 구간끼리 독립적으로 변환
+    options.setdefault("verbose", None)
+    if options["verbose"] is False:
+        options["verbose"] = None  # 구간마다 진행 막대를 출력하지 않음
+
+    with precomputed_mel(mel, N_SAMPLES):
+        result = model.transcribe(audio_path, **options)
+
+    return [
+        {
+            "start": seg["start"],
+            "end": seg["end"],
+            "text": seg["text"].strip(),
+            "tokens": seg.get("tokens", []),
+            "avg_logprob": seg.get("avg_logprob"),
+            "compression_ratio": seg.get("compression_ratio"),
+            "no_speech_prob": seg.get("no_speech_prob"),
+        }
+        for seg in result["segments"]
+        if seg["text"].strip()
+    ]
+
+
+def transcribe_chunk(model, audio_path, mel, chunk, options):
+    """구간 하나를 겹친 범위까지 디코딩한 뒤 이 구간 몫의 세그먼트만 반환
+
+    이웃 구간과 겹친 부분의 세그먼트는 중간 시각이 속한 구간에만 남으므로,
+    구간별 결과를 이어 붙여도 경계의 말이 빠지거나 두 번 나오지 않습니다.
+    """
+    segments = transcribe_range(model, audio_path, mel, chunk.decode_start, chunk.decode_end, options)
+    return [seg for seg in segments if chunk.owns(seg)]
+
+
+def join_segments(segments):
+    """세그먼트 텍스트를 하나의 문자열로 합침"""
+    return " ".join(seg["text"] for seg in segments if seg["text"]).strip()
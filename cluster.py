@@ -0,0 +1,696 @@
+import os
+import sys
+import hmac
+import json
+import time
+import shutil
+import socket
+import sqlite3
+import secrets
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from search_index import SearchIndex
+from cache_utils import get_cache_dir
+
+JOB_QUEUED = "queued"
+JOB_LEASED = "leased"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+# 작업 임대 시간 (초): 이 시간 안에 하트비트가 없으면 작업자가 죽은 것으로 보고 다시 대기열에 넣음
+LEASE_SECONDS = 60.0
+# 하트비트 간격 (임대 시간보다 충분히 짧게)
+HEARTBEAT_SECONDS = 10.0
+# 작업 하나를 시도하는 최대 횟수 (작업자 사망/오류 포함)
+MAX_ATTEMPTS = 3
+# 작업이 없을 때 다시 요청하기까지 대기 시간 (초)
+IDLE_POLL_SECONDS = 2.0
+DEFAULT_PORT = 8765
+OUTPUT_SUFFIX = "_변환결과.txt"
+# 브로커 공유 토큰을 읽는 환경 변수 (명령줄에 토큰이 남지 않도록)
+TOKEN_ENV = "STT_BROKER_TOKEN"
+TOKEN_HEADER = "X-Broker-Token"
+
+
+def _resolve_roots(roots):
+    return [os.path.realpath(root) for root in roots or ()]
+
+
+def _is_under(path, roots):
+    return any(os.path.commonpath([path, root]) == root for root in roots)
+
+
+class JobBroker:
+    """여러 호스트의 작업자가 당겨 가는(pull) 변환 작업 대기열 (SQLite)
+
+    작업자는 작업을 임대(lease)하고 하트비트로 임대를 연장합니다. 임대가 끝날 때까지
+    하트비트가 없으면 다시 대기열에 넣고, MAX_ATTEMPTS번 실패한 작업은 실패로 남깁니다.
+    결과는 브로커가 받아 출력 파일과 검색 색인에 반영합니다.
+
+    음성 파일은 input_roots 아래, 결과 파일은 output_roots(기본: input_roots) 아래 경로만
+    받습니다. 경로는 심볼릭 링크를 풀어(realpath) 검사하며, 결과 파일 이름은 음성 파일
+    이름으로 정해지므로 제출자가 임의 경로에 쓰게 할 수 없습니다.
+    """
+
+    def __init__(self, db_path=None, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS, search_index=None,
+                 input_roots=(), output_roots=None):
+        self.db_path = db_path or os.path.join(get_cache_dir("cluster"), "broker.sqlite3")
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.input_roots = _resolve_roots(input_roots)
+        self.output_roots = _resolve_roots(output_roots) if output_roots else list(self.input_roots)
+        self.search_index = search_index or SearchIndex()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY, audio_path TEXT, output_path TEXT, model TEXT, optimize_speed INTEGER,"
+            " status TEXT, worker TEXT, lease_expires REAL, attempts INTEGER DEFAULT 0,"
+            " submitted_at REAL, leased_at REAL, finished_at REAL, audio_duration REAL, error TEXT);"
+            "CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, id);"
+            "CREATE TABLE IF NOT EXISTS workers ("
+            " id TEXT PRIMARY KEY, host TEXT, registered_at REAL, last_seen REAL,"
+            " busy_seconds REAL DEFAULT 0, jobs_done INTEGER DEFAULT 0, jobs_failed INTEGER DEFAULT 0,"
+            " audio_seconds REAL DEFAULT 0, model TEXT);"
+        )
+        self.conn.commit()
+
+    def _check_audio_path(self, audio_path):
+        """허용된 입력 폴더 아래의 실제 파일 경로 반환 (아니면 ValueError)"""
+        path = os.path.realpath(audio_path)
+        if not _is_under(path, self.input_roots) or not os.path.isfile(path):
+            raise ValueError(f"허용된 입력 폴더 밖이거나 없는 파일입니다: {audio_path}")
+        return path
+
+    def _check_output_path(self, output_path):
+        """허용된 출력 폴더 아래 경로인지 확인 (폴더는 심볼릭 링크를 풀어 검사, 아니면 ValueError)"""
+        path = os.path.join(os.path.realpath(os.path.dirname(output_path)), os.path.basename(output_path))
+        if not _is_under(path, self.output_roots) or os.path.islink(path):
+            raise ValueError(f"허용된 출력 폴더 밖의 경로입니다: {output_path}")
+        return path
+
+    def submit(self, audio_path, output_dir=None, model="base", optimize_speed=True):
+        """작업 추가 (작업 번호 반환)
+
+        결과 파일은 output_dir(기본: 음성 파일 폴더)에 "음성 파일 이름 + OUTPUT_SUFFIX"로 저장합니다.
+        허용된 폴더 밖의 경로면 ValueError.
+        """
+        audio_path = self._check_audio_path(audio_path)
+        stem = os.path.splitext(os.path.basename(audio_path))[0]
+        output_path = self._check_output_path(
+            os.path.join(output_dir or os.path.dirname(audio_path), stem + OUTPUT_SUFFIX)
+        )
+        with self._lock, self.conn:
+            return self.conn.execute(
+                "INSERT INTO jobs (audio_path, output_path, model, optimize_speed, status, submitted_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (audio_path, output_path, model, int(optimize_speed), JOB_QUEUED, time.time())
+            ).lastrowid
+
+    def _touch_worker(self, worker, host=None, model=None):
+        now = time.time()
+        self.conn.execute(
+            "INSERT INTO workers (id, host, registered_at, last_seen, model) VALUES (?, ?, ?, ?, ?)"
+            " ON CONFLICT(id) DO UPDATE SET last_seen = excluded.last_seen,"
+            " model = COALESCE(excluded.model, workers.model)",
+            (worker, host, now, now, model)
+        )
+
+    def _expire_leases(self):
+        """임대가 끝난 작업을 다시 대기열로 (시도 횟수를 다 쓰면 실패)"""
+        now = time.time()
+        expired = self.conn.execute(
+            "SELECT id, worker, attempts, leased_at FROM jobs WHERE status = ? AND lease_expires < ?",
+            (JOB_LEASED, now)
+        ).fetchall()
+        for job_id, worker, attempts, leased_at in expired:
+            status = JOB_QUEUED if attempts < self.max_attempts else JOB_FAILED
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, error = ?, finished_at = ?"
+                " WHERE id = ?",
+                (status, f"작업자 {worker} 응답 없음 (임대 만료)", now if status == JOB_FAILED else None, job_id)
+            )
+            self.conn.execute(
+                "UPDATE workers SET busy_seconds = busy_seconds + ?, jobs_failed = jobs_failed + 1 WHERE id = ?",
+                (now - leased_at, worker)
+            )
+
+    def lease(self, worker, host=None, model=None):
+        """대기 중인 작업 하나를 임대 (작업자가 이미 로드한 모델의 작업을 먼저, 없으면 None)"""
+        now = time.time()
+        with self._lock, self.conn:
+            self._touch_worker(worker, host, model)
+            self._expire_leases()
+            row = self.conn.execute(
+                "SELECT id, audio_path, output_path, model, optimize_speed, attempts FROM jobs WHERE status = ?"
+                " ORDER BY (model = ?) DESC, id LIMIT 1",
+                (JOB_QUEUED, model)
+            ).fetchone()
+            if row is None:
+                return None
+            job_id, audio_path, output_path, job_model, optimize_speed, attempts = row
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, worker = ?, lease_expires = ?, attempts = ?, leased_at = ? WHERE id = ?",
+                (JOB_LEASED, worker, now + self.lease_seconds, attempts + 1, now, job_id)
+            )
+        return {
+            "id": job_id,
+            "name": os.path.basename(audio_path),
+            "model": job_model,
+            "optimize_speed": bool(optimize_speed),
+            "attempt": attempts + 1,
+            "lease_seconds": self.lease_seconds,
+        }
+
+    def _owns(self, worker, job_id):
+        row = self.conn.execute("SELECT status, worker FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is not None and row[0] == JOB_LEASED and row[1] == worker
+
+    def heartbeat(self, worker, job_id=None):
+        """임대 연장 (작업을 잃었으면 False: 다른 작업자에게 넘어갔으므로 중단해야 함)"""
+        with self._lock, self.conn:
+            self._touch_worker(worker)
+            if job_id is None:
+                return True
+            if not self._owns(worker, job_id):
+                return False
+            self.conn.execute("UPDATE jobs SET lease_expires = ? WHERE id = ?",
+                              (time.time() + self.lease_seconds, job_id))
+            return True
+
+    def audio_path(self, worker, job_id):
+        """임대한 작업의 음성 파일 경로 (임대하지 않았거나 허용된 입력 폴더 밖이면 None)"""
+        with self._lock:
+            if not self._owns(worker, job_id):
+                return None
+            path = self.conn.execute("SELECT audio_path FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+        try:
+            # 제출 후 경로가 심볼릭 링크로 바뀌었을 수 있으므로 보낼 때 다시 확인
+            return self._check_audio_path(path)
+        except ValueError:
+            return None
+
+    def complete(self, worker, job_id, text, segments, audio_duration=None):
+        """결과 저장 (임대를 잃은 작업자의 늦은 결과는 버리고 False 반환)
+
+        결과는 임시 파일에 먼저 쓰고, 임대 확인과 상태 변경을 한 트랜잭션 안에서 한 뒤에만
+        출력 파일로 옮깁니다. 그 사이 임대가 만료되어 다른 작업자에게 넘어갔으면 출력 파일은 그대로입니다.
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT output_path FROM jobs WHERE id = ? AND status = ? AND worker = ?",
+                (job_id, JOB_LEASED, worker)
+            ).fetchone()
+        if row is None:
+            return False
+        output_path = self._check_output_path(row[0])
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+        now = time.time()
+        try:
+            with self._lock, self.conn:
+                self._expire_leases()
+                if not self._owns(worker, job_id):
+                    return False
+                leased_at = self.conn.execute("SELECT leased_at FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+                os.replace(tmp_path, output_path)
+                self.conn.execute(
+                    "UPDATE jobs SET status = ?, finished_at = ?, lease_expires = NULL, audio_duration = ?,"
+                    " error = NULL WHERE id = ?",
+                    (JOB_DONE, now, audio_duration, job_id)
+                )
+                self.conn.execute(
+                    "UPDATE workers SET busy_seconds = busy_seconds + ?, jobs_done = jobs_done + 1,"
+                    " audio_seconds = audio_seconds + ?, last_seen = ? WHERE id = ?",
+                    (now - leased_at, audio_duration or 0.0, now, worker)
+                )
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        try:
+            self.search_index.add_transcript(output_path, segments)
+        except sqlite3.Error:
+            pass  # 색인 실패는 변환 실패로 보지 않음
+        return True
+
+    def fail(self, worker, job_id, error, retry=True):
+        """작업 실패 보고 (retry가 False면 시도 횟수에 넣지 않고 다시 대기열로: 작업자 종료 시)"""
+        now = time.time()
+        with self._lock, self.conn:
+            if not self._owns(worker, job_id):
+                return False
+            attempts, leased_at = self.conn.execute(
+                "SELECT attempts, leased_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if not retry:
+                attempts -= 1
+            status = JOB_QUEUED if attempts < self.max_attempts else JOB_FAILED
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, worker = NULL, lease_expires = NULL, attempts = ?, error = ?,"
+                " finished_at = ? WHERE id = ?",
+                (status, attempts, error, now if status == JOB_FAILED else None, job_id)
+            )
+            self.conn.execute(
+                "UPDATE workers SET busy_seconds = busy_seconds + ?, jobs_failed = jobs_failed + ?, last_seen = ?"
+                " WHERE id = ?",
+                (now - leased_at, int(retry), now, worker)
+            )
+        return True
+
+    def stats(self):
+        """클러스터 처리량과 작업자별 이용률"""
+        with self._lock, self.conn:
+            self._expire_leases()
+            counts = dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            first_lease, last_finish, audio_done = self.conn.execute(
+                "SELECT MIN(leased_at), MAX(finished_at), SUM(audio_duration) FROM jobs WHERE status = ?",
+                (JOB_DONE,)
+            ).fetchone()
+            workers = self.conn.execute(
+                "SELECT id, host, registered_at, last_seen, busy_seconds, jobs_done, jobs_failed, audio_seconds, model"
+                " FROM workers ORDER BY id"
+            ).fetchall()
+
+        wall = (last_finish - first_lease) if first_lease and last_finish else 0.0
+        worker_stats = []
+        for worker, host, registered_at, last_seen, busy, done, failed, audio, model in workers:
+            alive = last_seen - registered_at
+            worker_stats.append({
+                "id": worker,
+                "host": host,
+                "model": model,
+                "jobs_done": done,
+                "jobs_failed": failed,
+                "audio_seconds": audio,
+                "busy_seconds": busy,
+                # 등록 후 마지막 연락까지 작업을 처리한 시간 비율
+                "utilisation": min(busy / alive, 1.0) if alive > 0 else 0.0,
+                "idle_seconds": time.time() - last_seen,
+            })
+        done = counts.get(JOB_DONE, 0)
+        return {
+            "queued": counts.get(JOB_QUEUED, 0),
+            "leased": counts.get(JOB_LEASED, 0),
+            "done": done,
+            "failed": counts.get(JOB_FAILED, 0),
+            "wall_seconds": wall,
+            "files_per_minute": done / wall * 60 if wall else 0.0,
+            # 클러스터 전체가 1초에 처리한 음성 길이 (초)
+            "audio_seconds_per_second": (audio_done or 0.0) / wall if wall else 0.0,
+            "workers": worker_stats,
+        }
+
+    def close(self):
+        self.conn.close()
+        self.search_index.close()
+
+
+class _BrokerHandler(BaseHTTPRequestHandler):
+    """브로커 HTTP 요청 처리 (JSON 본문, 음성 파일은 그대로 전송)
+
+    모든 경로는 TOKEN_HEADER 헤더에 공유 토큰이 있어야 처리합니다.
+    """
+
+    broker = None
+    token = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _authorized(self):
+        supplied = self.headers.get(TOKEN_HEADER, "")
+        if self.token and hmac.compare_digest(supplied.encode("utf-8"), self.token.encode("utf-8")):
+            return True
+        self._send_json({"error": "토큰이 없거나 올바르지 않습니다"}, 401)
+        return False
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        parts = self.path.strip("/").split("/")
+        if parts == ["stats"]:
+            self._send_json(self.broker.stats())
+        elif len(parts) == 3 and parts[0] == "audio" and parts[1].isdigit():
+            path = self.broker.audio_path(urllib.parse.unquote(parts[2]), int(parts[1]))
+            if path is None:
+                self._send_json({"error": "임대하지 않은 작업이거나 파일이 없습니다"}, 404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(os.path.getsize(path)))
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+        else:
+            self._send_json({"error": "알 수 없는 경로"}, 404)
+
+    def _handle(self, route, request):
+        broker = self.broker
+        if route == "submit":
+            return {"id": broker.submit(request["audio_path"], request.get("output_dir"),
+                                        request.get("model", "base"), request.get("optimize_speed", True))}
+        if route == "lease":
+            return {"job": broker.lease(request["worker"], request.get("host"), request.get("model"))}
+        if route == "heartbeat":
+            return {"ok": broker.heartbeat(request["worker"], request.get("job"))}
+        if route == "complete":
+            return {"ok": broker.complete(request["worker"], request["job"], request["text"],
+                                          request["segments"], request.get("audio_duration"))}
+        if route == "fail":
+            return {"ok": broker.fail(request["worker"], request["job"], request["error"],
+                                      request.get("retry", True))}
+        return None
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            result = self._handle(self.path.strip("/"), json.loads(self.rfile.read(length) or b"{}"))
+        except (KeyError, TypeError, ValueError) as e:
+            self._send_json({"error": str(e)}, 400)
+            return
+        if result is None:
+            self._send_json({"error": "알 수 없는 경로"}, 404)
+            return
+        self._send_json(result)
+
+
+class BrokerServer:
+    """JobBroker를 HTTP로 여는 서버 (작업자가 여러 호스트에서 접속)
+
+    기본은 이 머신에서만 접속할 수 있게 127.0.0.1에 엽니다. 다른 호스트의 작업자를 받으려면
+    host를 지정하세요. token을 주지 않으면 임의 토큰을 만들며 self.token으로 읽을 수 있습니다.
+    """
+
+    def __init__(self, broker, host="127.0.0.1", port=DEFAULT_PORT, token=None):
+        self.broker = broker
+        self.token = token or secrets.token_urlsafe(32)
+        handler = type("BrokerHandler", (_BrokerHandler,), {"broker": broker, "token": self.token})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        if host == "0.0.0.0":
+            host = "127.0.0.1"
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """백그라운드 스레드에서 요청 처리 시작"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self.httpd.serve_forever()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class BrokerClient:
+    """작업자/제출 도구가 쓰는 브로커 HTTP 클라이언트"""
+
+    def __init__(self, url, token=None, timeout=30.0):
+        self.url = url.rstrip("/")
+        self.token = token or os.environ.get(TOKEN_ENV, "")
+        self.timeout = timeout
+
+    def _open(self, path, data=None):
+        headers = {TOKEN_HEADER: self.token}
+        if data is not None:
+            headers["Content-Type"] = "application/json"
+        request = urllib.request.Request(f"{self.url}/{path}", data=data, headers=headers,
+                                         method="GET" if data is None else "POST")
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def post(self, route, **payload):
+        with self._open(route, json.dumps(payload, ensure_ascii=False).encode("utf-8")) as response:
+            return json.loads(response.read())
+
+    def stats(self):
+        with self._open("stats") as response:
+            return json.loads(response.read())
+
+    def download_audio(self, job_id, worker, path):
+        with self._open(f"audio/{job_id}/{urllib.parse.quote(worker)}") as response, open(path, "wb") as f:
+            shutil.copyfileobj(response, f)
+
+
+class ClusterWorker:
+    """브로커에서 작업을 당겨 와 변환하고 결과를 돌려주는 작업자
+
+    변환기(모델 캐시 포함)는 작업자가 살아 있는 동안 재사용하며, 브로커는 이미 로드된
+    모델의 작업을 먼저 넘겨줍니다. 변환 중에는 하트비트로 임대를 연장하고, 임대를 잃으면
+    (브로커가 다른 작업자에게 넘김) 변환을 취소합니다.
+    """
+
+    def __init__(self, broker_url, worker_id=None, compile_model=False, preallocate_kv_cache=False,
+                 log_callback=print, token=None):
+        from converter import WhisperConverter
+
+        self.client = BrokerClient(broker_url, token)
+        self.host = socket.gethostname()
+        self.worker_id = worker_id or f"{self.host}-{os.getpid()}"
+        self.log = log_callback or (lambda message: None)
+        self._stop = threading.Event()
+        self._lease_lost = threading.Event()
+        # 결과 색인은 브로커가 최종 출력 파일 기준으로 하므로 작업자 쪽 색인은 메모리에만 둠
+        self.converter = WhisperConverter(
+            cancel_callback=lambda: self._stop.is_set() or self._lease_lost.is_set(),
+            search_index=SearchIndex(":memory:"),
+            compile_model=compile_model,
+            preallocate_kv_cache=preallocate_kv_cache
+        )
+
+    def _heartbeat(self, job_id, done, interval):
+        while not done.wait(interval):
+            try:
+                if not self.client.post("heartbeat", worker=self.worker_id, job=job_id)["ok"]:
+                    self._lease_lost.set()
+                    return
+            except (OSError, ValueError):
+                pass  # 브로커가 잠시 응답하지 않아도 임대 만료 전까지는 계속 진행
+
+    def _process(self, job, work_dir):
+        """작업 하나 처리"""
+        job_id = job["id"]
+        audio_path = os.path.join(work_dir, f"{job_id}_{job['name']}")
+        output_path = os.path.join(work_dir, f"{job_id}{OUTPUT_SUFFIX}")
+        self._lease_lost.clear()
+        done = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job_id, done, min(HEARTBEAT_SECONDS, job["lease_seconds"] / 3)),
+            daemon=True
+        )
+        heartbeat.start()
+        start = time.time()
+        try:
+            self.client.download_audio(job_id, self.worker_id, audio_path)
+            text = self.converter.convert_audio(audio_path, output_path, job["model"], job["optimize_speed"])
+            if self._lease_lost.is_set():
+                self.log(f"⚠️ 작업 {job_id} 임대를 잃어 결과를 버립니다")
+                return
+            if text is None:
+                self.client.post("fail", worker=self.worker_id, job=job_id, error="작업자 종료로 중단", retry=False)
+                return
+            segments = [{"start": seg["start"], "end": seg["end"], "text": seg["text"]}
+                        for seg in self.converter.last_segments or []]
+            self.client.post("complete", worker=self.worker_id, job=job_id, text=text, segments=segments,
+                             audio_duration=self.converter.audio_duration)
+            self.log(f"✅ 작업 {job_id} {job['name']} ({time.time() - start:.1f}초)")
+        except Exception as e:
+            self.log(f"❌ 작업 {job_id} {job['name']} 실패: {e}")
+            try:
+                self.client.post("fail", worker=self.worker_id, job=job_id, error=str(e))
+            except (OSError, ValueError):
+                pass  # 보고하지 못해도 임대 만료 후 다시 대기열에 들어감
+        finally:
+            done.set()
+            heartbeat.join()
+            for path in (audio_path, output_path):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def run(self, exit_when_idle=False, max_jobs=None):
+        """중지될 때까지 작업 처리 (exit_when_idle이면 대기열이 비었을 때 종료)"""
+        self.log(f"🛠️ 작업자 {self.worker_id} 시작 ({self.client.url})")
+        processed = 0
+        with tempfile.TemporaryDirectory(prefix="stt-worker-") as work_dir:
+            while not self._stop.is_set():
+                try:
+                    job = self.client.post("lease", worker=self.worker_id, host=self.host,
+                                           model=self.converter.model_name)["job"]
+                except (OSError, ValueError) as e:
+                    self.log(f"⚠️ 브로커 연결 실패: {e}")
+                    self._stop.wait(IDLE_POLL_SECONDS)
+                    continue
+
+                if job is None:
+                    if exit_when_idle:
+                        stats = self.client.stats()
+                        if stats["queued"] == 0 and stats["leased"] == 0:
+                            break
+                    self._stop.wait(IDLE_POLL_SECONDS)
+                    continue
+
+                self._process(job, work_dir)
+                processed += 1
+                if max_jobs is not None and processed >= max_jobs:
+                    break
+        self.log(f"👋 작업자 {self.worker_id} 종료 ({processed}개 처리)")
+
+    def stop(self):
+        self._stop.set()
+
+
+def print_stats(stats):
+    """클러스터 처리량과 작업자별 이용률 출력"""
+    print(f"📊 클러스터: 완료 {stats['done']} · 실패 {stats['failed']} · 대기 {stats['queued']} · "
+          f"진행 중 {stats['leased']}")
+    print(f"   처리량: {stats['files_per_minute']:.1f}개/분, 음성 {stats['audio_seconds_per_second']:.1f}초/초 "
+          f"({stats['wall_seconds']:.1f}초 동안)")
+    for worker in stats["workers"]:
+        print(f"   {worker['id']:<24} {worker['model'] or '-':<8} 완료 {worker['jobs_done']:>3} 실패 {worker['jobs_failed']:>2}  "
+              f"이용률 {worker['utilisation'] * 100:5.1f}%  음성 {worker['audio_seconds']:.0f}초")
+
+
+def run_local_cluster(audio_paths, output_dir, workers=2, model="base", optimize_speed=True,
+                      lease_seconds=LEASE_SECONDS, worker_args=()):
+    """한 머신에서 브로커와 작업자 프로세스 여러 개를 띄워 파일들을 변환 (클러스터 통계 반환)"""
+    input_roots = sorted({os.path.dirname(os.path.realpath(path)) for path in audio_paths})
+    with tempfile.TemporaryDirectory(prefix="stt-broker-") as state_dir:
+        broker = JobBroker(os.path.join(state_dir, "broker.sqlite3"), lease_seconds=lease_seconds,
+                           input_roots=input_roots, output_roots=[output_dir])
+        server = BrokerServer(broker, host="127.0.0.1", port=0).start()
+        for path in audio_paths:
+            broker.submit(path, output_dir, model, optimize_speed)
+
+        # 토큰은 명령줄 대신 환경 변수로 넘김 (프로세스 목록에 보이지 않도록)
+        env = dict(os.environ, **{TOKEN_ENV: server.token})
+        processes = [
+            subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", "--broker", server.url,
+                              "--id", f"local-{index + 1}", "--exit-when-idle", *worker_args], env=env)
+            for index in range(workers)
+        ]
+        try:
+            for process in processes:
+                process.wait()
+            return broker.stats()
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.terminate()
+            server.stop()
+            broker.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="여러 호스트 분산 변환 (브로커/작업자)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    broker_parser = commands.add_parser("broker", help="작업 브로커 실행")
+    broker_parser.add_argument("--host", default="127.0.0.1",
+                               help="수신 주소 (기본: 이 머신만, 다른 호스트 작업자를 받으려면 0.0.0.0)")
+    broker_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="포트")
+    broker_parser.add_argument("--db", help="작업 대기열 파일 (기본: 캐시 폴더)")
+    broker_parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="작업 임대 시간(초)")
+    broker_parser.add_argument("--input-root", action="append", required=True,
+                               help="작업으로 받을 음성 파일 폴더 (여러 번 지정 가능)")
+    broker_parser.add_argument("--output-root", action="append",
+                               help="결과를 저장할 수 있는 폴더 (여러 번 지정 가능, 기본: 입력 폴더)")
+
+    worker_parser = commands.add_parser("worker", help="작업자 실행")
+    worker_parser.add_argument("--broker", required=True, help="브로커 주소 (예: http://서버:8765)")
+    worker_parser.add_argument("--id", help="작업자 이름 (기본: 호스트명-PID)")
+    worker_parser.add_argument("--token", help=f"브로커 공유 토큰 (기본: 환경 변수 {TOKEN_ENV})")
+    worker_parser.add_argument("--exit-when-idle", action="store_true", help="대기열이 비면 종료")
+    worker_parser.add_argument("--max-jobs", type=int, help="이 수만큼 처리하고 종료")
+    worker_parser.add_argument("--compile", action="store_true", help="인코더/디코더를 컴파일해 실행")
+    worker_parser.add_argument("--preallocate-kv", action="store_true", help="디코더 KV 캐시를 고정 용량 버퍼로 실행")
+
+    submit_parser = commands.add_parser("submit", help="브로커에 작업 제출")
+    submit_parser.add_argument("files", nargs="+", help="음성 파일 (브로커가 읽을 수 있는 경로)")
+    submit_parser.add_argument("--broker", required=True, help="브로커 주소")
+    submit_parser.add_argument("--token", help=f"브로커 공유 토큰 (기본: 환경 변수 {TOKEN_ENV})")
+    submit_parser.add_argument("--output-dir", help="결과 저장 폴더 (브로커의 출력 폴더 아래, 기본: 음성 파일 옆)")
+    submit_parser.add_argument("--model", default="base", help="모델 크기")
+    submit_parser.add_argument("--no-optimize", action="store_true", help="정확도 우선 옵션 사용")
+
+    stats_parser = commands.add_parser("stats", help="클러스터 처리량/작업자 이용률 조회")
+    stats_parser.add_argument("--broker", required=True, help="브로커 주소")
+    stats_parser.add_argument("--token", help=f"브로커 공유 토큰 (기본: 환경 변수 {TOKEN_ENV})")
+
+    local_parser = commands.add_parser("local", help="한 머신에서 브로커와 작업자 여러 개로 변환 (시험용)")
+    local_parser.add_argument("files", nargs="+", help="음성 파일")
+    local_parser.add_argument("--output-dir", required=True, help="결과 저장 폴더")
+    local_parser.add_argument("--workers", type=int, default=2, help="작업자 프로세스 수")
+    local_parser.add_argument("--model", default="base", help="모델 크기")
+    local_parser.add_argument("--no-optimize", action="store_true", help="정확도 우선 옵션 사용")
+    local_parser.add_argument("--lease", type=float, default=LEASE_SECONDS, help="작업 임대 시간(초)")
+    args = parser.parse_args()
+
+    if args.command == "broker":
+        broker = JobBroker(args.db, lease_seconds=args.lease, input_roots=args.input_root,
+                           output_roots=args.output_root)
+        token = os.environ.get(TOKEN_ENV)
+        server = BrokerServer(broker, args.host, args.port, token)
+        print(f"📮 브로커 시작: {args.host}:{args.port} (대기열 {broker.db_path})")
+        if not token:
+            print(f"🔑 공유 토큰 (작업자/제출 도구의 {TOKEN_ENV} 환경 변수로 지정): {server.token}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            broker.close()
+    elif args.command == "worker":
+        worker = ClusterWorker(args.broker, args.id, args.compile, args.preallocate_kv, token=args.token)
+        try:
+            worker.run(args.exit_when_idle, args.max_jobs)
+        except KeyboardInterrupt:
+            worker.stop()
+    elif args.command == "submit":
+        client = BrokerClient(args.broker, args.token)
+        output_dir = os.path.abspath(args.output_dir) if args.output_dir else None
+        for path in args.files:
+            try:
+                job_id = client.post("submit", audio_path=os.path.abspath(path), output_dir=output_dir,
+                                     model=args.model, optimize_speed=not args.no_optimize)["id"]
+            except urllib.error.HTTPError as e:
+                print(f"❌ 제출 실패 {path}: {json.loads(e.read() or b'{}').get('error', e)}")
+                continue
+            print(f"📥 작업 {job_id}: {path}")
+    elif args.command == "stats":
+        print_stats(BrokerClient(args.broker, args.token).stats())
+    else:
+        print_stats(run_local_cluster(args.files, os.path.abspath(args.output_dir), args.workers, args.model,
+                                      not args.no_optimize, args.lease))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import os
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import torch
+import whisper
+from whisper.audio import N_SAMPLES
+
+from converter import WhisperConverter
+from features import FeatureStage
+from prefetch import n_mels_for
+from whisper_hooks import precomputed_mel
+from encoder_reuse import reuse_encoder_features
+from memory_planner import PeakMemoryTracker
+from hardware import get_hardware_profile, configure_torch_threads
+
+# 나란히 비교할 때 묶는 시간 구간 (초)
+COMPARE_BUCKET_SECONDS = 30
+MB = 1024**2
+
+
+class ComparisonConfig:
+    """비교 실행 한 건의 설정 (모델 크기 + 최적화 옵션)"""
+
+    def __init__(self, model_size, optimize_speed=True, label=None):
+        self.model_size = model_size
+        self.optimize_speed = optimize_speed
+        self.label = label or f"{model_size}{'+빠름' if optimize_speed else '+정확'}"
+
+    def to_dict(self):
+        return {"label": self.label, "model_size": self.model_size, "optimize_speed": self.optimize_speed}
+
+
+def _model_weight_mb(model):
+    """모델 가중치 메모리 (MB)"""
+    return sum(p.numel() * p.element_size() for p in model.parameters()) / MB
+
+
+def _run_group(audio_path, model_size, configs, device, cache_dir, progress_callback=None):
+    """같은 모델 크기의 설정들을 하나씩 순서대로 실행 (설정마다 최대 메모리를 따로 측정)"""
+    report = progress_callback or (lambda message: None)
+    configure_torch_threads()
+    feature_stage = FeatureStage(cache_dir=cache_dir)
+    results = []
+
+    tracker = PeakMemoryTracker().start()  # 첫 설정은 모델 로드까지 포함
+    load_start = time.time()
+    model = whisper.load_model(model_size, device=device)
+    load_time = time.time() - load_start
+    mel = feature_stage.get_mel_tensor(audio_path, model.dims.n_mels)
+    duration = FeatureStage.mel_duration(mel)
+
+    for config in configs:
+        report(f"🔄 {config.label} 변환 중...")
+        options = WhisperConverter.build_transcribe_options(device, config.optimize_speed)
+        options["verbose"] = None
+
+        if tracker is None:
+            tracker = PeakMemoryTracker().start()
+        start = time.time()
+        with precomputed_mel(mel, N_SAMPLES), reuse_encoder_features():
+            result = model.transcribe(audio_path, **options)
+        transcribe_time = time.time() - start
+        tracker.stop()
+
+        results.append({
+            "config": config.to_dict(),
+            "device": device,
+            "load_time": load_time,
+            "transcribe_time": transcribe_time,
+            "audio_duration": duration,
+            "real_time_factor": transcribe_time / duration if duration > 0 else None,
+            "model_weight_mb": _model_weight_mb(model),
+            "peak_rss_mb": tracker.peak_rss / MB,
+            "peak_cuda_mb": tracker.peak_vram / MB if device == "cuda" else None,
+            "text": result["text"].strip(),
+            "segments": [
+                {"start": seg["start"], "end": seg["end"], "text": seg["text"].strip()}
+                for seg in result["segments"]
+            ],
+        })
+        report(f"✅ {config.label} 완료 ({transcribe_time:.1f}초)")
+        tracker = None
+
+    del model
+    if device == "cuda":
+        torch.cuda.empty_cache()
+    return results
+
+
+class ModelComparison:
+    """하나의 음성 파일을 여러 모델/옵션으로 변환해 비교하는 클래스
+
+    음성 디코딩과 멜 특징은 FeatureStage를 통해 한 번만 계산해 디스크 캐시로 공유합니다.
+    설정은 한 번에 하나씩 실행하므로 서로의 CPU/GPU 사용이 변환 시간(RTF)에 섞이지 않습니다.
+    isolate가 True면 모델 크기마다 새 프로세스에서 실행해, 앞서 실행한 큰 모델이 남긴 메모리가
+    다음 모델의 최대 RSS에 더해지지 않게 합니다.
+    """
+
+    def __init__(self, feature_stage=None, progress_callback=None, device=None, isolate=True):
+        # 멜 설정이 다른 모델끼리 PCM을 공유하도록 보관 (run() 끝에서 해제)
+        self.feature_stage = feature_stage or FeatureStage(keep_audio=True)
+        self.progress_callback = progress_callback
+        self.device = device or get_hardware_profile().device
+        self.isolate = isolate
+
+    def _report_progress(self, message):
+        """진행 상황 알림"""
+        if self.progress_callback:
+            self.progress_callback(message)
+
+    def _run_group_isolated(self, audio_path, model_size, configs):
+        """모델 크기 하나를 새 프로세스에서 실행 (torch/CUDA 상태를 물려받지 않도록 spawn)"""
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            return executor.submit(_run_group, audio_path, model_size, configs, self.device,
+                                   self.feature_stage.cache_dir).result()
+
+    def run(self, audio_path, configs):
+        """모든 설정으로 변환을 실행하고 비교 보고서(dict) 반환"""
+        labels = [config.label for config in configs]
+        duplicates = sorted({label for label in labels if labels.count(label) > 1})
+        if duplicates:
+            raise ValueError(f"설정 이름이 중복되었습니다: {', '.join(duplicates)}")
+
+        groups = {}
+        for config in configs:
+            groups.setdefault(config.model_size, []).append(config)
+
+        # 디코딩은 한 번만: 필요한 멜 설정을 모두 디스크 캐시에 만들어 두고 각 실행이 읽어 감
+        decode_start = time.time()
+        try:
+            for n_mels in sorted({n_mels_for(model_size) for model_size in groups}):
+                self.feature_stage.get_mel(audio_path, n_mels)
+        finally:
+            self.feature_stage.release_audio(audio_path)
+        decode_time = time.time() - decode_start
+
+        wall_start = time.time()
+        results = []
+        for model_size, group_configs in groups.items():
+            self._report_progress(f"📥 {model_size} 모델 로드 중...")
+            if self.isolate:
+                results += self._run_group_isolated(audio_path, model_size, group_configs)
+                for result in results[-len(group_configs):]:
+                    self._report_progress(f"✅ {result['config']['label']} 완료 ({result['transcribe_time']:.1f}초)")
+            else:
+                results += _run_group(audio_path, model_size, group_configs, self.device,
+                                      self.feature_stage.cache_dir, self._report_progress)
+        wall_time = time.time() - wall_start
+
+        # 요청한 설정 순서대로 정렬
+        by_label = {result["config"]["label"]: result for result in results}
+        runs = [by_label[label] for label in labels]
+
+        cuda_peaks = [run["peak_cuda_mb"] for run in runs if run["peak_cuda_mb"] is not None]
+        return {
+            "audio_path": os.path.abspath(audio_path),
+            "device": self.device,
+            "isolated": self.isolate,
+            "audio_decode_time": decode_time,
+            "wall_time": wall_time,
+            "peak_rss_mb": max((run["peak_rss_mb"] for run in runs), default=0.0),
+            "peak_cuda_mb": max(cuda_peaks) if cuda_peaks else None,
+            "runs": runs,
+        }
+
+    @staticmethod
+    def format_report(report):
+        """비교 보고서를 마크다운 텍스트로 변환"""
+        runs = report["runs"]
+        lines = [
+            f"# 모델 비교: {os.path.basename(report['audio_path'])}",
+            "",
+            f"- 장치: {report['device']}",
+            f"- 음성 디코딩: {report['audio_decode_time']:.1f}초 (모든 모델이 공유)",
+            f"- 전체 소요 시간: {report['wall_time']:.1f}초 (설정마다 하나씩 실행"
+            f"{', 모델 크기별 별도 프로세스' if report.get('isolated') else ''})",
+        ]
+
+        lines += [
+            "",
+            "| 설정 | 모델 로드 | 변환 시간 | 실시간 배율(RTF) | 가중치 메모리 | 최대 RSS | 최대 GPU 메모리 |",
+            "|------|-----------|-----------|------------------|---------------|----------|-----------------|",
+        ]
+        for run in runs:
+            rtf = f"{run['real_time_factor']:.2f}" if run["real_time_factor"] is not None else "-"
+            cuda = f"{run['peak_cuda_mb']:.0f}MB" if run["peak_cuda_mb"] is not None else "-"
+            lines.append(
+                f"| {run['config']['label']} | {run['load_time']:.1f}초 | {run['transcribe_time']:.1f}초 "
+                f"| {rtf} | {run['model_weight_mb']:.0f}MB | {run['peak_rss_mb']:.0f}MB | {cuda} |"
+            )
+
+        # 시간 구간별 나란히 보기
+        duration = max((run["audio_duration"] for run in runs), default=0)
+        bucket_count = int(duration // COMPARE_BUCKET_SECONDS) + 1
+        lines += [
+            "",
+            "| 구간 | " + " | ".join(run["config"]["label"] for run in runs) + " |",
+            "|------|" + "|".join("---" for _ in runs) + "|",
+        ]
+        for bucket in range(bucket_count):
+            start = bucket * COMPARE_BUCKET_SECONDS
+            end = start + COMPARE_BUCKET_SECONDS
+            cells = []
+            for run in runs:
+                texts = [seg["text"] for seg in run["segments"] if start <= seg["start"] < end]
+                cells.append(" ".join(texts).replace("|", "\\|"))
+            if any(cells):
+                lines.append(f"| {start // 60:02d}:{start % 60:02d} | " + " | ".join(cells) + " |")
+
+        return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="하나의 음성 파일을 여러 Whisper 모델로 비교 변환")
+    parser.add_argument("audio", help="비교할 음성 파일")
+    parser.add_argument("--models", nargs="+", default=["base", "small"], help="비교할 모델 크기")
+    parser.add_argument("--both-options", action="store_true", help="속도 최적화 켬/끔을 모두 비교")
+    parser.add_argument("--no-optimize", action="store_true", help="정확도 우선 옵션만 사용")
+    parser.add_argument("--output", help="마크다운 보고서 저장 경로")
+    parser.add_argument("--json", dest="json_path", help="JSON 보고서 저장 경로")
+    parser.add_argument("--in-process", action="store_true",
+                        help="모델별 별도 프로세스 없이 실행 (최대 RSS가 앞선 모델의 영향을 받음)")
+    args = parser.parse_args()
+
+    if args.both_options:
+        option_sets = [True, False]
+    else:
+        option_sets = [not args.no_optimize]
+    configs = [ComparisonConfig(model, optimize) for model in args.models for optimize in option_sets]
+
+    comparison = ModelComparison(progress_callback=print, isolate=not args.in_process)
+    report = comparison.run(args.audio, configs)
+    text = ModelComparison.format_report(report)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
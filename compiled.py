@@ -0,0 +1,311 @@
+import os
+import time
+import argparse
+import tempfile
+import warnings
+
+import torch
+import whisper
+from whisper.audio import N_FRAMES
+from whisper.decoding import PyTorchInference
+from whisper.tokenizer import get_tokenizer
+
+from cache_utils import get_cache_dir
+from hardware import get_hardware_profile
+
+# 컴파일 방식이 바뀌면 올려서 기존 산출물을 무효화
+COMPILED_VERSION = 1
+# 컴파일 결과를 즉시 실행과 비교할 때 허용하는 최대 오차 (FP16은 오차가 커서 따로)
+VALIDATION_TOLERANCE = {torch.float32: 1e-3, torch.float16: 5e-2}
+# 디코더 검증/벤치마크에서 실행하는 토큰 단계 수
+VALIDATION_STEPS = 3
+BENCHMARK_STEPS = 64
+
+
+def _model_checksum(model_size):
+    """모델 파일 SHA256 (다운로드 URL에 포함, 알 수 없으면 모델 이름)"""
+    url = whisper._MODELS.get(model_size)
+    return url.split("/")[-2][:16] if url else model_size
+
+
+def encoder_artifact_path(model_size, device, dtype, n_mels, cache_dir=None):
+    """모델/장치/정밀도/입력 크기별 컴파일된 인코더 파일 경로"""
+    cache_dir = cache_dir or get_cache_dir("compiled")
+    precision = "fp16" if dtype == torch.float16 else "fp32"
+    torch_version = torch.__version__.split("+")[0]
+    name = (f"encoder_{model_size}_{_model_checksum(model_size)}_{device}_{precision}"
+            f"_{n_mels}x{N_FRAMES}_torch{torch_version}_v{COMPILED_VERSION}.pt")
+    return os.path.join(cache_dir, name)
+
+
+def _configure_inductor_cache(cache_dir=None):
+    """torch.compile 결과를 캐시 폴더에 남기도록 설정 (사용자가 직접 지정했으면 그대로 둠)"""
+    if "TORCHINDUCTOR_CACHE_DIR" not in os.environ:
+        os.environ["TORCHINDUCTOR_CACHE_DIR"] = os.path.join(cache_dir or get_cache_dir("compiled"), "inductor")
+    try:
+        import torch._inductor.config as inductor_config
+        inductor_config.fx_graph_cache = True
+    except (ImportError, AttributeError):
+        pass
+
+
+def _example_mel(model, device, dtype):
+    generator = torch.Generator().manual_seed(0)
+    mel = torch.randn(1, model.dims.n_mels, N_FRAMES, generator=generator)
+    return mel.to(device=device, dtype=dtype)
+
+
+def _check_close(expected, actual, dtype, what):
+    error = (expected.float() - actual.float()).abs().max().item()
+    if not error <= VALIDATION_TOLERANCE[dtype]:
+        raise RuntimeError(f"{what} 결과가 즉시 실행과 다릅니다 (최대 오차 {error:.4g})")
+
+
+class CompiledEncoder(torch.nn.Module):
+    """TorchScript로 고정한 인코더 (입력 크기/장치/정밀도가 다르거나 실행에 실패하면 즉시 실행)"""
+
+    def __init__(self, eager, traced, device, dtype, n_mels):
+        super().__init__()
+        self.eager = eager
+        # 고정(freeze)된 모듈은 가중치를 상수로 포함하므로 파라미터 목록에 넣지 않음
+        self.__dict__["traced"] = traced
+        self.input_shape = (n_mels, N_FRAMES)
+        self.device_type = device
+        self.dtype = dtype
+        self.stats = {"compiled_calls": 0, "eager_calls": 0}
+
+    def forward(self, x):
+        traced = self.__dict__["traced"]
+        if traced is not None and x.shape[0] == 1 and tuple(x.shape[1:]) == self.input_shape \
+                and x.device.type == self.device_type and x.dtype == self.dtype:
+            try:
+                output = traced(x)
+                self.stats["compiled_calls"] += 1
+                return output
+            except RuntimeError as e:
+                warnings.warn(f"컴파일된 인코더 실행 실패, 즉시 실행으로 전환: {e}")
+                self.__dict__["traced"] = None
+        self.stats["eager_calls"] += 1
+        return self.eager(x)
+
+
+def compile_encoder(model, model_size, device, dtype, cache_dir=None):
+    """인코더를 TorchScript로 추적·고정해 디스크에 저장 (이미 있으면 불러옴)
+
+    (CompiledEncoder, 걸린 시간, 디스크에서 읽었는지 여부)를 반환합니다.
+    """
+    encoder = model.encoder.eager if isinstance(model.encoder, CompiledEncoder) else model.encoder
+    path = encoder_artifact_path(model_size, device, dtype, model.dims.n_mels, cache_dir)
+    start = time.time()
+    traced = None
+    if os.path.exists(path):
+        try:
+            traced = torch.jit.load(path, map_location=device)
+        except (RuntimeError, OSError):
+            os.remove(path)  # 손상된 파일은 다시 컴파일
+
+    from_disk = traced is not None
+    if traced is None:
+        example = _example_mel(model, device, dtype)
+        with torch.no_grad(), warnings.catch_warnings():
+            warnings.simplefilter("ignore", torch.jit.TracerWarning)
+            traced = torch.jit.freeze(torch.jit.trace(encoder.eval(), example))
+            if device == "cpu":
+                traced = torch.jit.optimize_for_inference(traced)
+            _check_close(encoder(example), traced(example), dtype, "컴파일된 인코더")
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.jit.save(traced, tmp_path)
+        os.replace(tmp_path, path)
+    return CompiledEncoder(encoder, traced, device, dtype, model.dims.n_mels), time.time() - start, from_disk
+
+
+def _decode_steps(model, audio_features, steps):
+    """KV 캐시를 쓰는 디코더 단계를 steps번 실행 (그리디, 마지막 로짓 목록 반환)"""
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                              language="ko", task="transcribe")
+    tokens = torch.tensor([list(tokenizer.sot_sequence)], device=audio_features.device)
+    inference = PyTorchInference(model, tokens.shape[-1])
+    outputs = []
+    try:
+        with torch.no_grad():
+            for _ in range(steps):
+                logits = inference.logits(tokens, audio_features)[:, -1]
+                outputs.append(logits)
+                tokens = torch.cat([tokens, logits.argmax(dim=-1, keepdim=True)], dim=-1)
+    finally:
+        inference.cleanup_caching()
+    return outputs
+
+
+def compile_decoder(model, dtype):
+    """디코더 forward를 torch.compile로 교체 (결과는 TORCHINDUCTOR_CACHE_DIR에 캐시)
+
+    KV 캐시 훅이 컴파일된 그래프 안에서도 동작하는지 짧은 디코딩으로 즉시 실행과 비교하고,
+    다르거나 컴파일에 실패하면 원래 forward로 되돌린 뒤 예외를 그대로 올립니다.
+    """
+    decoder = model.decoder
+    if "forward" in decoder.__dict__:
+        return 0.0
+    if not hasattr(torch, "compile"):
+        raise RuntimeError("torch.compile을 지원하지 않는 PyTorch 버전입니다")
+
+    start = time.time()
+    eager_forward = decoder.forward
+    compiled_forward = torch.compile(eager_forward, dynamic=True)
+
+    def forward(*args, **kwargs):
+        try:
+            return compiled_forward(*args, **kwargs)
+        except Exception as e:
+            warnings.warn(f"컴파일된 디코더 실행 실패, 즉시 실행으로 전환: {e}")
+            decoder.__dict__.pop("forward", None)
+            return eager_forward(*args, **kwargs)
+
+    with torch.no_grad():
+        audio_features = model.encoder(_example_mel(model, model.device, dtype))
+    expected = _decode_steps(model, audio_features, VALIDATION_STEPS)
+    decoder.forward = forward
+    try:
+        # 첫 실행에서 실제 컴파일이 일어나므로 검증이 곧 준비 시간
+        actual = _decode_steps(model, audio_features, VALIDATION_STEPS)
+        for step, (a, b) in enumerate(zip(expected, actual)):
+            _check_close(a, b, dtype, f"컴파일된 디코더 {step + 1}단계")
+    except Exception:
+        decoder.__dict__.pop("forward", None)
+        raise
+    return time.time() - start
+
+
+def enable_compiled(model, model_size, device, fp16=False, cache_dir=None):
+    """모델의 인코더/디코더를 컴파일된 실행으로 교체 (실패한 부분은 즉시 실행 유지)
+
+    {"encoder", "decoder", "compile_seconds", "errors"} 결과를 반환하며 상태 값은
+    "compiled"(새로 컴파일), "cached"(디스크에서 읽음), "eager"(즉시 실행) 중 하나입니다.
+    """
+    dtype = torch.float16 if fp16 and device == "cuda" else torch.float32
+    _configure_inductor_cache(cache_dir)
+    report = {"encoder": "eager", "decoder": "eager", "compile_seconds": 0.0, "errors": []}
+
+    try:
+        model.encoder, seconds, from_disk = compile_encoder(model, model_size, device, dtype, cache_dir)
+        report["encoder"] = "cached" if from_disk else "compiled"
+        report["compile_seconds"] += seconds
+    except Exception as e:
+        report["errors"].append(f"인코더: {e}")
+
+    try:
+        report["compile_seconds"] += compile_decoder(model, dtype)
+        report["decoder"] = "compiled"
+    except Exception as e:
+        report["errors"].append(f"디코더: {e}")
+    return report
+
+
+def disable_compiled(model):
+    """즉시 실행으로 되돌림"""
+    if isinstance(model.encoder, CompiledEncoder):
+        model.encoder = model.encoder.eager
+    model.decoder.__dict__.pop("forward", None)
+
+
+def _synchronize(device):
+    if device == "cuda":
+        torch.cuda.synchronize()
+
+
+def _time_encoder(model, mel, runs, device):
+    with torch.no_grad():
+        model.encoder(mel)  # 준비 실행
+        _synchronize(device)
+        start = time.perf_counter()
+        for _ in range(runs):
+            model.encoder(mel)
+        _synchronize(device)
+    return (time.perf_counter() - start) / runs
+
+
+def _time_decoder(model, mel, steps, device):
+    with torch.no_grad():
+        audio_features = model.encoder(mel)
+    _decode_steps(model, audio_features, 2)  # 준비 실행
+    _synchronize(device)
+    start = time.perf_counter()
+    _decode_steps(model, audio_features, steps)
+    _synchronize(device)
+    return (time.perf_counter() - start) / steps
+
+
+def run_benchmark(model_size="base", device=None, fp16=None, runs=5, steps=BENCHMARK_STEPS):
+    """컴파일 비용과 정상 상태 속도 향상 측정
+
+    빈 캐시 폴더에서 한 번(처음 컴파일), 같은 폴더에서 다시 한 번(디스크 캐시 사용) 준비 시간을 재고,
+    30초 창 하나의 인코더 시간과 토큰 하나의 디코더 시간을 즉시 실행과 비교합니다.
+    """
+    profile = get_hardware_profile()
+    device = device or profile.device
+    fp16 = profile.use_fp16(device) if fp16 is None else fp16
+    dtype = torch.float16 if fp16 and device == "cuda" else torch.float32
+    model = whisper.load_model(model_size, device=device)
+    mel = _example_mel(model, device, dtype)
+
+    result = {"model": model_size, "device": device, "fp16": dtype == torch.float16}
+    result["eager_encoder_ms"] = _time_encoder(model, mel, runs, device) * 1000
+    result["eager_decoder_ms_per_token"] = _time_decoder(model, mel, steps, device) * 1000
+
+    saved_inductor_dir = os.environ.pop("TORCHINDUCTOR_CACHE_DIR", None)
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold = enable_compiled(model, model_size, device, fp16, cache_dir)
+            result["cold_compile_seconds"] = cold["compile_seconds"]
+            result["encoder"], result["decoder"], result["errors"] = cold["encoder"], cold["decoder"], cold["errors"]
+            result["compiled_encoder_ms"] = _time_encoder(model, mel, runs, device) * 1000
+            result["compiled_decoder_ms_per_token"] = _time_decoder(model, mel, steps, device) * 1000
+
+            disable_compiled(model)
+            if hasattr(torch, "_dynamo"):
+                torch._dynamo.reset()  # 메모리 속 컴파일 결과를 비워 디스크 캐시만 사용
+            warm = enable_compiled(model, model_size, device, fp16, cache_dir)
+            result["warm_compile_seconds"] = warm["compile_seconds"]
+            disable_compiled(model)
+    finally:
+        os.environ.pop("TORCHINDUCTOR_CACHE_DIR", None)
+        if saved_inductor_dir is not None:
+            os.environ["TORCHINDUCTOR_CACHE_DIR"] = saved_inductor_dir
+
+    # 창 하나(인코더 1회 + 디코더 steps 토큰)에서 아끼는 시간으로 준비 비용을 회수하는 데 필요한 창 수
+    saved_per_window = (result["eager_encoder_ms"] - result["compiled_encoder_ms"]
+                        + (result["eager_decoder_ms_per_token"] - result["compiled_decoder_ms_per_token"]) * steps) / 1000
+    result["saved_seconds_per_window"] = saved_per_window
+    result["break_even_windows_cold"] = result["cold_compile_seconds"] / saved_per_window if saved_per_window > 0 else None
+    result["break_even_windows_warm"] = result["warm_compile_seconds"] / saved_per_window if saved_per_window > 0 else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="컴파일된 인코더/디코더 준비 비용과 속도 향상 측정")
+    parser.add_argument("--model", default="base", help="모델 크기")
+    parser.add_argument("--device", choices=["cpu", "cuda"], help="실행 장치 (기본: 하드웨어 프로필)")
+    parser.add_argument("--fp32", action="store_true", help="GPU에서도 32비트 정밀도 사용")
+    parser.add_argument("--runs", type=int, default=5, help="인코더 반복 측정 횟수")
+    parser.add_argument("--steps", type=int, default=BENCHMARK_STEPS, help="디코더 측정 토큰 수 (창당 토큰 수로도 사용)")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.model, args.device, False if args.fp32 else None, args.runs, args.steps)
+    print(f"📊 컴파일 실행 벤치마크 ({result['model']}, {result['device']}, "
+          f"{'FP16' if result['fp16'] else 'FP32'}):")
+    print(f"   인코더: 즉시 실행 {result['eager_encoder_ms']:.1f}ms → 컴파일 {result['compiled_encoder_ms']:.1f}ms"
+          f" ({result['encoder']})")
+    print(f"   디코더: 즉시 실행 {result['eager_decoder_ms_per_token']:.2f}ms/토큰 → "
+          f"컴파일 {result['compiled_decoder_ms_per_token']:.2f}ms/토큰 ({result['decoder']})")
+    print(f"   준비 시간: 처음 {result['cold_compile_seconds']:.1f}초, 디스크 캐시 사용 {result['warm_compile_seconds']:.1f}초")
+    if result["break_even_windows_cold"] is not None:
+        print(f"   30초 창당 {result['saved_seconds_per_window'] * 1000:.0f}ms 절약 → "
+              f"처음 {result['break_even_windows_cold']:.0f}개 창, 캐시 사용 시 {result['break_even_windows_warm']:.0f}개 창 이후 이득")
+    else:
+        print("   ⚠️ 이 환경에서는 컴파일 실행이 더 빠르지 않습니다")
+    for error in result["errors"]:
+        print(f"   ⚠️ {error}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,27 +2,88 @@ import whisper
 import torch
 import time
 import os
+import sqlite3
 import threading
+from contextlib import nullcontext
+from whisper.audio import N_SAMPLES
+
+from features import FeatureStage
+from whisper_hooks import precomputed_mel
+from chunking import plan_chunks, transcribe_chunk, join_segments
+from auto_planner import AUTO_MODEL, AutoPlanner, PerformanceProfile, Plan
+from selective_decode import SelectiveRedecoder
+from hardware import get_hardware_profile, configure_torch_threads
+from memory_planner import MemoryPlanner, PeakMemoryTracker
+from search_index import SearchIndex
+from repetition import repetition_guard, new_repetition_stats
+from encoder_reuse import reuse_encoder_features, new_encoder_stats
+from kv_cache import preallocated_kv_cache, new_kv_stats
+from metrics import MetricsCollector
+from compiled import enable_compiled
+from job_history import JobHistory, probe_duration, STATUS_DONE, STATUS_FAILED, STATUS_CANCELLED
+
+# 선택적 재변환에서 약한 구간에 사용하는 빔 크기
+REDECODE_BEAM_SIZE = 5
+# temperature_fallback을 켰을 때 어려운 창(압축률/로그 확률 기준 미달)에서 차례로 올려 다시 디코딩하는 온도
+# 재시도는 인코더 특징을 재사용하므로 디코더 비용만 추가됨 (속도 우선은 짧은 단계, 기본은 0.0 한 번만)
+FALLBACK_TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+FAST_FALLBACK_TEMPERATURES = (0.0, 0.4, 0.8)
 
 class WhisperConverter:
     """Whisper 음성 변환 로직을 담당하는 클래스"""
     
-    def __init__(self, progress_callback=None, cancel_callback=None):
+    def __init__(self, progress_callback=None, cancel_callback=None, feature_stage=None, search_index=None,
+                 metrics_callback=None, job_history=None, compile_model=False, preallocate_kv_cache=False,
+                 temperature_fallback=False, concurrent_jobs=1):
         self.progress_callback = progress_callback
         self.cancel_callback = cancel_callback
         self.is_cancelled = False
         self.start_time = None
         self.model = None  # 모델 캐싱을 위한 변수
+        self.model_name = None
+        self.feature_stage = feature_stage or FeatureStage()  # 멜 특징 캐시 (여러 변환기가 공유 가능)
         self.progress_timer = None
         self.current_stage = "대기 중"
         self.stage_start_time = None
         self.audio_duration = None
+        self.profile = PerformanceProfile()  # 호스트별 실측 속도 (자동 모드에서 사용)
+        self.selective_stats = None  # 마지막 선택적 재변환 통계
+        self.repetition_stats = new_repetition_stats()  # 마지막 작업의 반복 루프 감지 통계
+        self.encoder_stats = new_encoder_stats()  # 마지막 작업의 인코더 실행/재사용 통계
+        self.preallocate_kv_cache = preallocate_kv_cache  # 디코더 KV 캐시를 고정 용량 버퍼로 실행
+        self.kv_stats = new_kv_stats()  # 마지막 작업의 KV 캐시 버퍼 할당/재사용 통계
+        self.hardware = get_hardware_profile()  # 캐시된 하드웨어 프로필 (장치/스레드 결정)
+        self.memory_planner = MemoryPlanner(hardware=self.hardware)  # 모델 로드 전 메모리 검사
+        self.memory_plan = None
+        self.memory_tracker = None
+        self.last_peak_memory = None  # 마지막 작업의 최대 메모리 사용량
+        self.last_segments = None  # 마지막 작업의 세그먼트 목록 (시작/끝 시각, 텍스트)
+        self.search_index = search_index or SearchIndex()  # 변환 결과 전문 검색 색인
+        self.metrics = MetricsCollector(self.hardware.device)  # 실시간 성능 지표
+        self.metrics_callback = metrics_callback  # 작업 중 1초마다 지표 스냅샷 전달
+        self.job_history = job_history or JobHistory()  # 작업 이력 (예상 시간 계산, 처리량 추이)
+        self.job = None  # 현재 작업의 이력 기록용 정보
+        self.stage_timings = {}  # 현재 작업의 단계별 소요 시간 (초)
+        self.predicted_seconds = None  # 이력으로 계산한 현재 작업의 예상 소요 시간
+        self.compile_model = compile_model  # 모델 로드 후 인코더/디코더를 컴파일된 실행으로 교체
+        self.compile_report = None  # 마지막 컴파일 결과
+        self.temperature_fallback = temperature_fallback  # 어려운 창을 온도를 올려 다시 디코딩
+        self.concurrent_jobs = concurrent_jobs  # 같은 프로세스에서 동시에 변환하는 변환기 수 (CPU 스레드 분배)
         
-    def convert_audio(self, audio_path, output_path, model_size, optimize_speed=True):
-        """음성 파일을 텍스트로 변환"""
+    def convert_audio(self, audio_path, output_path, model_size, optimize_speed=True, deadline_seconds=None,
+                      selective_redecode=False):
+        """음성 파일을 텍스트로 변환 (model_size가 "auto"면 목표 시간에 맞춰 자동 선택)
+
+        selective_redecode가 True면 전체를 그리디로 변환한 뒤 약한 구간만 빔 검색으로 다시 변환합니다.
+        """
+        if model_size == AUTO_MODEL:
+            return self.convert_audio_auto(audio_path, output_path, deadline_seconds)
         try:
             self.start_time = time.time()
+            self._begin_job(audio_path, model_size, optimize_speed, selective_redecode)
             self.is_cancelled = False
+            self.memory_tracker = PeakMemoryTracker().start()
+            self._begin_metrics()
             
             # 진행률 추적을 위한 변수 초기화
             self.last_percentage = 0
@@ -33,20 +94,24 @@ class WhisperConverter:
             if self._is_cancelled():
                 return None
             
+            # 로드 전에 메모리가 충분한지 확인 (부족하면 여기서 이유와 함께 중단)
+            batch_size = REDECODE_BEAM_SIZE if selective_redecode else 1
+            memory_plan = self._plan_memory(model_size, batch_size)
+            device = memory_plan.device
+            self.job["device"] = device
+            if memory_plan.changes:
+                self._update_stage_progress(f"⚠️ 메모리 계획 조정: {', '.join(memory_plan.changes)}", 5)
+            
             # 모델이 이미 로드되어 있지 않거나 다른 모델인 경우에만 로드
-            if self.model is None or not hasattr(self.model, 'name') or self.model.name != model_size:
-                self.model = whisper.load_model(model_size)
+            if self._load_model(model_size, device):
                 self._update_stage_progress("✅ 모델 로드 완료", 15)
             else:
                 self._update_stage_progress("✅ 캐시된 모델 사용", 15)
             
             # 2단계: GPU 설정 및 최적화 (15-25%)
             self._start_stage("시스템 설정", 15, 25)
-            device = "cuda" if torch.cuda.is_available() else "cpu"
             self._update_stage_progress(f"🚀 {device.upper()}에서 모델을 실행 중...", 20)
             
-            self.model = self.model.to(device)
-            
             # GPU 메모리 최적화
             if device == "cuda":
                 torch.cuda.empty_cache()
@@ -61,30 +126,20 @@ class WhisperConverter:
             self._start_stage("옵션 설정", 25, 30)
             self._update_stage_progress("⚙️ 변환 옵션을 설정하는 중...", 27)
             
-            transcribe_options = {
-                "language": "ko",
-                "verbose": False,
-                "fp16": device == "cuda",  # GPU에서 16비트 정밀도 사용
-                "temperature": 0.0,  # 결정적 출력으로 속도 향상
-                "compression_ratio_threshold": 2.4,  # 압축 비율 임계값
-                "logprob_threshold": -1.0,  # 로그 확률 임계값
-                "no_speech_threshold": 0.6,  # 무음 임계값
-            }
-            
-            # 속도 최적화 옵션 추가
+            transcribe_options = self.build_transcribe_options(device, optimize_speed, self.temperature_fallback)
             if optimize_speed:
-                transcribe_options.update({
-                    "beam_size": 1,  # 빔 검색 크기 최소화
-                    "best_of": 1,    # 최적 후보 수 최소화
-                    "patience": 1,   # 빔 검색 인내심 최소화
-                })
                 self._update_stage_progress("⚡ 속도 최적화 옵션 적용", 30)
             else:
                 self._update_stage_progress("🎯 정확도 우선 옵션 적용", 30)
             
-            # 4단계: 음성 파일 분석 (30-35%)
+            # 4단계: 음성 파일 분석 (30-35%) - 멜 특징은 캐시에서 재사용
             self._start_stage("파일 분석", 30, 35)
             self._update_stage_progress("🎵 음성 파일을 분석하는 중...", 32)
+            mel = self.feature_stage.get_mel_tensor(audio_path, self.model.dims.n_mels)
+            self.audio_duration = FeatureStage.mel_duration(mel)
+            self.metrics.audio_duration = self.audio_duration
+            self._predict_job_seconds()
+            self._update_stage_progress(f"🎼 음성 특징 준비 완료 ({self._format_time(self.audio_duration)} 분량)", 35)
             if self._is_cancelled():
                 return None
             
@@ -95,10 +150,25 @@ class WhisperConverter:
             # 실시간 진행률 업데이트를 위한 타이머 시작
             self._start_progress_timer(40, 90)
             
-            result = self.model.transcribe(audio_path, **transcribe_options)
+            transcribe_start = time.time()
+            # 디코딩 중 반복 루프를 감지하면 해당 창을 바로 끝냄
+            self.kv_stats = new_kv_stats()
+            with repetition_guard() as self.repetition_stats, reuse_encoder_features() as self.encoder_stats, \
+                    self._decoder_kv_cache(), self.metrics.track():
+                if selective_redecode:
+                    result = self._transcribe_selective(audio_path, mel, device)
+                    if result is None:
+                        self._stop_progress_timer()
+                        return None
+                else:
+                    with precomputed_mel(mel, N_SAMPLES):
+                        result = self.model.transcribe(audio_path, **transcribe_options)
+                    self.profile.record(device, model_size, optimize_speed, self.audio_duration, time.time() - transcribe_start)
             
             # 타이머 정지
             self._stop_progress_timer()
+            self._report_repetition()
+            self._report_encoder_reuse()
             
             if self._is_cancelled():
                 return None
@@ -115,18 +185,357 @@ class WhisperConverter:
             self._update_stage_progress("💾 결과를 파일에 저장하는 중...", 97)
             with open(output_path, "w", encoding="utf-8") as f:
                 f.write(cleaned_text)
+            self.last_segments = result["segments"]
+            self._index_transcript(output_path, self.last_segments)
             
+            self._finish_memory_tracking(record=True)
+            self.job["status"] = STATUS_DONE
             self._update_stage_progress("🎉 변환 완료!", 100)
             return cleaned_text
             
         except Exception as e:
             self._stop_progress_timer()
+            self.job.update(status=STATUS_FAILED, error=str(e))
+            self._update_progress(f"❌ 오류 발생: {str(e)}", 0)
+            raise e
+        finally:
+            self._finish_memory_tracking(record=False)
+            self._end_metrics()
+            self._record_job()
+    
+    def convert_audio_auto(self, audio_path, output_path, deadline_seconds):
+        """목표 완료 시간 안에 끝나는 가장 정확한 설정을 골라 구간 단위로 변환
+
+        구간이 끝날 때마다 실제 처리 속도로 남은 구간의 계획을 다시 세우고,
+        늦어지면 더 빠른 모델/옵션으로 전환합니다.
+        """
+        try:
+            self.start_time = time.time()
+            self._begin_job(audio_path, AUTO_MODEL, True, False)
+            self.is_cancelled = False
+            self.last_percentage = 0
+            self.last_elapsed_time = 0
+            self.memory_tracker = PeakMemoryTracker().start()
+            self._begin_metrics()
+            device = self.hardware.device
+            
+            # 1단계: 음성 길이 파악 (0-10%)
+            self._start_stage("파일 분석", 0, 10)
+            self._update_stage_progress("🎵 음성 파일을 분석하는 중...", 5)
+            # 모델을 고르기 전이므로 멜을 계산하지 않고 _begin_job에서 ffprobe로 읽은 길이를 씀
+            # (ffprobe가 없으면 로드된 모델 기준 멜로 계산)
+            self.audio_duration = self.job["audio_duration"]
+            if self.audio_duration is None:
+                n_mels = self.model.dims.n_mels if self.model is not None else 80
+                self.audio_duration = FeatureStage.mel_duration(self.feature_stage.get_mel(audio_path, n_mels))
+            self.metrics.audio_duration = self.audio_duration
+            if deadline_seconds is None:
+                deadline_seconds = self.audio_duration  # 기본값: 실시간보다 느리지 않게
+            if self._is_cancelled():
+                return None
+            
+            # 2단계: 설정 선택 (10-15%)
+            # 구간 경계는 앞뒤로 겹쳐 디코딩하므로 계획은 실제로 디코딩할 음성 길이로 세움
+            self._start_stage("자동 선택", 10, 15)
+            chunks = plan_chunks(self.audio_duration)
+            planner = AutoPlanner(self.profile, device)
+            plan = planner.plan(sum(chunk.decode_duration for chunk in chunks), deadline_seconds,
+                                loaded_model=self.model_name)
+            # 이력은 "auto"가 아닌 실제로 고른 설정으로 기록해야 같은 설정의 예상 시간에 쓰임
+            self._set_job_config(plan, device)
+            self.job["model_loaded"] = self.model is not None and self.model_name == plan.model_size
+            self._predict_job_seconds()
+            if plan.meets_deadline:
+                self._update_stage_progress(f"🤖 자동 선택: {plan.describe()}", 15)
+            else:
+                self._update_stage_progress(f"⚠️ 목표 시간 내 완료가 어려워 가장 빠른 설정 사용: {plan.describe()}", 15)
+            
+            # 3단계: 구간별 변환 (15-95%)
+            self._start_stage("음성 변환", 15, 95)
+            self.repetition_stats = new_repetition_stats()
+            self.encoder_stats = new_encoder_stats()
+            self.kv_stats = new_kv_stats()
+            segments = []
+            config_audio = 0.0  # 현재 설정으로 디코딩한 음성 길이
+            config_time = 0.0   # 현재 설정으로 처리하는 데 걸린 시간
+            for index, chunk in enumerate(chunks):
+                if self._is_cancelled():
+                    return None
+                
+                if self.model_name != plan.model_size:
+                    # 메모리에 들어가지 않으면 더 작은 모델로 낮춤
+                    memory_plan = self._plan_memory(plan.model_size, allow_model_downgrade=True)
+                    if memory_plan.device != device:
+                        # 장치가 바뀌면 처리 속도 기준도 바뀌므로 새 장치의 프로필로 계획
+                        device = memory_plan.device
+                        planner = AutoPlanner(self.profile, device)
+                        config_audio = 0.0
+                        config_time = 0.0
+                    if memory_plan.changes:
+                        self._update_progress(f"⚠️ 메모리 계획 조정: {', '.join(memory_plan.changes)}", self.last_percentage)
+                        plan = Plan(memory_plan.model_size, plan.optimize_speed, plan.estimated_seconds, plan.meets_deadline)
+                if self._load_model(plan.model_size, device):
+                    self._update_progress(f"📥 {plan.model_size} 모델 로드 완료", self.last_percentage)
+                mel = self.feature_stage.get_mel_tensor(audio_path, self.model.dims.n_mels)
+                options = self.build_transcribe_options(device, plan.optimize_speed, self.temperature_fallback)
+                
+                chunk_start = time.time()
+                with repetition_guard(self.repetition_stats), reuse_encoder_features(self.encoder_stats), \
+                        self._decoder_kv_cache(), self.metrics.track():
+                    segments += transcribe_chunk(self.model, audio_path, mel, chunk, options)
+                chunk_time = time.time() - chunk_start
+                config_audio += chunk.decode_duration
+                config_time += chunk_time
+                chunk_plan = plan
+                self._set_job_config(chunk_plan, device)
+                
+                # 진행 속도에 맞춰 남은 구간 재계획
+                # (관측 속도를 프로필 기대값과 비교하므로 이번 구간을 프로필에 반영하기 전에 계산)
+                elapsed = time.time() - self.start_time
+                remaining_audio = sum(rest.decode_duration for rest in chunks[index + 1:])
+                if remaining_audio > 0:
+                    new_plan = planner.replan(plan, config_audio, config_time, remaining_audio, deadline_seconds - elapsed)
+                    if (new_plan.model_size, new_plan.optimize_speed) != (plan.model_size, plan.optimize_speed):
+                        self._update_progress(f"🔁 처리 속도에 맞춰 재계획: {new_plan.describe()}", self.last_percentage)
+                        plan = new_plan
+                        config_audio = 0.0
+                        config_time = 0.0
+                self.profile.record(device, chunk_plan.model_size, chunk_plan.optimize_speed, chunk.decode_duration,
+                                    chunk_time)
+                
+                percentage = 15 + int(80 * chunk.end / self.audio_duration)
+                self._update_progress(
+                    f"🔄 음성 변환 중... {self._format_time(chunk.end)} / {self._format_time(self.audio_duration)} "
+                    f"({plan.model_size})",
+                    percentage
+                )
+            
+            self._report_repetition()
+            self._report_encoder_reuse()
+            
+            # 4단계: 파일 저장 (95-100%)
+            self._start_stage("파일 저장", 95, 100)
+            cleaned_text = join_segments(segments)
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(cleaned_text)
+            self.last_segments = segments
+            self._index_transcript(output_path, segments)
+            
+            self._finish_memory_tracking(record=True)
+            self.job["status"] = STATUS_DONE
+            self._update_stage_progress("🎉 변환 완료!", 100)
+            return cleaned_text
+            
+        except Exception as e:
+            self.job.update(status=STATUS_FAILED, error=str(e))
             self._update_progress(f"❌ 오류 발생: {str(e)}", 0)
             raise e
+        finally:
+            self._finish_memory_tracking(record=False)
+            self._end_metrics()
+            self._record_job()
+    
+    def _transcribe_selective(self, audio_path, mel, device):
+        """그리디 변환 후 약한 세그먼트만 빔 검색으로 재변환 (transcribe() 결과 형태로 반환)"""
+        redecode_options = self.build_transcribe_options(device, False, self.temperature_fallback)
+        # 메모리 계획에서 빔 크기를 줄였다면 그 값을 따름
+        beam_size = self.memory_plan.batch_size if self.memory_plan else REDECODE_BEAM_SIZE
+        redecode_options.update({"beam_size": beam_size, "best_of": beam_size})
+        
+        def on_progress(message, done, total):
+            # 재변환 단계에 들어서면 가짜 진행률 대신 실제 진행률 표시
+            self._stop_progress_timer()
+            self._update_progress(message, max(self.last_percentage, 60 + int(30 * done / max(total, 1))))
+        
+        redecoder = SelectiveRedecoder(
+            self.model,
+            greedy_options=self.build_transcribe_options(device, True, self.temperature_fallback),
+            redecode_options=redecode_options,
+            progress_callback=on_progress,
+            cancel_callback=self._is_cancelled
+        )
+        segments, stats = redecoder.run(audio_path, mel, self.audio_duration)
+        self.selective_stats = stats
+        if segments is None:
+            return None
+        
+        self._update_progress(
+            f"📊 정밀 재변환: 음성의 {stats['redecoded_fraction'] * 100:.1f}% "
+            f"({stats['spans']}개 구간, {stats['accepted_spans']}개 교체)",
+            self.last_percentage
+        )
+        return {"text": " ".join(seg["text"] for seg in segments), "segments": segments}
+    
+    def _begin_metrics(self):
+        """작업 지표 초기화 (콜백이 있으면 1초마다 샘플링 시작)"""
+        self.metrics.reset()
+        if self.metrics_callback:
+            self.metrics.start_sampling(self.metrics_callback)
+    
+    def _end_metrics(self):
+        """샘플링을 멈추고 마지막 지표를 한 번 전달"""
+        self.metrics.stop_sampling()
+        if self.metrics_callback:
+            self.metrics_callback(self.metrics.snapshot())
+    
+    def get_metrics_snapshot(self):
+        """현재 작업의 성능 지표 (헤드리스 실행에서 직접 조회용)"""
+        return self.metrics.snapshot()
+    
+    def _begin_job(self, audio_path, model_size, optimize_speed, selective):
+        """작업 이력 기록 준비 및 첫 예상 시간 계산 (음성 길이는 ffprobe로 미리 읽음)"""
+        device = self.hardware.device
+        self.job = {
+            "audio_path": os.path.abspath(audio_path),
+            "model": model_size,
+            "optimize_speed": optimize_speed,
+            "selective": selective,
+            "device": device,
+            "model_loaded": self.model is not None and self.model_name == model_size,
+            "audio_duration": probe_duration(audio_path),
+            "status": STATUS_CANCELLED,  # 완료/오류 시 바뀌고 그대로 끝나면 취소로 기록
+            "error": None,
+        }
+        self.stage_timings = {}
+        self.stage_start_time = None
+        self.audio_duration = None
+        self.predicted_seconds = None
+        self._predict_job_seconds()
+    
+    def _set_job_config(self, plan, device):
+        """자동 모드에서 실제로 사용한 모델/옵션/장치를 작업 이력에 반영 (재계획 시 마지막 설정)"""
+        self.job.update(model=plan.model_size, optimize_speed=plan.optimize_speed, device=device)
+    
+    def _predict_job_seconds(self):
+        """같은 설정의 이력으로 작업 예상 소요 시간 갱신 (멜 특징으로 정확한 길이를 알면 다시 계산)"""
+        job = self.job
+        if self.audio_duration:
+            job["audio_duration"] = self.audio_duration
+        try:
+            predicted = self.job_history.estimate(
+                job["audio_duration"], job["model"], job["device"], job["optimize_speed"], job["selective"],
+                model_loaded=job["model_loaded"]
+            )
+        except sqlite3.Error:
+            predicted = None
+        if predicted is not None:
+            self.predicted_seconds = predicted
+    
+    def _close_stage(self):
+        """진행 중인 단계의 소요 시간 누적"""
+        if self.stage_start_time is not None:
+            elapsed = time.time() - self.stage_start_time
+            self.stage_timings[self.current_stage] = self.stage_timings.get(self.current_stage, 0.0) + elapsed
+            self.stage_start_time = None
+    
+    def _record_job(self):
+        """작업 한 건을 이력에 기록 (기록 실패는 변환 실패로 보지 않음)"""
+        if self.job is None:
+            return
+        self._close_stage()
+        job, self.job = self.job, None
+        try:
+            self.job_history.record(
+                self.start_time, job["status"], job["audio_path"], job["audio_duration"], job["model"],
+                job["optimize_speed"], job["selective"], job["device"],
+                self.hardware.use_fp16(job["device"]), self.stage_timings, self.last_peak_memory, job["error"]
+            )
+        except sqlite3.Error as e:
+            self._update_progress(f"⚠️ 작업 이력 기록 실패: {e}", self.last_percentage)
+    
+    def _report_repetition(self):
+        """반복 루프를 잘라낸 경우 알림"""
+        stats = self.repetition_stats
+        if stats["loops"]:
+            self._update_progress(
+                f"🔁 반복 루프 {stats['loops']}회 차단 (디코딩 최대 {stats['saved_steps']}단계 절약, "
+                f"반복 토큰 {stats['dropped_tokens']}개 제거)",
+                self.last_percentage
+            )
+    
+    def _decoder_kv_cache(self):
+        """설정에 맞는 디코더 KV 캐시 컨텍스트 (고정 용량 캐시를 쓰지 않으면 whisper 기본 방식)"""
+        if self.preallocate_kv_cache:
+            return preallocated_kv_cache(self.kv_stats)
+        return nullcontext(self.kv_stats)
+    
+    def _report_encoder_reuse(self):
+        """온도 재시도에서 인코더 실행을 생략한 경우 알림"""
+        stats = self.encoder_stats
+        if stats["reused"]:
+            self._update_progress(
+                f"♻️ 재시도에서 인코더 실행 {stats['reused']}회 생략 (인코더 실행 {stats['encoder_passes']}회)",
+                self.last_percentage
+            )
+    
+    def _index_transcript(self, output_path, segments):
+        """저장한 결과를 검색 색인에 반영 (색인 실패는 변환 실패로 보지 않음)"""
+        try:
+            self.search_index.add_transcript(output_path, segments)
+        except sqlite3.Error as e:
+            self._update_progress(f"⚠️ 검색 색인 갱신 실패: {e}", self.last_percentage)
+    
+    def _plan_memory(self, model_size, batch_size=1, allow_model_downgrade=False):
+        """모델 로드 전 메모리 계획 (이미 로드된 모델이 차지한 메모리는 재사용 가능으로 계산)"""
+        loaded_bytes = 0
+        if self.model is not None:
+            loaded_bytes = sum(p.numel() * p.element_size() for p in self.model.parameters())
+        self.memory_plan = self.memory_planner.plan(
+            model_size,
+            self.hardware.device,
+            batch_size=batch_size,
+            allow_model_downgrade=allow_model_downgrade,
+            loaded_bytes=loaded_bytes
+        )
+        return self.memory_plan
+    
+    def _finish_memory_tracking(self, record):
+        """최대 메모리 사용량 측정 종료 (성공한 작업이면 추정치 보정에 반영)"""
+        if self.memory_tracker is None:
+            return
+        tracker = self.memory_tracker.stop()
+        self.memory_tracker = None
+        self.last_peak_memory = {"rss_bytes": tracker.peak_rss, "vram_bytes": tracker.peak_vram}
+        if record and self.memory_plan is not None:
+            self.memory_planner.record(self.memory_plan.estimate, tracker.peak_rss, tracker.peak_vram)
+    
+    def _load_model(self, model_size, device):
+        """필요한 경우에만 모델을 로드하고 장치로 이동 (새로 로드했으면 True)"""
+        if self.model is not None and self.model_name == model_size:
+            self.model = self.model.to(device)
+            return False
+        
+        # 새 모델을 읽기 전에 기존 모델을 먼저 해제해 최대 사용량을 줄임
+        if self.model is not None:
+            self.clear_model_cache()
+        load_start = time.time()
+        if device == "cpu":
+            configure_torch_threads(self.hardware, self.concurrent_jobs)
+        self.model = whisper.load_model(model_size, device=device)
+        self.model_name = model_size
+        self.profile.record_load_time(device, model_size, time.time() - load_start)
+        if self.compile_model:
+            self._compile_model(model_size, device)
+        return True
+    
+    def _compile_model(self, model_size, device):
+        """인코더/디코더를 컴파일된 실행으로 교체 (실패한 부분은 즉시 실행으로 계속)"""
+        self._update_progress("⚙️ 컴파일된 실행을 준비하는 중... (처음 한 번은 오래 걸릴 수 있습니다)", self.last_percentage)
+        report = enable_compiled(self.model, model_size, device, self.hardware.use_fp16(device))
+        self.compile_report = report
+        self._update_progress(
+            f"⚙️ 컴파일 실행 준비 완료 (인코더 {report['encoder']}, 디코더 {report['decoder']}, "
+            f"{report['compile_seconds']:.1f}초)",
+            self.last_percentage
+        )
+        for error in report["errors"]:
+            self._update_progress(f"⚠️ 컴파일 실패, 즉시 실행 사용: {error}", self.last_percentage)
     
     def _start_stage(self, stage_name, start_percent, end_percent):
         """새로운 단계 시작"""
+        self._close_stage()
         self.current_stage = stage_name
+        self.metrics.set_stage(stage_name)
         self.stage_start_time = time.time()
         self.stage_start_percent = start_percent
         self.stage_end_percent = end_percent
@@ -215,6 +624,11 @@ class WhisperConverter:
                 # 첫 번째 업데이트인 경우
                 estimated_remaining = (elapsed_time / percentage * 100) - elapsed_time if percentage > 0 else 0
             
+            # 같은 설정의 이력이 있으면 첫 순간부터 이력 기반 예상 시간 사용
+            # (예상보다 오래 걸리면 현재 진행 속도로 계산한 값으로 돌아감)
+            if self.predicted_seconds and elapsed_time < self.predicted_seconds:
+                estimated_remaining = self.predicted_seconds - elapsed_time
+            
             # 이전 값 저장
             self.last_percentage = percentage
             self.last_elapsed_time = elapsed_time
@@ -251,9 +665,36 @@ class WhisperConverter:
         if self.model is not None:
             del self.model
             self.model = None
+            self.model_name = None
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
     
+    @staticmethod
+    def build_transcribe_options(device, optimize_speed=True, temperature_fallback=False):
+        """장치와 최적화 여부에 맞는 transcribe() 옵션 생성 (temperature_fallback이면 온도 재시도 사용)"""
+        if temperature_fallback:
+            temperature = FAST_FALLBACK_TEMPERATURES if optimize_speed else FALLBACK_TEMPERATURES
+        else:
+            temperature = 0.0  # 결정적 출력으로 속도 향상
+        transcribe_options = {
+            "language": "ko",
+            "verbose": False,
+            "fp16": get_hardware_profile().use_fp16(device),  # GPU에서 16비트 정밀도 사용
+            "temperature": temperature,
+            "compression_ratio_threshold": 2.4,  # 압축 비율 임계값
+            "logprob_threshold": -1.0,  # 로그 확률 임계값
+            "no_speech_threshold": 0.6,  # 무음 임계값
+        }
+        
+        # 속도 최적화 옵션 추가
+        if optimize_speed:
+            transcribe_options.update({
+                "beam_size": 1,  # 빔 검색 크기 최소화
+                "best_of": 1,    # 최적 후보 수 최소화
+                "patience": 1,   # 빔 검색 인내심 최소화
+            })
+        return transcribe_options
+    
     @staticmethod
     def get_optimization_tips():
         """속도 최적화 팁 반환"""
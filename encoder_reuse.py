@@ -0,0 +1,78 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import torch
+
+from whisper_hooks import audio_features_cache
+
+# 창별로 보관하는 인코더 특징 수 (온도 재시도는 같은 창을 연달아 쓰므로 작아도 충분)
+MAX_CACHED_WINDOWS = 4
+
+
+def new_encoder_stats():
+    """인코더 재사용 통계 초기값"""
+    return {"encoder_passes": 0, "reused": 0}
+
+
+class EncoderFeatureCache:
+    """창(멜 구간)별 인코더 출력 캐시
+
+    같은 텐서 객체면 바로, 다른 객체라도 크기/장치/자료형이 같으면 내용을 비교해 찾습니다.
+    멜 비교(약 1MB)는 인코더 실행에 비해 무시할 만한 비용입니다.
+    """
+
+    def __init__(self, stats, max_windows=MAX_CACHED_WINDOWS):
+        self.stats = stats
+        self.max_windows = max_windows
+        self._entries = OrderedDict()  # 일련번호 → (멜, fp16, 특징)
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def _find(self, mel, fp16):
+        for key, (cached_mel, cached_fp16, features) in reversed(self._entries.items()):
+            if cached_fp16 != fp16:
+                continue
+            if cached_mel is mel or (cached_mel.shape == mel.shape and cached_mel.dtype == mel.dtype
+                                     and cached_mel.device == mel.device and torch.equal(cached_mel, mel)):
+                self._entries.move_to_end(key)
+                return features
+        return None
+
+    def get(self, mel, fp16, compute):
+        """mel에 대한 인코더 특징 반환 (없으면 compute()로 계산해 보관)"""
+        with self._lock:
+            features = self._find(mel, fp16)
+            if features is not None:
+                self.stats["reused"] += 1
+                return features
+
+        features = compute()
+        with self._lock:
+            self.stats["encoder_passes"] += 1
+            self._entries[self._next_key] = (mel, fp16, features)
+            self._next_key += 1
+            while len(self._entries) > self.max_windows:
+                self._entries.popitem(last=False)
+        return features
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+@contextmanager
+def reuse_encoder_features(stats=None):
+    """현재 스레드의 transcribe()/decode()에서 창마다 인코더를 한 번만 실행
+
+    온도 재시도(temperature fallback)와 같은 창을 다시 디코딩하는 경우 계산해 둔 특징을 씁니다.
+    stats dict(new_encoder_stats 형식)에 인코더 실행 수와 생략한 실행 수가 누적됩니다.
+    블록이 끝나면 보관한 특징은 해제됩니다.
+    """
+    stats = stats if stats is not None else new_encoder_stats()
+    cache = EncoderFeatureCache(stats)
+    try:
+        with audio_features_cache(cache):
+            yield stats
+    finally:
+        cache.clear()
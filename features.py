@@ -0,0 +1,133 @@
+import os
+import threading
+import numpy as np
+import torch
+import whisper
+from whisper.audio import SAMPLE_RATE, N_FFT, HOP_LENGTH, N_SAMPLES, N_FRAMES
+
+from cache_utils import get_cache_dir, file_content_hash
+
+# 멜 계산 방식이 바뀌면 올려서 기존 캐시를 무효화
+FEATURE_VERSION = 1
+
+
+class FeatureStage:
+    """음성 디코딩과 로그-멜 스펙트로그램 계산을 담당하는 파이프라인 단계
+
+    멜 특징은 (오디오 해시, 멜 설정) 키로 디스크에 .npy로 저장되며
+    메모리 매핑으로 읽기 때문에 여러 모델/재실행에서 그대로 재사용됩니다.
+    """
+
+    def __init__(self, cache_dir=None, keep_audio=False):
+        self.cache_dir = cache_dir or get_cache_dir("mel")
+        # 디코딩된 PCM을 메모리에 보관할지 여부 (켜면 다 쓴 뒤 release_audio()로 직접 해제해야 함)
+        self.keep_audio = keep_audio
+        self._audio = {}
+        self._mel_memory = {}  # 미리 메모리에 올려 둔 멜 특징 (캐시 파일 경로 → 배열)
+        self._locks = {}
+        self._lock = threading.Lock()
+        self.stats = {"mel_hits": 0, "mel_misses": 0, "mel_memory_hits": 0, "audio_decodes": 0}
+
+    def _key_lock(self, key):
+        """키별 잠금 반환 (같은 파일을 동시에 두 번 계산하지 않도록)"""
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def feature_key(self, audio_path, n_mels):
+        """멜 특징 캐시 키 반환"""
+        audio_hash = file_content_hash(audio_path)
+        return f"{audio_hash}_v{FEATURE_VERSION}_sr{SAMPLE_RATE}_fft{N_FFT}_hop{HOP_LENGTH}_mel{n_mels}_pad{N_SAMPLES}"
+
+    def feature_path(self, audio_path, n_mels):
+        """멜 특징 캐시 파일 경로 반환"""
+        return os.path.join(self.cache_dir, self.feature_key(audio_path, n_mels) + ".npy")
+
+    def load_audio(self, audio_path):
+        """음성 파일을 16kHz 모노 float32 배열로 디코딩 (한 번만 수행)"""
+        audio_hash = file_content_hash(audio_path)
+        with self._key_lock(("audio", audio_hash)):
+            audio = self._audio.get(audio_hash)
+            if audio is None:
+                audio = whisper.load_audio(audio_path)
+                self.stats["audio_decodes"] += 1
+                if self.keep_audio:
+                    self._audio[audio_hash] = audio
+            return audio
+
+    def get_mel(self, audio_path, n_mels):
+        """로그-멜 스펙트로그램 반환 (캐시에 있으면 메모리 매핑으로 읽음)
+
+        반환값은 whisper.transcribe()와 동일하게 N_SAMPLES 만큼 무음 패딩이 포함된
+        (n_mels, n_frames) float32 배열입니다.
+        """
+        path = self.feature_path(audio_path, n_mels)
+        with self._key_lock(("mel", path)):
+            mel = self._mel_memory.get(path)
+            if mel is not None:
+                self.stats["mel_memory_hits"] += 1
+                return mel
+            if os.path.exists(path):
+                try:
+                    mel = np.load(path, mmap_mode="c")
+                    self.stats["mel_hits"] += 1
+                    return mel
+                except (OSError, ValueError):
+                    # 손상된 캐시 파일은 다시 계산
+                    os.remove(path)
+
+            audio = self.load_audio(audio_path)
+            mel = whisper.log_mel_spectrogram(torch.from_numpy(audio), n_mels, padding=N_SAMPLES)
+            mel = mel.cpu().numpy().astype(np.float32, copy=False)
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, mel)
+            os.replace(tmp_path, path)
+            self.stats["mel_misses"] += 1
+            return np.load(path, mmap_mode="c")
+
+    def get_mel_tensor(self, audio_path, n_mels):
+        """whisper에 바로 넘길 수 있는 CPU 텐서 형태의 멜 특징 반환"""
+        return torch.from_numpy(self.get_mel(audio_path, n_mels))
+
+    def preload_mel(self, audio_path, n_mels):
+        """멜 특징을 계산(또는 캐시에서 읽기)해 메모리에 올려 둠 (사용하는 바이트 수 반환)
+
+        디코딩한 PCM은 멜 계산 후 바로 해제합니다. release_mel()을 부를 때까지 유지됩니다.
+        """
+        mel = np.array(self.get_mel(audio_path, n_mels))  # 메모리 매핑을 실제 메모리로 읽어 들임
+        self.release_audio(audio_path)
+        path = self.feature_path(audio_path, n_mels)
+        with self._lock:
+            self._mel_memory[path] = mel
+        return mel.nbytes
+
+    def release_mel(self, audio_path=None):
+        """메모리에 올려 둔 멜 특징 해제"""
+        with self._lock:
+            if audio_path is None:
+                self._mel_memory.clear()
+            else:
+                prefix = file_content_hash(audio_path) + "_"
+                for path in [p for p in self._mel_memory if os.path.basename(p).startswith(prefix)]:
+                    del self._mel_memory[path]
+
+    def release_audio(self, audio_path=None):
+        """메모리에 보관한 PCM 해제"""
+        with self._lock:
+            if audio_path is None:
+                self._audio.clear()
+            else:
+                self._audio.pop(file_content_hash(audio_path), None)
+
+    def clear_disk_cache(self):
+        """디스크의 멜 특징 캐시 삭제"""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npy"):
+                os.remove(os.path.join(self.cache_dir, name))
+
+    @staticmethod
+    def mel_duration(mel):
+        """멜 특징에서 실제 음성 길이(초) 계산 (패딩 제외)"""
+        content_frames = max(mel.shape[-1] - N_FRAMES, 0)
+        return content_frames * HOP_LENGTH / SAMPLE_RATE
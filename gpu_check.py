@@ -3,6 +3,8 @@ import sys
 import subprocess
 import platform
 
+from hardware import get_hardware_profile
+
 def check_gpu_status():
     """GPU 상태를 자세히 확인하는 함수"""
     print("🔍 GPU 상태 확인 중...\n")
@@ -10,24 +12,22 @@ def check_gpu_status():
     # 1. PyTorch 버전 확인
     print(f"📦 PyTorch 버전: {torch.__version__}")
     
-    # 2. CUDA 사용 가능 여부
-    cuda_available = torch.cuda.is_available()
+    # 2. 하드웨어 프로필 새로 조사 (변환기/GUI가 사용하는 캐시도 갱신됨)
+    profile = get_hardware_profile(refresh=True)
+    for line in profile.summary_lines():
+        print(line)
+    
+    # 3. CUDA 사용 가능 여부
+    cuda_available = profile.device == "cuda"
     print(f"⚡ CUDA 사용 가능: {'✅ 예' if cuda_available else '❌ 아니오'}")
     
     if cuda_available:
-        # 3. CUDA 버전
+        # 4. CUDA 버전
         cuda_version = torch.version.cuda
         print(f"🔧 CUDA 버전: {cuda_version}")
         
-        # 4. GPU 개수
-        gpu_count = torch.cuda.device_count()
-        print(f"🎮 GPU 개수: {gpu_count}")
-        
-        # 5. 각 GPU 정보
-        for i in range(gpu_count):
-            gpu_name = torch.cuda.get_device_name(i)
-            gpu_memory = torch.cuda.get_device_properties(i).total_memory / 1024**3  # GB
-            print(f"   GPU {i}: {gpu_name} ({gpu_memory:.1f}GB)")
+        # 5. GPU 개수 (장치별 정보는 위 프로필 요약에 포함)
+        print(f"🎮 GPU 개수: {len(profile.cuda)}")
         
         # 6. 현재 GPU
         current_device = torch.cuda.current_device()
@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import ttk, filedialog, scrolledtext
 from pathlib import Path
 from ui_theme import InstagramStyleUI
+from metrics import format_metrics
 
 class FileSection:
     """파일 선택 섹션 컴포넌트"""
@@ -45,8 +46,10 @@ class FileSection:
 class ModelSection:
     """모델 선택 섹션 컴포넌트"""
     
-    def __init__(self, parent, row, model_size_var):
+    def __init__(self, parent, row, model_size_var, two_pass_var=None, deadline_var=None):
         self.colors = InstagramStyleUI.setup_style()
+        self.two_pass_var = two_pass_var
+        self.deadline_var = deadline_var
         self.create_section(parent, row, model_size_var)
     
     def create_section(self, parent, row, model_size_var):
@@ -73,6 +76,8 @@ class ModelSection:
             ("🎯 정확도 (medium)", "medium", self.colors['accent']),
             ("🏆 최고 정확도 (large)", "large", self.colors['primary'])
         ]
+        if self.deadline_var is not None:
+            model_sizes.append(("🤖 자동 (auto)", "auto", self.colors['secondary']))
         
         for i, (text, value, color) in enumerate(model_sizes):
             btn = tk.Radiobutton(model_frame, text=text, variable=model_size_var, 
@@ -82,13 +87,46 @@ class ModelSection:
                                activebackground=self.colors['surface'],
                                activeforeground=color)
             btn.grid(row=0, column=i, padx=(0, 15))
+        
+        # 2단계 변환 (초안 → 정제)
+        if self.two_pass_var is not None:
+            two_pass_check = tk.Checkbutton(card_frame,
+                                           text="✍️ 2단계 변환: base 초안을 먼저 보여주고 선택한 모델로 정제",
+                                           variable=self.two_pass_var,
+                                           font=("Arial", 10),
+                                           bg=self.colors['surface'],
+                                           fg=self.colors['text'],
+                                           selectcolor=self.colors['background'],
+                                           activebackground=self.colors['surface'],
+                                           activeforeground=self.colors['accent'])
+            two_pass_check.grid(row=2, column=0, sticky=tk.W, padx=15, pady=(0, 15))
+        
+        # 자동 모드의 목표 완료 시간
+        if self.deadline_var is not None:
+            deadline_frame = tk.Frame(card_frame, bg=self.colors['surface'])
+            deadline_frame.grid(row=3, column=0, sticky=tk.W, padx=15, pady=(0, 15))
+            tk.Label(deadline_frame, text="⏰ 자동 모드 목표 완료 시간(분):",
+                     font=("Arial", 10),
+                     fg=self.colors['text'],
+                     bg=self.colors['surface']).grid(row=0, column=0, sticky=tk.W)
+            tk.Entry(deadline_frame, textvariable=self.deadline_var, width=6,
+                     font=("Arial", 10),
+                     relief="flat",
+                     bg=self.colors['background'],
+                     fg=self.colors['text'],
+                     insertbackground=self.colors['primary']).grid(row=0, column=1, padx=(8, 0))
+            tk.Label(deadline_frame, text="측정된 처리 속도로 가장 정확한 모델/옵션을 고릅니다",
+                     font=("Arial", 9),
+                     fg=self.colors['text_secondary'],
+                     bg=self.colors['surface']).grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(5, 0))
 
 class OptimizationSection:
     """속도 최적화 섹션 컴포넌트"""
     
-    def __init__(self, parent, row, optimize_var):
+    def __init__(self, parent, row, optimize_var, selective_var=None):
         self.colors = InstagramStyleUI.setup_style()
         self.optimize_var = optimize_var
+        self.selective_var = selective_var
         self.create_section(parent, row)
     
     def create_section(self, parent, row):
@@ -128,6 +166,26 @@ class OptimizationSection:
                              fg=self.colors['text_secondary'],
                              bg=self.colors['surface'])
         desc_label.grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        
+        # 선택적 정밀 재변환 체크박스
+        if self.selective_var is not None:
+            selective_check = tk.Checkbutton(opt_frame,
+                                            text="🎯 약한 구간만 정밀 재변환",
+                                            variable=self.selective_var,
+                                            font=("Arial", 10),
+                                            bg=self.colors['surface'],
+                                            fg=self.colors['text'],
+                                            selectcolor=self.colors['background'],
+                                            activebackground=self.colors['surface'],
+                                            activeforeground=self.colors['accent'])
+            selective_check.grid(row=2, column=0, sticky=tk.W, pady=(10, 0))
+            
+            selective_desc = tk.Label(opt_frame,
+                                     text="빠르게 한 번 변환한 뒤 신뢰도가 낮은 부분만 빔 검색으로 다시 변환",
+                                     font=("Arial", 9),
+                                     fg=self.colors['text_secondary'],
+                                     bg=self.colors['surface'])
+            selective_desc.grid(row=3, column=0, sticky=tk.W, pady=(5, 0))
 
 class ProgressSection:
     """진행 상황 섹션 컴포넌트"""
@@ -139,6 +197,9 @@ class ProgressSection:
         self.percent_var = tk.StringVar(value="0%")
         self.progress = None
         self.status_label = None
+        self.pass_frame = None
+        self.pass_rows = {}
+        self.metrics_var = tk.StringVar(value="")
         self.create_section(parent, row)
     
     def create_section(self, parent, row):
@@ -204,6 +265,53 @@ class ProgressSection:
                                     fg=self.colors['text_secondary'],
                                     bg=self.colors['surface'])
         self.detail_label.grid(row=4, column=0, sticky=tk.W, pady=(5, 0))
+        
+        # 단계별(초안/정제) 진행 상황 - 2단계 변환 시에만 표시
+        self.pass_frame = tk.Frame(progress_frame, bg=self.colors['surface'])
+        self.pass_frame.grid_columnconfigure(1, weight=1)
+        for i, (pass_name, title) in enumerate([("draft", "✍️ 초안"), ("refine", "🎯 정제")]):
+            title_label = tk.Label(self.pass_frame, text=title,
+                                   font=("Arial", 9, "bold"),
+                                   fg=self.colors['text'],
+                                   bg=self.colors['surface'])
+            title_label.grid(row=i, column=0, sticky=tk.W, padx=(0, 10), pady=2)
+            bar = ttk.Progressbar(self.pass_frame, mode='determinate', length=250,
+                                  style='Custom.Horizontal.TProgressbar')
+            bar.grid(row=i, column=1, sticky=(tk.W, tk.E), pady=2)
+            message_var = tk.StringVar(value="")
+            message_label = tk.Label(self.pass_frame, textvariable=message_var,
+                                     font=("Arial", 9),
+                                     fg=self.colors['text_secondary'],
+                                     bg=self.colors['surface'])
+            message_label.grid(row=i, column=2, sticky=tk.W, padx=(10, 0), pady=2)
+            self.pass_rows[pass_name] = (bar, message_var)
+        
+        # 실시간 성능 지표 (처리 속도, 메모리 등 - 1초마다 갱신)
+        metrics_label = tk.Label(progress_frame, textvariable=self.metrics_var,
+                                 font=("Arial", 9),
+                                 fg=self.colors['accent'],
+                                 bg=self.colors['surface'])
+        metrics_label.grid(row=6, column=0, sticky=tk.W, pady=(5, 0))
+    
+    def show_passes(self, visible):
+        """단계별 진행 표시 영역 보이기/숨기기"""
+        if visible:
+            for bar, message_var in self.pass_rows.values():
+                bar.config(value=0)
+                message_var.set("")
+            self.pass_frame.grid(row=5, column=0, sticky=(tk.W, tk.E), pady=(10, 0))
+        else:
+            self.pass_frame.grid_remove()
+    
+    def update_pass(self, pass_name, done, total, message):
+        """단계별 진행률 업데이트"""
+        bar, message_var = self.pass_rows[pass_name]
+        bar.config(value=(done / total * 100) if total else 0)
+        message_var.set(message)
+    
+    def update_metrics(self, snapshot):
+        """성능 지표 표시 갱신 (None이면 지움)"""
+        self.metrics_var.set(f"📈 {format_metrics(snapshot)}" if snapshot else "")
 
 class ResultSection:
     """결과 섹션 컴포넌트"""
@@ -211,6 +319,7 @@ class ResultSection:
     def __init__(self, parent, row):
         self.colors = InstagramStyleUI.setup_style()
         self.result_text = None
+        self.chunk_indices = []  # 2단계 변환에서 표시 중인 구간 번호
         self.create_section(parent, row)
     
     def create_section(self, parent, row):
@@ -244,4 +353,34 @@ class ResultSection:
             relief="flat",
             insertbackground=self.colors['primary']
         )
-        self.result_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S)) 
\ No newline at end of file
+        self.result_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.result_text.tag_configure("draft", foreground=self.colors['text_secondary'])
+        self.result_text.tag_configure("refined", foreground=self.colors['text'])
+    
+    def clear(self):
+        """결과 영역 비우기"""
+        self.result_text.delete(1.0, tk.END)
+        self.chunk_indices = []
+    
+    def set_chunk_text(self, index, text, refined=False):
+        """구간 텍스트를 제자리에 삽입/교체 (초안은 회색, 정제 결과는 기본 색)"""
+        chunk_tag = f"chunk{index}"
+        style_tag = "refined" if refined else "draft"
+        line = (text or "…") + "\n"
+        
+        ranges = self.result_text.tag_ranges(chunk_tag)
+        if ranges:
+            # 기존 구간 교체
+            start = self.result_text.index(ranges[0])
+            self.result_text.delete(ranges[0], ranges[-1])
+            self.result_text.insert(start, line, (chunk_tag, style_tag))
+            return
+        
+        # 시간 순서를 유지하도록 다음 구간 앞에 삽입
+        position = tk.END
+        for other in sorted(self.chunk_indices):
+            if other > index:
+                position = self.result_text.index(self.result_text.tag_ranges(f"chunk{other}")[0])
+                break
+        self.result_text.insert(position, line, (chunk_tag, style_tag))
+        self.chunk_indices.append(index) 
\ No newline at end of file
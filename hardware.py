@@ -0,0 +1,306 @@
+import os
+import sys
+import time
+import socket
+import platform
+import resource
+import subprocess
+import threading
+
+import torch
+
+from cache_utils import get_cache_dir, atomic_write_json, read_json
+
+# 디스크 캐시 유효 시간 (초) - 하드웨어 구성은 자주 바뀌지 않음
+PROFILE_TTL_SECONDS = 24 * 3600
+# 캐시 형식이 바뀌면 올려서 기존 캐시를 무효화
+PROFILE_VERSION = 2
+# 보이는 GPU를 바꾸는 환경 변수 (값이 달라지면 캐시를 다시 조사)
+CUDA_VISIBLE_ENV = "CUDA_VISIBLE_DEVICES"
+
+# 변환 속도에 영향을 주는 SIMD 확장 (리눅스 /proc/cpuinfo 플래그 이름 기준)
+SIMD_FLAGS = ("sse4_2", "avx", "avx2", "fma", "f16c", "avx512f", "avx512_vnni", "avx512_bf16", "amx_tile", "neon", "asimd")
+
+# 모델 크기별 권장 최소 메모리 (GB, 가중치 + 여유분)
+MODEL_MEMORY_GB = {"large": 10.0, "medium": 5.0, "small": 2.0, "base": 1.0}
+
+_profile = None
+_profile_lock = threading.Lock()
+
+
+def _read_proc_file(path):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    except OSError:
+        return ""
+
+
+def _probe_cpu():
+    """CPU 코어 수, 모델명, SIMD 확장 조사"""
+    logical = os.cpu_count() or 1
+    physical = None
+    model_name = platform.processor() or platform.machine()
+    flags = set()
+
+    cpuinfo = _read_proc_file("/proc/cpuinfo")
+    if cpuinfo:
+        cores = set()
+        physical_id = core_id = None
+        for line in cpuinfo.splitlines():
+            key, _, value = line.partition(":")
+            key = key.strip()
+            value = value.strip()
+            if key == "model name":
+                model_name = value
+            elif key in ("flags", "Features"):
+                flags.update(value.split())
+            elif key == "physical id":
+                physical_id = value
+            elif key == "core id":
+                core_id = value
+                cores.add((physical_id, core_id))
+        physical = len(cores) or None
+    elif sys.platform == "darwin":
+        try:
+            output = subprocess.run(["sysctl", "-n", "machdep.cpu.brand_string", "hw.physicalcpu"],
+                                    capture_output=True, text=True, timeout=2).stdout.split("\n")
+            model_name = output[0].strip() or model_name
+            physical = int(output[1])
+        except (OSError, ValueError, IndexError, subprocess.TimeoutExpired):
+            pass
+        if platform.machine() == "arm64":
+            flags.add("neon")
+
+    # 컨테이너/affinity 제한 반영
+    if hasattr(os, "sched_getaffinity"):
+        logical = len(os.sched_getaffinity(0)) or logical
+
+    return {
+        "model": model_name,
+        "logical_cores": logical,
+        "physical_cores": min(physical or logical, logical),
+        "simd": sorted(flag for flag in SIMD_FLAGS if flag in flags),
+    }
+
+
+def _meminfo():
+    """리눅스 /proc/meminfo 값 (바이트)"""
+    values = {}
+    for line in _read_proc_file("/proc/meminfo").splitlines():
+        key, _, value = line.partition(":")
+        parts = value.split()
+        if parts:
+            values[key] = int(parts[0]) * 1024
+    return values
+
+
+def available_ram_bytes():
+    """현재 사용 가능한 RAM (바이트)"""
+    info = _meminfo()
+    if "MemAvailable" in info:
+        return info["MemAvailable"]
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _probe_ram():
+    """전체 RAM 조사"""
+    total = _meminfo().get("MemTotal")
+    if total is None:
+        try:
+            total = os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+        except (ValueError, OSError, AttributeError):
+            total = None
+    return {"total_bytes": total, "available_bytes": available_ram_bytes()}
+
+
+def cuda_free_bytes(index=0):
+    """CUDA 장치의 현재 여유 메모리 (바이트)"""
+    if not torch.cuda.is_available():
+        return None
+    free, _ = torch.cuda.mem_get_info(index)
+    return free
+
+
+def _cuda_signature():
+    """현재 프로세스에서 보이는 CUDA 구성 (캐시 유효성 확인용)
+
+    드라이버가 빠지거나 CUDA_VISIBLE_DEVICES가 바뀌면 값이 달라집니다.
+    """
+    available = torch.cuda.is_available()
+    return {
+        "visible_devices": os.environ.get(CUDA_VISIBLE_ENV),
+        "available": available,
+        "device_count": torch.cuda.device_count() if available else 0,
+    }
+
+
+def _probe_cuda():
+    """CUDA 장치 목록과 여유 메모리 조사"""
+    if not torch.cuda.is_available():
+        return []
+    devices = []
+    for i in range(torch.cuda.device_count()):
+        props = torch.cuda.get_device_properties(i)
+        devices.append({
+            "index": i,
+            "name": props.name,
+            "total_bytes": props.total_memory,
+            "free_bytes": cuda_free_bytes(i),
+            "capability": f"{props.major}.{props.minor}",
+        })
+    return devices
+
+
+def get_process_rss():
+    """현재 프로세스의 RSS (바이트)"""
+    statm = _read_proc_file("/proc/self/statm").split()
+    if len(statm) >= 2:
+        return int(statm[1]) * os.sysconf("SC_PAGE_SIZE")
+    # /proc가 없으면 최대 RSS로 대신함 (macOS는 바이트, 그 외는 KB 단위)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def get_peak_rss():
+    """현재 프로세스의 최대 RSS (바이트)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class HardwareProfile:
+    """한 번 조사해 디스크에 캐싱하는 하드웨어 구성 정보
+
+    장치/정밀도/스레드 수/권장 모델 크기 결정을 한 곳에서 담당합니다.
+    여유 메모리 같은 변하는 값은 available_ram_bytes()/cuda_free_bytes()로 따로 읽습니다.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.cpu = data["cpu"]
+        self.ram = data["ram"]
+        self.cuda = data["cuda"]
+
+    @classmethod
+    def probe(cls):
+        """하드웨어를 새로 조사"""
+        return cls({
+            "version": PROFILE_VERSION,
+            "probed_at": time.time(),
+            "hostname": socket.gethostname(),
+            "platform": f"{platform.system()} {platform.release()}",
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "torch_cuda": torch.version.cuda,
+            "cuda_signature": _cuda_signature(),
+            "cpu": _probe_cpu(),
+            "ram": _probe_ram(),
+            "cuda": _probe_cuda(),
+        })
+
+    def is_fresh(self, ttl=PROFILE_TTL_SECONDS):
+        """캐시가 유효한지 (TTL, 호스트, torch 버전, 보이는 CUDA 구성 확인)"""
+        return (
+            self.data.get("version") == PROFILE_VERSION
+            and time.time() - self.data.get("probed_at", 0) < ttl
+            and self.data.get("hostname") == socket.gethostname()
+            and self.data.get("torch") == torch.__version__
+            and self.data.get("cuda_signature") == _cuda_signature()
+        )
+
+    @property
+    def device(self):
+        """변환에 사용할 장치"""
+        return "cuda" if self.cuda else "cpu"
+
+    @property
+    def age_seconds(self):
+        return time.time() - self.data.get("probed_at", 0)
+
+    def use_fp16(self, device=None):
+        """16비트 정밀도 사용 여부 (GPU에서만)"""
+        return (device or self.device) == "cuda"
+
+    def recommended_threads(self, concurrent_jobs=1):
+        """CPU 추론에 사용할 스레드 수 (물리 코어 수를 동시에 변환하는 작업 수로 나눔)"""
+        return max(1, self.cpu["physical_cores"] // max(concurrent_jobs, 1))
+
+    def device_memory_bytes(self, device=None):
+        """장치의 전체 메모리 (바이트)"""
+        if (device or self.device) == "cuda":
+            return self.cuda[0]["total_bytes"]
+        return self.ram["total_bytes"]
+
+    def recommended_model_size(self, device=None):
+        """장치 메모리와 성능으로 권장 모델 크기 결정"""
+        device = device or self.device
+        memory_gb = (self.device_memory_bytes(device) or 0) / 1024**3
+        candidates = ["large", "medium", "small", "base"]
+        if device == "cpu":
+            # CPU에서는 medium 이상이 실시간보다 훨씬 느림
+            candidates = ["small", "base"] if self.cpu["physical_cores"] >= 8 else ["base"]
+        for model_size in candidates:
+            if memory_gb >= MODEL_MEMORY_GB[model_size]:
+                return model_size
+        return "base"
+
+    def summary_lines(self):
+        """사람이 읽을 수 있는 요약"""
+        lines = [
+            f"💻 CPU: {self.cpu['model']} ({self.cpu['physical_cores']}코어/{self.cpu['logical_cores']}스레드)",
+            f"🧮 SIMD: {', '.join(self.cpu['simd']) or '확인 불가'}",
+        ]
+        if self.ram["total_bytes"]:
+            lines.append(f"💾 RAM: {self.ram['total_bytes'] / 1024**3:.1f}GB")
+        for gpu in self.cuda:
+            free = f", 여유 {gpu['free_bytes'] / 1024**3:.1f}GB" if gpu.get("free_bytes") is not None else ""
+            lines.append(f"🎮 GPU {gpu['index']}: {gpu['name']} ({gpu['total_bytes'] / 1024**3:.1f}GB{free}, CC {gpu['capability']})")
+        lines.append(f"🚀 권장 설정: {self.device.upper()} / {self.recommended_model_size()} 모델 / "
+                     f"{'FP16' if self.use_fp16() else 'FP32'} / {self.recommended_threads()} 스레드")
+        return lines
+
+
+def _profile_path():
+    return os.path.join(get_cache_dir("hardware"), "profile.json")
+
+
+def get_hardware_profile(refresh=False, ttl=PROFILE_TTL_SECONDS):
+    """하드웨어 프로필 반환 (프로세스 내 캐시 → 디스크 캐시 → 새로 조사 순)"""
+    global _profile
+    with _profile_lock:
+        if _profile is not None and not refresh and _profile.is_fresh(ttl):
+            return _profile
+
+        if not refresh:
+            data = read_json(_profile_path())
+            if data:
+                try:
+                    cached = HardwareProfile(data)
+                    if cached.is_fresh(ttl):
+                        _profile = cached
+                        return _profile
+                except KeyError:
+                    pass
+
+        _profile = HardwareProfile.probe()
+        atomic_write_json(_profile_path(), _profile.data)
+        return _profile
+
+
+def configure_torch_threads(profile=None, concurrent_jobs=1):
+    """CPU 추론 스레드 수를 물리 코어 수에 맞춤
+
+    한 프로세스에서 여러 스레드가 동시에 변환하면 스레드마다 이 수만큼 연산 스레드를 쓰므로,
+    concurrent_jobs로 나눠 전체가 물리 코어 수를 넘지 않게 합니다.
+    """
+    profile = profile or get_hardware_profile()
+    if profile.device == "cpu":
+        torch.set_num_threads(profile.recommended_threads(concurrent_jobs))
@@ -0,0 +1,378 @@
+import os
+import sys
+import json
+import time
+import queue
+import select
+import sqlite3
+import argparse
+import threading
+
+from converter import WhisperConverter
+from features import FeatureStage
+from search_index import SearchIndex
+from job_history import JobHistory
+from prefetch import AudioPrefetcher, n_mels_for, DEFAULT_PREFETCH_DEPTH
+from cache_utils import file_content_hash, atomic_write_json
+
+# 감시 대상 음성 확장자 (GUI 파일 선택 창과 동일)
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".m4a", ".flac", ".ogg", ".wma")
+# 결과 파일 이름 접미사 (GUI 기본 저장 이름과 동일)
+OUTPUT_SUFFIX = "_변환결과.txt"
+# 복사 중인 파일을 건너뛰기 위해 크기/수정시각이 유지되어야 하는 시간 (초)
+SETTLE_SECONDS = 2.0
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class FileIndex:
+    """(경로, 크기, 수정시각, 내용 해시) 영구 색인
+
+    크기와 수정시각이 그대로면 해시를 다시 계산하지 않고, 바뀌었더라도 내용 해시가
+    같으면(touch, 복사 등) 다시 변환하지 않습니다.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT,"
+            " status TEXT, output_path TEXT, processed_at REAL, error TEXT)"
+        )
+        self.conn.commit()
+
+    def get(self, path):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT size, mtime_ns, content_hash, status FROM files WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"size": row[0], "mtime_ns": row[1], "content_hash": row[2], "status": row[3]}
+
+    def needs_processing(self, path, stat):
+        """변환이 필요한지 판단 (필요 없으면 색인의 크기/수정시각만 갱신)"""
+        record = self.get(path)
+        if record is None:
+            return True
+        if record["size"] == stat.st_size and record["mtime_ns"] == stat.st_mtime_ns:
+            # 실패한 파일도 내용이 바뀌기 전까지는 다시 시도하지 않음
+            return False
+        if record["status"] != STATUS_DONE:
+            return True
+        if file_content_hash(path) == record["content_hash"]:
+            with self._lock:
+                self.conn.execute("UPDATE files SET size = ?, mtime_ns = ? WHERE path = ?",
+                                  (stat.st_size, stat.st_mtime_ns, path))
+                self.conn.commit()
+            return False
+        return True
+
+    def mark(self, path, stat, content_hash, status, output_path=None, error=None):
+        """처리 결과 기록"""
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, content_hash, status, output_path, time.time(), error)
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+class InotifyWaker:
+    """리눅스 inotify로 디렉터리 변경 시 폴링 대기를 깨우는 보조 장치
+
+    변경 내용 자체는 사용하지 않고 다음 스캔 시점만 앞당기며, 실제 판단은 항상
+    디렉터리 스캔과 색인으로 합니다. inotify를 쓸 수 없으면 None을 반환합니다.
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+
+    @classmethod
+    def create(cls, directory):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = cls.IN_CLOSE_WRITE | cls.IN_MOVED_TO | cls.IN_CREATE
+            for root, _, _ in os.walk(directory):
+                libc.inotify_add_watch(fd, root.encode(), mask)
+            return cls(libc, fd)
+        except (OSError, AttributeError):
+            return None
+
+    def wait(self, timeout):
+        """변경이 생기거나 timeout이 지날 때까지 대기 (변경이 있었으면 True)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        # 이벤트 내용은 사용하지 않고 쌓인 이벤트만 비움
+        try:
+            while os.read(self.fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+class HotFolderWatcher:
+    """감시 폴더의 새/변경 음성 파일을 변환기로 넘기는 클래스
+
+    스캔 → 안정화 확인 → 색인 확인 → 제한된 크기의 작업 큐 → 작업 스레드(각자 모델 보유)
+    순서로 처리하며 처리량과 큐 길이 지표를 제공합니다.
+    """
+
+    def __init__(self, watch_dir, output_dir=None, model_size="base", optimize_speed=True, workers=1,
+                 poll_interval=5.0, max_queue=16, index_path=None, log_callback=print,
+                 prefetch_depth=DEFAULT_PREFETCH_DEPTH, compile_model=False, preallocate_kv_cache=False,
+                 temperature_fallback=False):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.output_dir = os.path.abspath(output_dir or watch_dir)
+        self.model_size = model_size
+        self.optimize_speed = optimize_speed
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.compile_model = compile_model  # 작업 스레드 모델을 컴파일된 실행으로 준비
+        self.preallocate_kv_cache = preallocate_kv_cache  # 고정 용량 KV 캐시로 디코딩
+        self.temperature_fallback = temperature_fallback  # 어려운 창은 온도를 올려 재시도
+        self.index = FileIndex(index_path or os.path.join(self.watch_dir, ".stt_index.sqlite3"))
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.log = log_callback or (lambda message: None)
+        self.feature_stage = FeatureStage(keep_audio=False)  # 작업 스레드들이 멜 캐시 공유
+        self.search_index = SearchIndex()  # 작업 스레드들이 검색 색인 연결 공유
+        self.job_history = JobHistory()  # 작업 스레드들이 작업 이력 연결 공유
+        # 큐에 들어간 파일의 멜 특징을 작업 스레드가 꺼내기 전에 미리 준비
+        self.prefetcher = AudioPrefetcher(self.feature_stage, n_mels_for(model_size), prefetch_depth) \
+            if prefetch_depth > 0 else None
+
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._pending = {}     # 경로 → (크기, 수정시각, 처음 본 시각) 안정화 대기
+        self._in_flight = set()
+        self._threads = []
+        self.started_at = None
+        self.counters = {"done": 0, "failed": 0, "skipped": 0, "audio_seconds": 0.0, "busy_seconds": 0.0}
+
+    def _output_path(self, path):
+        relative = os.path.relpath(path, self.watch_dir)
+        stem = os.path.splitext(relative)[0]
+        return os.path.join(self.output_dir, stem + OUTPUT_SUFFIX)
+
+    def _iter_audio_files(self):
+        for root, dirs, files in os.walk(self.watch_dir):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                if name.lower().endswith(AUDIO_EXTENSIONS):
+                    yield os.path.join(root, name)
+
+    def scan(self):
+        """폴더를 한 번 스캔해 변환이 필요한 파일을 큐에 넣음 (넣은 개수 반환)"""
+        now = time.time()
+        enqueued = 0
+        seen = set()
+        for path in self._iter_audio_files():
+            seen.add(path)
+            with self._lock:
+                if path in self._in_flight:
+                    continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            # 크기/수정시각이 SETTLE_SECONDS 동안 유지되어야 복사가 끝난 것으로 봄
+            signature = (stat.st_size, stat.st_mtime_ns)
+            pending = self._pending.get(path)
+            if pending is None or pending[:2] != signature:
+                self._pending[path] = signature + (now,)
+                if pending is None and not self.index.needs_processing(path, stat):
+                    self._pending.pop(path)
+                continue
+            if now - pending[2] < SETTLE_SECONDS:
+                continue
+
+            self._pending.pop(path)
+            if not self.index.needs_processing(path, stat):
+                self.counters["skipped"] += 1
+                continue
+            # 안정된 내용의 해시를 지금 계산해 두고, 변환이 끝난 뒤 같은지 확인한 다음에만 완료로 기록
+            try:
+                content_hash = file_content_hash(path)
+                unchanged = os.stat(path)
+            except OSError:
+                continue
+            if (unchanged.st_size, unchanged.st_mtime_ns) != signature:
+                continue  # 해시 계산 중에 바뀜: 다음 스캔에서 다시 안정화 확인
+            try:
+                self.queue.put_nowait((path, stat, content_hash))
+            except queue.Full:
+                # 큐가 가득 차면 다음 스캔에서 다시 시도
+                self._pending[path] = signature + (pending[2],)
+                break
+            with self._lock:
+                self._in_flight.add(path)
+            if self.prefetcher:
+                self.prefetcher.submit([path])
+            enqueued += 1
+
+        for path in list(self._pending):
+            if path not in seen:
+                self._pending.pop(path)
+        return enqueued
+
+    def _worker(self):
+        """작업 스레드: 큐에서 파일을 꺼내 변환 (모델은 스레드별로 유지)"""
+        converter = WhisperConverter(cancel_callback=self._stop.is_set, feature_stage=self.feature_stage,
+                                     search_index=self.search_index, job_history=self.job_history,
+                                     compile_model=self.compile_model,
+                                     preallocate_kv_cache=self.preallocate_kv_cache,
+                                     temperature_fallback=self.temperature_fallback,
+                                     concurrent_jobs=self.workers)
+        while not self._stop.is_set():
+            try:
+                path, stat, content_hash = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            output_path = self._output_path(path)
+            started = time.time()
+            try:
+                os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                result = converter.convert_audio(path, output_path, self.model_size, self.optimize_speed)
+                if result is None:
+                    continue  # 중지 요청으로 취소됨
+                if file_content_hash(path) != content_hash:
+                    # 변환 중에 파일이 바뀌었으면 완료로 기록하지 않아 다음 스캔에서 다시 변환
+                    self.log(f"🔁 {os.path.relpath(path, self.watch_dir)}: 변환 중 내용이 바뀌어 다시 변환합니다")
+                    continue
+                self.index.mark(path, stat, content_hash, STATUS_DONE, output_path)
+                with self._lock:
+                    self.counters["done"] += 1
+                    self.counters["audio_seconds"] += converter.audio_duration or 0.0
+                self.log(f"✅ {os.path.relpath(path, self.watch_dir)} → {os.path.basename(output_path)} "
+                         f"({time.time() - started:.1f}초)")
+            except Exception as e:
+                self.index.mark(path, stat, content_hash, STATUS_FAILED, error=str(e))
+                with self._lock:
+                    self.counters["failed"] += 1
+                self.log(f"❌ {os.path.relpath(path, self.watch_dir)}: {e}")
+            finally:
+                if self.prefetcher:
+                    self.prefetcher.release(path)
+                with self._lock:
+                    self.counters["busy_seconds"] += time.time() - started
+                    self._in_flight.discard(path)
+                self.queue.task_done()
+
+    def metrics(self):
+        """처리량/큐 지표 스냅샷"""
+        with self._lock:
+            counters = dict(self.counters)
+            in_flight = len(self._in_flight)
+        uptime = time.time() - self.started_at if self.started_at else 0.0
+        return {
+            "uptime_seconds": uptime,
+            "queue_depth": self.queue.qsize(),
+            "in_flight": in_flight,
+            "pending_settle": len(self._pending),
+            "files_done": counters["done"],
+            "files_failed": counters["failed"],
+            "files_skipped": counters["skipped"],
+            "files_per_minute": counters["done"] / uptime * 60 if uptime else 0.0,
+            "audio_seconds_per_second": counters["audio_seconds"] / uptime if uptime else 0.0,
+            "worker_utilisation": counters["busy_seconds"] / (uptime * self.workers) if uptime else 0.0,
+        }
+
+    def run(self, metrics_path=None, metrics_interval=30.0):
+        """중지될 때까지 폴더 감시 (metrics_path가 있으면 주기적으로 지표를 JSON으로 기록)"""
+        self.started_at = time.time()
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        waker = InotifyWaker.create(self.watch_dir)
+        self.log(f"👀 {self.watch_dir} 감시 시작 ({'inotify' if waker else '폴링'}, 작업자 {self.workers}개)")
+        last_metrics = 0.0
+        try:
+            while not self._stop.is_set():
+                self.scan()
+                now = time.time()
+                if metrics_path and now - last_metrics >= metrics_interval:
+                    atomic_write_json(metrics_path, self.metrics())
+                    last_metrics = now
+                # 안정화 대기 중인 파일이 있으면 그 시간에 맞춰 다시 스캔
+                timeout = SETTLE_SECONDS if self._pending else self.poll_interval
+                if waker:
+                    waker.wait(timeout)
+                else:
+                    self._stop.wait(timeout)
+        finally:
+            if waker:
+                waker.close()
+
+    def stop(self):
+        """감시와 작업 스레드 중지"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        if self.prefetcher:
+            self.prefetcher.close()
+        self.index.close()
+        self.search_index.close()
+        self.job_history.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="감시 폴더에 들어온 음성 파일 자동 변환")
+    parser.add_argument("watch_dir", help="감시할 폴더")
+    parser.add_argument("--output", help="결과 저장 폴더 (기본: 감시 폴더)")
+    parser.add_argument("--model", default="base", help="모델 크기")
+    parser.add_argument("--no-optimize", action="store_true", help="정확도 우선 옵션 사용")
+    parser.add_argument("--workers", type=int, default=1, help="동시 변환 수")
+    parser.add_argument("--poll", type=float, default=5.0, help="폴링 간격(초)")
+    parser.add_argument("--max-queue", type=int, default=16, help="작업 큐 최대 길이")
+    parser.add_argument("--metrics", help="지표를 주기적으로 기록할 JSON 파일")
+    parser.add_argument("--prefetch", type=int, default=DEFAULT_PREFETCH_DEPTH, help="미리 준비할 파일 수 (0이면 끔)")
+    parser.add_argument("--compile", action="store_true", help="인코더/디코더를 컴파일해 실행 (실패하면 즉시 실행)")
+    parser.add_argument("--preallocate-kv", action="store_true", help="디코더 KV 캐시를 고정 용량 버퍼로 실행")
+    parser.add_argument("--temperature-fallback", action="store_true",
+                        help="어려운 구간을 온도를 올려 다시 디코딩 (느려질 수 있음)")
+    args = parser.parse_args()
+
+    watcher = HotFolderWatcher(args.watch_dir, args.output, args.model, not args.no_optimize,
+                               args.workers, args.poll, args.max_queue, prefetch_depth=args.prefetch,
+                               compile_model=args.compile, preallocate_kv_cache=args.preallocate_kv,
+                               temperature_fallback=args.temperature_fallback)
+    try:
+        watcher.run(metrics_path=args.metrics)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        print(json.dumps(watcher.metrics(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
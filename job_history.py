@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import socket
+import sqlite3
+import argparse
+import threading
+import statistics
+import subprocess
+
+from cache_utils import get_cache_dir
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+# 변환 단계 이름 (예측 시 음성 길이에 비례하는 단계)
+TRANSCRIBE_STAGE = "음성 변환"
+MODEL_LOAD_STAGE = "모델 로드"
+# 예측에 사용하는 같은 설정의 최근 완료 작업 수
+ESTIMATE_WINDOW = 20
+# ffprobe로 음성 길이를 읽을 때 최대 대기 시간 (초)
+PROBE_TIMEOUT = 10
+
+
+def probe_duration(audio_path):
+    """ffprobe로 음성 길이(초)를 빠르게 읽음 (디코딩 전 예상 시간 계산용, 실패하면 None)"""
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=noprint_wrappers=1:nokey=1", audio_path],
+            capture_output=True, text=True, timeout=PROBE_TIMEOUT
+        ).stdout.strip()
+        duration = float(output)
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+    return duration if duration > 0 else None
+
+
+class JobHistory:
+    """변환 작업 이력 저장소 (SQLite)
+
+    작업마다 음성 길이, 모델/옵션, 장치, 단계별 소요 시간, 최대 메모리를 기록하고,
+    같은 호스트·같은 설정의 최근 이력으로 새 작업의 예상 소요 시간을 계산합니다.
+    여러 호스트의 이력을 한 파일에 모으면 호스트별 처리량 추이도 조회할 수 있습니다.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(get_cache_dir("history"), "jobs.sqlite3")
+        self.host = socket.gethostname()
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY, host TEXT, started_at REAL, finished_at REAL, status TEXT,"
+            " audio_path TEXT, audio_duration REAL, model TEXT, optimize_speed INTEGER, selective INTEGER,"
+            " device TEXT, fp16 INTEGER, total_seconds REAL, transcribe_seconds REAL, stages TEXT,"
+            " peak_rss_bytes INTEGER, peak_vram_bytes INTEGER, error TEXT);"
+            "CREATE INDEX IF NOT EXISTS jobs_config ON jobs(host, model, device, optimize_speed, selective, status);"
+            "CREATE INDEX IF NOT EXISTS jobs_started ON jobs(started_at);"
+        )
+        self.conn.commit()
+
+    def record(self, started_at, status, audio_path, audio_duration, model, optimize_speed, selective,
+               device, fp16, stages, peak_memory=None, error=None):
+        """작업 한 건 기록 (stages는 단계 이름 → 소요 시간(초) dict)"""
+        finished_at = time.time()
+        peak_memory = peak_memory or {}
+        with self._lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO jobs (host, started_at, finished_at, status, audio_path, audio_duration, model,"
+                    " optimize_speed, selective, device, fp16, total_seconds, transcribe_seconds, stages,"
+                    " peak_rss_bytes, peak_vram_bytes, error) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.host, started_at, finished_at, status, audio_path, audio_duration, model,
+                     int(optimize_speed), int(selective), device, int(fp16), finished_at - started_at,
+                     stages.get(TRANSCRIBE_STAGE), json.dumps(stages, ensure_ascii=False),
+                     peak_memory.get("rss_bytes"), peak_memory.get("vram_bytes"), error)
+                )
+
+    def _recent_stages(self, model, device, optimize_speed, selective, host, window):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT audio_duration, stages FROM jobs WHERE host = ? AND model = ? AND device = ?"
+                " AND optimize_speed = ? AND selective = ? AND status = ? AND audio_duration > 0"
+                " ORDER BY started_at DESC LIMIT ?",
+                (host or self.host, model, device, int(optimize_speed), int(selective), STATUS_DONE, window)
+            ).fetchall()
+        return [(duration, json.loads(stages)) for duration, stages in rows]
+
+    def estimate(self, audio_duration, model, device, optimize_speed=True, selective=False,
+                 model_loaded=False, host=None, window=ESTIMATE_WINDOW):
+        """같은 설정의 최근 완료 작업으로 예상 소요 시간(초) 계산 (이력이 없으면 None)
+
+        변환 단계는 실시간 배율(단계 시간 / 음성 길이)의 중앙값 × 음성 길이로,
+        나머지 단계는 단계별 소요 시간의 중앙값으로 계산합니다.
+        model_loaded가 True면 모델 로드 단계는 캐시된 모델 재사용으로 보고 제외합니다.
+        """
+        if not audio_duration:
+            return None
+        history = self._recent_stages(model, device, optimize_speed, selective, host, window)
+        if not history:
+            return None
+
+        samples = {}
+        for duration, stages in history:
+            for stage, seconds in stages.items():
+                value = seconds / duration if stage == TRANSCRIBE_STAGE else seconds
+                samples.setdefault(stage, []).append(value)
+
+        estimate = 0.0
+        for stage, values in samples.items():
+            if stage == MODEL_LOAD_STAGE and model_loaded:
+                continue
+            value = statistics.median(values)
+            estimate += value * audio_duration if stage == TRANSCRIBE_STAGE else value
+        return estimate
+
+    def jobs(self, limit=20, host=None):
+        """최근 작업 목록 (dict, 최신순)"""
+        query = "SELECT * FROM jobs"
+        params = []
+        if host:
+            query += " WHERE host = ?"
+            params.append(host)
+        query += " ORDER BY started_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            cursor = self.conn.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        jobs = []
+        for row in rows:
+            job = dict(zip(columns, row))
+            job["stages"] = json.loads(job["stages"]) if job["stages"] else {}
+            jobs.append(job)
+        return jobs
+
+    def trends(self, days=30, host=None, model=None):
+        """호스트별 일자별 처리량 추이
+
+        완료된 작업의 음성 길이 합계와 작업 시간 합계로 처리량(음성 초 / 작업 초)을 계산합니다.
+        """
+        query = (
+            "SELECT host, date(started_at, 'unixepoch', 'localtime') AS day, model, COUNT(*),"
+            " SUM(audio_duration), SUM(total_seconds), SUM(transcribe_seconds), MAX(peak_rss_bytes)"
+            " FROM jobs WHERE status = ? AND started_at >= ? AND audio_duration > 0"
+        )
+        params = [STATUS_DONE, time.time() - days * 86400]
+        if host:
+            query += " AND host = ?"
+            params.append(host)
+        if model:
+            query += " AND model = ?"
+            params.append(model)
+        query += " GROUP BY host, day, model ORDER BY host, day, model"
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        trends = []
+        for host_name, day, model_name, jobs, audio, total, transcribe, peak_rss in rows:
+            trends.append({
+                "host": host_name,
+                "day": day,
+                "model": model_name,
+                "jobs": jobs,
+                "audio_seconds": audio,
+                "busy_seconds": total,
+                "throughput": audio / total if total else None,
+                "real_time_factor": transcribe / audio if transcribe else None,
+                "peak_rss_bytes": peak_rss,
+            })
+        return trends
+
+    def close(self):
+        self.conn.close()
+
+
+def _format_day_row(row):
+    throughput = f"{row['throughput']:.1f}x" if row["throughput"] else "-"
+    rtf = f"{row['real_time_factor']:.3f}" if row["real_time_factor"] else "-"
+    peak = f"{row['peak_rss_bytes'] / 1024**2:.0f}MB" if row["peak_rss_bytes"] else "-"
+    return (f"{row['host']:<16} {row['day']}  {row['model']:<8} {row['jobs']:>4}건  "
+            f"음성 {row['audio_seconds'] / 60:7.1f}분  처리량 {throughput:>7}  RTF {rtf:>6}  최대 RSS {peak}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="변환 작업 이력 조회")
+    parser.add_argument("--db", help="이력 파일 경로 (기본: 캐시 폴더)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="최근 작업 목록")
+    list_parser.add_argument("--limit", type=int, default=20, help="최대 작업 수")
+    list_parser.add_argument("--host", help="호스트 이름으로 제한")
+    trends_parser = commands.add_parser("trends", help="호스트별 일자별 처리량 추이")
+    trends_parser.add_argument("--days", type=int, default=30, help="조회 기간 (일)")
+    trends_parser.add_argument("--host", help="호스트 이름으로 제한")
+    trends_parser.add_argument("--model", help="모델로 제한")
+    args = parser.parse_args()
+
+    history = JobHistory(args.db)
+    try:
+        if args.command == "list":
+            for job in history.jobs(args.limit, args.host):
+                started = time.strftime("%Y-%m-%d %H:%M", time.localtime(job["started_at"]))
+                options = "fast" if job["optimize_speed"] else "accurate"
+                duration = f"{job['audio_duration']:.0f}초" if job["audio_duration"] else "-"
+                print(f"{started}  {job['host']}  {job['status']:<9} {job['model']}:{options}:{job['device']}  "
+                      f"음성 {duration}  소요 {job['total_seconds']:.1f}초  "
+                      f"{os.path.basename(job['audio_path'] or '')}")
+        else:
+            rows = history.trends(args.days, args.host, args.model)
+            if not rows:
+                print("📭 조회 기간에 완료된 작업이 없습니다.")
+            for row in rows:
+                print(_format_day_row(row))
+    finally:
+        history.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+import time
+import random
+import argparse
+import threading
+from contextlib import contextmanager
+
+import torch
+import whisper
+from whisper.audio import N_FRAMES
+from whisper.decoding import Inference, PyTorchInference
+from whisper.tokenizer import get_tokenizer
+
+from whisper_hooks import custom_inference
+from hardware import get_hardware_profile
+
+# 벤치마크 기본값 (창 하나의 최대 생성 토큰 수와 같은 224단계)
+BENCHMARK_STEPS = 224
+BENCHMARK_BEAM_SIZE = 5
+
+
+def new_kv_stats():
+    """KV 캐시 통계 초기값"""
+    return {"windows": 0, "allocations": 0, "allocated_bytes": 0, "reused_buffers": 0, "reorders": 0, "grows": 0}
+
+
+class KVBufferPool:
+    """창이 바뀌어도 재사용하는 KV 캐시 버퍼 모음 ((모듈, 슬롯) → 텐서)
+
+    버퍼는 (용량, 배치, 차원) 순서로 잡아 앞쪽 위치 구간이 연속 메모리가 되도록 합니다.
+    크기/자료형/장치가 맞으면 그대로 쓰고, 더 큰 용량이 필요할 때만 새로 할당합니다.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self._buffers = {}
+
+    def acquire(self, key, capacity, batch, width, dtype, device):
+        buffer = self._buffers.get(key)
+        if buffer is not None and buffer.shape[0] >= capacity and buffer.shape[1:] == (batch, width) \
+                and buffer.dtype == dtype and buffer.device == device:
+            self.stats["reused_buffers"] += 1
+            return buffer
+        self._buffers.pop(key, None)  # 새로 잡기 전에 이전 버퍼 해제
+        buffer = torch.empty((capacity, batch, width), dtype=dtype, device=device)
+        self._buffers[key] = buffer
+        self.stats["allocations"] += 1
+        self.stats["allocated_bytes"] += buffer.numel() * buffer.element_size()
+        return buffer
+
+    def clear(self):
+        self._buffers.clear()
+
+
+class PreallocatedInference(Inference):
+    """고정 용량 KV 캐시를 쓰는 디코더 실행기 (whisper PyTorchInference 대체)
+
+    기본 구현은 토큰마다 torch.cat으로 키/값 캐시를 새로 만들어 창 길이에 비례하는 복사가
+    반복됩니다. 여기서는 창 시작 시 (초기 토큰 + 최대 생성 토큰) 용량의 버퍼를 잡아 두고
+    새 토큰의 키/값만 해당 위치에 써 넣은 뒤 앞쪽 구간의 뷰를 돌려줍니다.
+    빔 재배열은 같은 크기의 예비 버퍼로 index_select(out=)한 뒤 두 버퍼를 바꿔 할당 없이 처리합니다.
+    """
+
+    def __init__(self, model, initial_token_length, capacity, pool, stats):
+        self.model = model
+        self.initial_token_length = initial_token_length
+        self.capacity = min(capacity, model.dims.n_text_ctx)
+        self.pool = pool
+        self.stats = stats
+        self.kv_cache = {}
+        self.hooks = []
+        self.self_modules = [block.attn.key for block in model.decoder.blocks] + \
+                            [block.attn.value for block in model.decoder.blocks]
+        self.cross_modules = {block.cross_attn.key for block in model.decoder.blocks} | \
+                             {block.cross_attn.value for block in model.decoder.blocks}
+        self.buffers = {}  # (모듈, 슬롯) → 이번 창에서 쓰는 버퍼
+        self.slots = {}    # 모듈 → 현재 쓰는 버퍼 슬롯 (0/1)
+        self.lengths = {}  # 모듈 → 채워진 위치 수
+        self.stats["windows"] += 1
+
+    def _buffer(self, module, slot, reference, capacity=None):
+        """(모듈, 슬롯) 버퍼 반환 (창마다 처음 한 번만 풀에서 가져옴)"""
+        capacity = capacity or self.capacity
+        buffer = self.buffers.get((module, slot))
+        if buffer is None or buffer.shape[0] < capacity:
+            buffer = self.pool.acquire((module, slot), capacity, reference.shape[0],
+                                       reference.shape[-1], reference.dtype, reference.device)
+            self.buffers[(module, slot)] = buffer
+        return buffer
+
+    def _save_to_cache(self, module, _, output):
+        if module in self.cross_modules:
+            # 교차 어텐션 키/값은 창마다 한 번 계산해 그대로 사용
+            self.kv_cache[module] = output
+            return output
+
+        length = self.lengths.get(module, 0)
+        new_length = length + output.shape[1]
+        slot = self.slots.setdefault(module, 0)
+        buffer = self._buffer(module, slot, output)
+        if new_length > buffer.shape[0]:
+            # 용량 계산이 모자란 경우(정상 디코딩에서는 없음): 두 배로 늘려 기존 내용 복사
+            grown = self._buffer(module, 1 - slot, output, capacity=max(new_length, buffer.shape[0] * 2))
+            grown[:length].copy_(buffer[:length])
+            self.slots[module] = slot = 1 - slot
+            buffer = grown
+            self.stats["grows"] += 1
+
+        buffer[length:new_length].copy_(output.transpose(0, 1))
+        self.lengths[module] = new_length
+        # (배치, 위치, 차원) 뷰: 마지막 차원이 연속이라 어텐션의 head 분할 view()가 그대로 동작
+        view = buffer[:new_length].transpose(0, 1)
+        self.kv_cache[module] = view
+        return view
+
+    def logits(self, tokens, audio_features):
+        if not self.hooks:
+            for module in self.self_modules + list(self.cross_modules):
+                self.hooks.append(module.register_forward_hook(self._save_to_cache))
+
+        if tokens.shape[-1] > self.initial_token_length:
+            # 첫 실행 이후에는 마지막 토큰만 계산
+            tokens = tokens[:, -1:]
+
+        return self.model.decoder(tokens, audio_features, kv_cache=self.kv_cache)
+
+    def rearrange_kv_cache(self, source_indices):
+        if source_indices == list(range(len(source_indices))):
+            return
+        index = None
+        for module in self.self_modules:
+            length = self.lengths.get(module)
+            if not length:
+                continue
+            slot = self.slots[module]
+            buffer = self._buffer(module, slot, self.kv_cache[module])
+            spare = self._buffer(module, 1 - slot, self.kv_cache[module], capacity=buffer.shape[0])
+            if index is None:
+                index = torch.tensor(source_indices, device=buffer.device)
+            torch.index_select(buffer[:length], 1, index, out=spare[:length])
+            self.slots[module] = 1 - slot
+            self.kv_cache[module] = spare[:length].transpose(0, 1)
+        self.stats["reorders"] += 1
+
+    def cleanup_caching(self):
+        for hook in self.hooks:
+            hook.remove()
+        self.kv_cache = {}
+        self.hooks = []
+        self.buffers = {}
+        self.slots = {}
+        self.lengths = {}
+
+
+@contextmanager
+def preallocated_kv_cache(stats=None):
+    """현재 스레드의 transcribe()/decode()에서 고정 용량 KV 캐시 디코더 실행기 사용
+
+    버퍼는 블록 안의 모든 창에서 재사용되고 블록이 끝나면 해제됩니다.
+    stats dict(new_kv_stats 형식)에 창 수, 버퍼 할당/재사용 횟수, 빔 재배열 횟수가 누적됩니다.
+    """
+    stats = stats if stats is not None else new_kv_stats()
+    pool = KVBufferPool(stats)
+    lock = threading.Lock()
+
+    def factory(task):
+        with lock:
+            initial = len(task.initial_tokens)
+            return PreallocatedInference(task.model, initial, initial + task.sample_len, pool, stats)
+
+    try:
+        with custom_inference(factory):
+            yield stats
+    finally:
+        pool.clear()
+
+
+def _count_allocations(run, device):
+    """run() 실행 중 일어난 텐서 할당 횟수와 바이트 수 (측정할 수 없으면 (None, None))"""
+    if device == "cuda":
+        torch.cuda.synchronize()
+        before = torch.cuda.memory_stats()
+        run()
+        torch.cuda.synchronize()
+        after = torch.cuda.memory_stats()
+        return (after["allocation.all.allocated"] - before["allocation.all.allocated"],
+                after["allocated_bytes.all.allocated"] - before["allocated_bytes.all.allocated"])
+    try:
+        with torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU], profile_memory=True) as prof:
+            run()
+    except (RuntimeError, AttributeError):
+        run()
+        return None, None
+    allocations = [event.cpu_memory_usage for event in prof.events()
+                   if event.name == "[memory]" and event.cpu_memory_usage > 0]
+    return len(allocations), sum(allocations)
+
+
+def _decode_loop(inference, audio_features, tokens, steps, reorders):
+    """그리디로 steps 토큰 생성 (reorders가 있으면 단계마다 빔 재배열 흉내), 마지막 로짓 반환"""
+    logits = None
+    with torch.no_grad():
+        for step in range(steps):
+            logits = inference.logits(tokens, audio_features)[:, -1]
+            tokens = torch.cat([tokens, logits.argmax(dim=-1, keepdim=True)], dim=-1)
+            if reorders:
+                tokens = tokens[reorders[step]]
+                inference.rearrange_kv_cache(reorders[step])
+    inference.cleanup_caching()
+    return logits
+
+
+def run_benchmark(model_size="base", device=None, beam_size=BENCHMARK_BEAM_SIZE, steps=BENCHMARK_STEPS, fp16=None):
+    """기본 KV 캐시와 고정 용량 KV 캐시의 토큰 처리 속도/할당 횟수 비교
+
+    같은 창 하나를 빔 크기만큼의 배치로 steps 단계 디코딩하며, 빔 크기가 1보다 크면
+    매 단계 같은 무작위 재배열을 두 경로에 똑같이 적용합니다.
+    """
+    profile = get_hardware_profile()
+    device = device or profile.device
+    fp16 = profile.use_fp16(device) if fp16 is None else fp16
+    dtype = torch.float16 if fp16 and device == "cuda" else torch.float32
+    model = whisper.load_model(model_size, device=device)
+    steps = min(steps, model.dims.n_text_ctx // 2)
+
+    generator = torch.Generator().manual_seed(0)
+    mel = torch.randn(1, model.dims.n_mels, N_FRAMES, generator=generator).to(device=device, dtype=dtype)
+    with torch.no_grad():
+        audio_features = model.encoder(mel).repeat_interleave(beam_size, dim=0)
+    tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                              language="ko", task="transcribe")
+    initial = list(tokenizer.sot_sequence)
+    tokens = torch.tensor([initial] * beam_size, device=device)
+    rng = random.Random(0)
+    reorders = [sorted(rng.randrange(beam_size) for _ in range(beam_size)) for _ in range(steps)] \
+        if beam_size > 1 else None
+
+    stats = new_kv_stats()
+    pool = KVBufferPool(stats)
+    paths = {
+        "stock": lambda: PyTorchInference(model, len(initial)),
+        "preallocated": lambda: PreallocatedInference(model, len(initial), len(initial) + steps, pool, stats),
+    }
+    result = {"model": model_size, "device": device, "beam_size": beam_size, "steps": steps}
+    outputs = {}
+    for name, make in paths.items():
+        _decode_loop(make(), audio_features, tokens, 2, None)  # 준비 실행 (버퍼 할당 포함)
+        if device == "cuda":
+            torch.cuda.synchronize()
+        start = time.perf_counter()
+        outputs[name] = _decode_loop(make(), audio_features, tokens, steps, reorders)
+        if device == "cuda":
+            torch.cuda.synchronize()
+        elapsed = time.perf_counter() - start
+        allocations, allocated_bytes = _count_allocations(
+            lambda: _decode_loop(make(), audio_features, tokens, steps, reorders), device
+        )
+        result[name] = {
+            "tokens_per_second": steps * beam_size / elapsed,
+            "allocations": allocations,
+            "allocated_mb": allocated_bytes / 1024**2 if allocated_bytes is not None else None,
+        }
+    result["max_logit_diff"] = (outputs["stock"].float() - outputs["preallocated"].float()).abs().max().item()
+    result["speedup"] = result["preallocated"]["tokens_per_second"] / result["stock"]["tokens_per_second"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="고정 용량 KV 캐시 디코더 마이크로 벤치마크")
+    parser.add_argument("--model", default="base", help="모델 크기")
+    parser.add_argument("--device", choices=["cpu", "cuda"], help="실행 장치 (기본: 하드웨어 프로필)")
+    parser.add_argument("--beam-size", type=int, default=BENCHMARK_BEAM_SIZE, help="빔 크기 (배치 크기)")
+    parser.add_argument("--steps", type=int, default=BENCHMARK_STEPS, help="생성할 토큰 단계 수")
+    parser.add_argument("--fp32", action="store_true", help="GPU에서도 32비트 정밀도 사용")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.model, args.device, args.beam_size, args.steps, False if args.fp32 else None)
+    print(f"📊 KV 캐시 벤치마크 ({result['model']}, {result['device']}, 빔 {result['beam_size']}, "
+          f"{result['steps']}단계):")
+    for name, title in [("stock", "기본 (torch.cat)"), ("preallocated", "고정 용량")]:
+        entry = result[name]
+        allocations = "측정 불가" if entry["allocations"] is None else \
+            f"{entry['allocations']}회 ({entry['allocated_mb']:.0f}MB)"
+        print(f"   {title}: {entry['tokens_per_second']:.1f} 토큰/초, 할당 {allocations}")
+    print(f"   속도 향상 {result['speedup']:.2f}배, 로짓 최대 차이 {result['max_logit_diff']:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import threading
 import os
 from pathlib import Path
 from datetime import timedelta
 
 # 분할된 모듈들 import
 from converter import WhisperConverter
+from hardware import get_hardware_profile
+from two_pass import REFINE_PASS
+from worker_process import ConverterWorker, JOB_CONVERT, JOB_TWO_PASS
 from ui_theme import InstagramStyleUI
 from gui_components import FileSection, ModelSection, ProgressSection, ResultSection, OptimizationSection
 
+# 워커 프로세스 메시지 확인 간격 (밀리초)
+WORKER_POLL_MS = 50
+
 class WhisperGUI:
     def __init__(self, root):
         self.root = root
@@ -26,8 +31,17 @@ class WhisperGUI:
         self.output_path = tk.StringVar()
         self.model_size = tk.StringVar(value="base")
         self.optimize_speed = tk.BooleanVar(value=True)  # 기본적으로 최적화 활성화
+        self.selective_redecode = tk.BooleanVar(value=False)  # 약한 구간만 정밀 재변환
+        self.two_pass = tk.BooleanVar(value=False)  # 초안 → 정제 2단계 변환
+        self.deadline_minutes = tk.StringVar(value="10")  # 자동 모드 목표 완료 시간
         self.is_processing = False
-        self.converter = None
+        self.use_two_pass = False
+        self.deadline_seconds = None
+        
+        # 변환 워커 프로세스 (미리 띄워 두고 작업 간에 재사용)
+        self.worker = ConverterWorker()
+        self.worker.start()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # GUI 컴포넌트들
         self.progress_section = None
@@ -85,10 +99,10 @@ class WhisperGUI:
                    self.output_path, self.browse_output_file, "저장 위치")
         
         # 모델 크기 선택 (카드 스타일)
-        ModelSection(scrollable_frame, 5, self.model_size)
+        ModelSection(scrollable_frame, 5, self.model_size, self.two_pass, self.deadline_minutes)
         
         # 속도 최적화 섹션 (카드 스타일)
-        OptimizationSection(scrollable_frame, 7, self.optimize_speed)
+        OptimizationSection(scrollable_frame, 7, self.optimize_speed, self.selective_redecode)
         
         # 버튼 프레임
         button_frame = ttk.Frame(scrollable_frame)
@@ -167,15 +181,15 @@ class WhisperGUI:
             "💡 현재 설정:\n"
             f"• 모델: {self.model_size.get()}\n"
             f"• 최적화: {'활성화' if self.optimize_speed.get() else '비활성화'}\n"
-            f"• GPU: {'사용 가능' if self.check_gpu() else 'CPU 사용'}"
+            f"• GPU: {'사용 가능' if self.check_gpu() else 'CPU 사용'}\n"
+            f"• 이 컴퓨터 권장 모델: {get_hardware_profile().recommended_model_size()}"
         )
     
     def check_gpu(self):
-        """GPU 사용 가능 여부 확인"""
+        """GPU 사용 가능 여부 확인 (캐시된 하드웨어 프로필 사용)"""
         try:
-            import torch
-            return torch.cuda.is_available()
-        except:
+            return get_hardware_profile().device == "cuda"
+        except Exception:
             return False
         
     def browse_audio_file(self):
@@ -228,6 +242,18 @@ class WhisperGUI:
             messagebox.showerror("오류", "선택한 음성 파일이 존재하지 않습니다!")
             return
         
+        deadline_seconds = None
+        if self.model_size.get() == "auto":
+            try:
+                deadline_seconds = float(self.deadline_minutes.get()) * 60
+            except ValueError:
+                messagebox.showerror("오류", "목표 완료 시간을 분 단위 숫자로 입력해주세요!")
+                return
+            if deadline_seconds <= 0:
+                messagebox.showerror("오류", "목표 완료 시간은 0보다 커야 합니다!")
+                return
+        self.deadline_seconds = deadline_seconds
+        
         # UI 상태 변경
         self.is_processing = True
         self.convert_btn.config(state="disabled")
@@ -236,50 +262,72 @@ class WhisperGUI:
         self.progress_section.progress.config(value=0)
         self.progress_section.percent_var.set("0%")
         self.progress_section.time_var.set("")
-        self.result_section.result_text.delete(1.0, tk.END)
-        
-        # 변환기 초기화
-        self.converter = WhisperConverter(
-            progress_callback=self.update_progress,
-            cancel_callback=self.is_cancelled
-        )
+        self.result_section.clear()
+        
+        # 작업 전달 (base보다 큰 모델을 고른 경우에만 2단계 변환 의미가 있음)
+        self.use_two_pass = self.two_pass.get() and self.model_size.get() not in ("base", "auto")
+        self.progress_section.show_passes(self.use_two_pass)
+        self.progress_section.update_metrics(None)
+        if self.use_two_pass:
+            self.worker.submit(
+                JOB_TWO_PASS,
+                refine_model=self.model_size.get(),
+                audio_path=self.audio_path.get(),
+                output_path=self.output_path.get(),
+                optimize_speed=self.optimize_speed.get()
+            )
+        else:
+            self.worker.submit(
+                JOB_CONVERT,
+                audio_path=self.audio_path.get(),
+                output_path=self.output_path.get(),
+                model_size=self.model_size.get(),
+                optimize_speed=self.optimize_speed.get(),  # 최적화 옵션 전달
+                deadline_seconds=self.deadline_seconds,  # 자동 모드 목표 시간
+                selective_redecode=self.selective_redecode.get()
+            )
         
-        # 별도 스레드에서 변환 실행
-        thread = threading.Thread(target=self.convert_audio)
-        thread.daemon = True
-        thread.start()
+        # 변환은 워커 프로세스에서 실행되고, GUI는 주기적으로 메시지만 확인
+        self.root.after(WORKER_POLL_MS, self.poll_worker)
     
-    def convert_audio(self):
-        """음성 변환 실행"""
-        try:
-            result = self.converter.convert_audio(
-                self.audio_path.get(),
-                self.output_path.get(),
-                self.model_size.get(),
-                self.optimize_speed.get()  # 최적화 옵션 전달
-            )
-            
-            if result and not self.is_cancelled():
-                self.show_result(result)
-                messagebox.showinfo("완료", "음성 변환이 완료되었습니다!")
-            
-        except Exception as e:
-            if not self.is_cancelled():
-                messagebox.showerror("오류", f"변환 중 오류가 발생했습니다:\n{str(e)}")
-        finally:
-            # UI 상태 복원
-            self.root.after(0, self.finish_conversion)
+    def poll_worker(self):
+        """워커 프로세스 메시지 처리"""
+        for kind, _, *payload in self.worker.poll():
+            if kind == "progress":
+                self.update_progress(*payload)
+            elif kind == "metrics":
+                self.update_metrics(payload[0])
+            elif kind == "pass":
+                self.update_pass_progress(*payload)
+            elif kind == "chunk":
+                self.show_chunk(*payload)
+            elif kind == "result":
+                result, worker_rss = payload
+                self.finish_conversion()
+                if result:
+                    if not self.use_two_pass:
+                        # 2단계 변환의 구간별 결과는 이미 표시됨
+                        self.show_result(result)
+                    messagebox.showinfo("완료", "음성 변환이 완료되었습니다!")
+                # 큰 모델 실행 후 메모리가 많이 남아 있으면 워커를 새로 띄워 반환
+                self.worker.recycle_if_needed(worker_rss)
+            elif kind == "error":
+                self.finish_conversion()
+                messagebox.showerror("오류", f"변환 중 오류가 발생했습니다:\n{payload[0]}")
+        
+        if self.is_processing:
+            self.root.after(WORKER_POLL_MS, self.poll_worker)
     
     def cancel_conversion(self):
-        """변환 취소"""
-        if self.converter:
-            self.converter.cancel()
+        """변환 취소 (워커 프로세스를 바로 종료해 메모리까지 회수)"""
+        self.worker.cancel()
         self.finish_conversion()
         messagebox.showinfo("취소", "변환이 취소되었습니다.")
     
-    def is_cancelled(self):
-        """취소 여부 확인"""
-        return not self.is_processing
+    def on_close(self):
+        """창 닫기: 워커 프로세스 정리 후 종료"""
+        self.worker.shutdown()
+        self.root.destroy()
     
     def update_progress(self, message, percentage, elapsed_time, remaining_time):
         """진행 상황 업데이트"""
@@ -329,6 +377,28 @@ class WhisperGUI:
         
         self.root.after(0, update)
     
+    def update_pass_progress(self, pass_name, done, total, message):
+        """2단계 변환의 단계별 진행 상황 업데이트"""
+        def update():
+            self.progress_section.update_pass(pass_name, done, total, message)
+            if pass_name == REFINE_PASS:
+                # 전체 진행률은 정제 단계 기준
+                percentage = int(done / total * 100) if total else 0
+                self.progress_section.progress.config(value=percentage)
+                self.progress_section.percent_var.set(f"{percentage}%")
+                self.progress_section.progress_var.set(message)
+        
+        self.root.after(0, update)
+    
+    def update_metrics(self, snapshot):
+        """성능 지표 패널 업데이트"""
+        self.root.after(0, lambda: self.progress_section.update_metrics(snapshot))
+    
+    def show_chunk(self, chunk, segments, refined):
+        """구간 결과를 결과 영역에 삽입/교체"""
+        text = " ".join(seg["text"] for seg in segments)
+        self.root.after(0, lambda: self.result_section.set_chunk_text(chunk.index, text, refined))
+    
     def _get_stage_from_percentage(self, percentage):
         """퍼센트에 따른 단계 반환"""
         if percentage == 0:
@@ -0,0 +1,236 @@
+import os
+import threading
+
+import torch
+
+from cache_utils import get_cache_dir, atomic_write_json, read_json
+from hardware import get_hardware_profile, available_ram_bytes, cuda_free_bytes, get_process_rss
+
+MB = 1024**2
+
+# 모델별 구조 정보 (파라미터 수, 은닉 크기, 인코더/디코더 층 수, 멜 빈 수)
+MODEL_SPECS = {
+    "base": {"params": 74e6, "d_model": 512, "layers": 6, "n_mels": 80},
+    "small": {"params": 244e6, "d_model": 768, "layers": 12, "n_mels": 80},
+    "medium": {"params": 769e6, "d_model": 1024, "layers": 24, "n_mels": 80},
+    "large": {"params": 1550e6, "d_model": 1280, "layers": 32, "n_mels": 128},
+}
+MODEL_ORDER = ["large", "medium", "small", "base"]
+
+N_AUDIO_CTX = 1500   # 인코더 출력 길이 (30초)
+N_TEXT_CTX = 448     # 디코더 최대 토큰 수
+# 인코더 한 층에서 동시에 살아 있는 활성값 배수 (q/k/v/mlp 중간값 등)
+ENCODER_ACTIVATION_FACTOR = 12
+# 프레임워크 기본 사용량 (CUDA 컨텍스트, 파이썬/torch 런타임)
+CUDA_CONTEXT_BYTES = 500 * MB
+CPU_RUNTIME_BYTES = 400 * MB
+# 예상치에 더하는 안전 여유 비율
+SAFETY_MARGIN = 1.1
+# 실측 보정값 범위와 반영 비율
+CALIBRATION_RANGE = (0.5, 3.0)
+CALIBRATION_SMOOTHING = 0.3
+
+
+class MemoryPlanError(RuntimeError):
+    """어떤 설정으로도 메모리가 부족해 변환을 시작할 수 없음"""
+
+
+class MemoryEstimate:
+    """모델/장치/정밀도/배치 크기 조합의 예상 메모리 (바이트)"""
+
+    def __init__(self, model_size, device, fp16, batch_size, ram_bytes, vram_bytes):
+        self.model_size = model_size
+        self.device = device
+        self.fp16 = fp16
+        self.batch_size = batch_size
+        self.ram_bytes = ram_bytes
+        self.vram_bytes = vram_bytes
+
+    def describe(self):
+        parts = [f"RAM {self.ram_bytes / MB:.0f}MB"]
+        if self.device == "cuda":
+            parts.append(f"VRAM {self.vram_bytes / MB:.0f}MB")
+        return ", ".join(parts)
+
+
+class MemoryPlan:
+    """실행 가능한 설정과 그 근거"""
+
+    def __init__(self, estimate, available_ram, available_vram, changes):
+        self.estimate = estimate
+        self.model_size = estimate.model_size
+        self.device = estimate.device
+        self.fp16 = estimate.fp16
+        self.batch_size = estimate.batch_size
+        self.available_ram = available_ram
+        self.available_vram = available_vram
+        self.changes = changes  # 요청과 달라진 점 설명 목록
+
+
+class MemoryPlanner:
+    """모델 로드 전에 메모리 사용량을 추정해 실행 가능한 설정을 고르는 플래너
+
+    가중치 + 활성값 + kv 캐시를 구조 정보로 계산하고, 실제 작업에서 측정한
+    최대 사용량과의 비율로 보정합니다.
+    """
+
+    def __init__(self, calibration_path=None, hardware=None):
+        self.calibration_path = calibration_path or os.path.join(get_cache_dir("memory"), "calibration.json")
+        self.hardware = hardware or get_hardware_profile()
+        self._lock = threading.Lock()
+        self.calibration = read_json(self.calibration_path, {}) or {}
+
+    @staticmethod
+    def _calibration_key(model_size, device, fp16):
+        return f"{model_size}|{device}|{'fp16' if fp16 else 'fp32'}"
+
+    def raw_estimate(self, model_size, device, fp16, batch_size=1):
+        """보정 전 구조 기반 추정"""
+        spec = MODEL_SPECS[model_size]
+        act_bytes = 2 if fp16 else 4
+        # whisper는 가중치를 FP32로 보관하고 FP16 실행 시 연산마다 변환함
+        weights = spec["params"] * 4
+        encoder_activations = batch_size * N_AUDIO_CTX * spec["d_model"] * act_bytes * ENCODER_ACTIVATION_FACTOR
+        # 어텐션 점수 (배치 × 헤드 × 1500 × 1500), 헤드 크기 64 기준
+        n_heads = spec["d_model"] // 64
+        attention_scores = batch_size * n_heads * N_AUDIO_CTX * N_AUDIO_CTX * act_bytes
+        # 디코더 self-attention + cross-attention kv 캐시
+        kv_cache = 2 * spec["layers"] * batch_size * (N_TEXT_CTX + N_AUDIO_CTX) * spec["d_model"] * act_bytes
+        activations = encoder_activations + attention_scores + kv_cache
+
+        if device == "cuda":
+            # 체크포인트는 RAM에서 읽은 뒤 GPU로 옮겨짐
+            ram = CPU_RUNTIME_BYTES + weights
+            vram = CUDA_CONTEXT_BYTES + weights + activations
+        else:
+            # 로드 중에는 체크포인트와 모델이 동시에 메모리에 있음
+            ram = CPU_RUNTIME_BYTES + weights * 2 + activations
+            vram = 0
+        return MemoryEstimate(model_size, device, fp16, batch_size, ram, vram)
+
+    def estimate(self, model_size, device, fp16, batch_size=1):
+        """실측 보정을 반영한 추정"""
+        raw = self.raw_estimate(model_size, device, fp16, batch_size)
+        factor = self.calibration.get(self._calibration_key(model_size, device, fp16), {}).get("factor", 1.0)
+        ram = raw.ram_bytes * factor if device == "cpu" else raw.ram_bytes
+        vram = raw.vram_bytes * factor if device == "cuda" else 0
+        return MemoryEstimate(model_size, device, fp16, batch_size, ram * SAFETY_MARGIN, vram * SAFETY_MARGIN)
+
+    def _available(self, device):
+        """현재 사용 가능한 RAM/VRAM (모르면 None)"""
+        ram = available_ram_bytes()
+        vram = cuda_free_bytes() if device == "cuda" else None
+        return ram, vram
+
+    def fits(self, estimate, loaded_bytes=0):
+        """추정치가 현재 여유 메모리에 들어가는지 여부 (이미 로드된 모델 메모리는 재사용)"""
+        ram, vram = self._available(estimate.device)
+        ram_ok = ram is None or estimate.ram_bytes <= ram + loaded_bytes
+        if estimate.device == "cuda":
+            return ram_ok and (vram is None or estimate.vram_bytes <= vram + loaded_bytes)
+        return ram_ok
+
+    def plan(self, model_size, device=None, fp16=None, batch_size=1, allow_model_downgrade=False, loaded_bytes=0):
+        """실행 가능한 설정 선택
+
+        요청한 설정이 들어가지 않으면 배치(빔) 크기 축소 → CPU 전환 → (허용 시) 작은 모델
+        순서로 시도하고, 모두 안 되면 이유를 담아 MemoryPlanError를 발생시킵니다.
+        """
+        device = device or self.hardware.device
+        fp16 = self.hardware.use_fp16(device) if fp16 is None else fp16
+
+        candidates = [(model_size, device, fp16, batch_size, [])]
+        if batch_size > 1:
+            candidates.append((model_size, device, fp16, 1, [f"빔 크기 {batch_size} → 1"]))
+        if device == "cuda":
+            candidates.append((model_size, "cpu", False, 1, ["GPU 메모리 부족으로 CPU 사용"]))
+        if allow_model_downgrade:
+            start = MODEL_ORDER.index(model_size) + 1
+            for smaller in MODEL_ORDER[start:]:
+                candidates.append((smaller, device, fp16, 1, [f"{model_size} → {smaller} 모델"]))
+
+        for size, dev, half, batch, changes in candidates:
+            estimate = self.estimate(size, dev, half, batch)
+            if self.fits(estimate, loaded_bytes):
+                ram, vram = self._available(dev)
+                return MemoryPlan(estimate, ram, vram, changes)
+
+        requested = self.estimate(model_size, device, fp16, batch_size)
+        ram, vram = self._available(device)
+        available = f"사용 가능 RAM {ram / MB:.0f}MB" if ram is not None else "사용 가능 RAM 알 수 없음"
+        if device == "cuda" and vram is not None:
+            available += f", VRAM {vram / MB:.0f}MB"
+        smaller = [size for size in MODEL_ORDER[MODEL_ORDER.index(model_size) + 1:]
+                   if self.fits(self.estimate(size, "cpu", False, 1))]
+        hint = f" '{smaller[0]}' 모델은 실행 가능합니다." if smaller else " 다른 프로그램을 종료해 메모리를 확보하세요."
+        raise MemoryPlanError(
+            f"메모리 부족: '{model_size}' 모델에 {requested.describe()}이(가) 필요하지만 {available}입니다.{hint}"
+        )
+
+    def record(self, estimate, peak_ram_bytes, peak_vram_bytes):
+        """실제 최대 사용량으로 보정값 갱신"""
+        raw = self.raw_estimate(estimate.model_size, estimate.device, estimate.fp16, estimate.batch_size)
+        if estimate.device == "cuda":
+            actual, expected = peak_vram_bytes, raw.vram_bytes
+        else:
+            actual, expected = peak_ram_bytes, raw.ram_bytes
+        if not actual or not expected:
+            return
+
+        ratio = min(max(actual / expected, CALIBRATION_RANGE[0]), CALIBRATION_RANGE[1])
+        key = self._calibration_key(estimate.model_size, estimate.device, estimate.fp16)
+        with self._lock:
+            entry = self.calibration.get(key)
+            if entry:
+                entry["factor"] = entry["factor"] * (1 - CALIBRATION_SMOOTHING) + ratio * CALIBRATION_SMOOTHING
+                entry["samples"] += 1
+            else:
+                entry = {"factor": ratio, "samples": 1}
+                self.calibration[key] = entry
+            entry["last_peak_mb"] = actual / MB
+            atomic_write_json(self.calibration_path, self.calibration)
+
+
+class PeakMemoryTracker:
+    """작업 하나의 최대 RAM(RSS)/VRAM 사용량 측정
+
+    RSS는 백그라운드 스레드에서 주기적으로 샘플링하고, VRAM은 torch의 최대 할당량을 사용합니다.
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_vram = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak_rss = max(self.peak_rss, get_process_rss())
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self.peak_rss = get_process_rss()
+        self._stop.clear()
+        if torch.cuda.is_available():
+            torch.cuda.reset_peak_memory_stats()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        self.peak_rss = max(self.peak_rss, get_process_rss())
+        if torch.cuda.is_available():
+            self.peak_vram = torch.cuda.max_memory_allocated() + CUDA_CONTEXT_BYTES
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -0,0 +1,149 @@
+import time
+import threading
+from contextlib import contextmanager
+
+import torch
+from whisper.audio import HOP_LENGTH, SAMPLE_RATE
+from whisper.decoding import LogitFilter
+
+from whisper_hooks import decode_progress, extra_logit_filter
+from hardware import get_process_rss
+
+MB = 1024**2
+# GUI/헤드리스 모니터링 기본 샘플링 간격 (초)
+DEFAULT_SAMPLE_INTERVAL = 1.0
+
+
+class _TokenCounter(LogitFilter):
+    """디코딩 단계마다 생성되는 토큰 수를 세는 로짓 필터 (로짓은 건드리지 않음)
+
+    빔 검색/best_of에서는 한 단계에 음성 하나당 후보 n_group개를 함께 계산하므로,
+    배치 행 수를 n_group으로 나눠 실제로 내보내는 토큰 수만 셉니다.
+    """
+
+    def __init__(self, metrics, n_group=1):
+        self.metrics = metrics
+        self.n_group = max(n_group, 1)
+
+    def apply(self, logits, tokens):
+        self.metrics.add_tokens(max(tokens.shape[0] // self.n_group, 1))
+
+
+class MetricsCollector:
+    """변환 중 실시간 성능 지표 수집기
+
+    디코딩 스레드는 카운터만 올리고(멜 프레임 수, 토큰 수), 나머지 값(RSS, 장치 메모리,
+    처리 속도)은 snapshot()을 부를 때 계산하므로 1초마다 샘플링해도 디코딩이 느려지지 않습니다.
+    """
+
+    def __init__(self, device="cpu"):
+        self.device = device
+        self._lock = threading.Lock()
+        self._sampler = None
+        self._sampler_stop = threading.Event()
+        self.reset()
+
+    def reset(self, audio_duration=None):
+        """새 작업 시작"""
+        with self._lock:
+            self.job_start = time.time()
+            self.audio_duration = audio_duration
+            self.stage = "대기 중"
+            self.stage_start = self.job_start
+            self.decode_start = None
+            self.decode_seconds = 0.0  # 이전 디코딩 구간들의 누적 시간
+            self._active_decodes = 0  # track() 중인 스레드 수 (2단계 변환은 두 스레드가 동시에 디코딩)
+            self.decoded_frames = 0
+            self.tokens = 0
+
+    def set_stage(self, stage):
+        with self._lock:
+            self.stage = stage
+            self.stage_start = time.time()
+
+    def add_frames(self, frames):
+        with self._lock:
+            self.decoded_frames += frames
+
+    def add_tokens(self, count):
+        with self._lock:
+            self.tokens += count
+
+    @contextmanager
+    def track(self):
+        """이 블록 안에서 현재 스레드가 실행하는 transcribe()의 디코딩 진행을 집계
+
+        여러 스레드가 동시에 track()하면 디코딩 시간은 어느 하나라도 디코딩 중인 시간(벽시계)으로 셉니다.
+        """
+        with self._lock:
+            if self._active_decodes == 0:
+                self.decode_start = time.time()
+            self._active_decodes += 1
+        try:
+            with decode_progress(self.add_frames), \
+                    extra_logit_filter(lambda task: _TokenCounter(self, task.n_group)):
+                yield self
+        finally:
+            with self._lock:
+                self._active_decodes -= 1
+                if self._active_decodes == 0:
+                    self.decode_seconds += time.time() - self.decode_start
+                    self.decode_start = None
+
+    def snapshot(self):
+        """현재 지표 (dict)"""
+        now = time.time()
+        with self._lock:
+            decode_seconds = self.decode_seconds + (now - self.decode_start if self.decode_start else 0.0)
+            decoded_audio = self.decoded_frames * HOP_LENGTH / SAMPLE_RATE
+            snapshot = {
+                "stage": self.stage,
+                "stage_seconds": now - self.stage_start,
+                "elapsed_seconds": now - self.job_start,
+                "audio_duration": self.audio_duration,
+                "decoded_audio_seconds": decoded_audio,
+                "decode_seconds": decode_seconds,
+                # 음성 1초를 처리하는 데 걸린 시간 (1보다 작으면 실시간보다 빠름)
+                "real_time_factor": decode_seconds / decoded_audio if decoded_audio else None,
+                "tokens": self.tokens,
+                "tokens_per_second": self.tokens / decode_seconds if decode_seconds else None,
+            }
+        snapshot["rss_mb"] = get_process_rss() / MB
+        # memory_allocated는 할당기 통계만 읽으므로 GPU 동기화가 일어나지 않음
+        snapshot["device_memory_mb"] = (torch.cuda.memory_allocated() / MB
+                                        if self.device == "cuda" and torch.cuda.is_available() else None)
+        return snapshot
+
+    def start_sampling(self, callback, interval=DEFAULT_SAMPLE_INTERVAL):
+        """interval초마다 callback(snapshot)을 호출하는 샘플링 스레드 시작"""
+        self.stop_sampling()
+        self._sampler_stop.clear()
+
+        def sample():
+            while not self._sampler_stop.wait(interval):
+                callback(self.snapshot())
+
+        self._sampler = threading.Thread(target=sample, daemon=True)
+        self._sampler.start()
+
+    def stop_sampling(self):
+        """샘플링 스레드 중지 (마지막 값을 한 번 더 전달하지는 않음)"""
+        if self._sampler is not None:
+            self._sampler_stop.set()
+            self._sampler.join()
+            self._sampler = None
+
+
+def format_metrics(snapshot):
+    """지표를 한 줄 요약 문자열로 변환"""
+    parts = [f"{snapshot['stage']} {snapshot['stage_seconds']:.0f}초"]
+    if snapshot["decoded_audio_seconds"]:
+        parts.append(f"처리 음성 {snapshot['decoded_audio_seconds']:.0f}초")
+    if snapshot["real_time_factor"] is not None:
+        parts.append(f"RTF {snapshot['real_time_factor']:.2f}")
+    if snapshot["tokens_per_second"] is not None:
+        parts.append(f"{snapshot['tokens_per_second']:.1f} 토큰/초")
+    parts.append(f"RSS {snapshot['rss_mb']:.0f}MB")
+    if snapshot["device_memory_mb"] is not None:
+        parts.append(f"GPU {snapshot['device_memory_mb']:.0f}MB")
+    return " · ".join(parts)
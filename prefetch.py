@@ -0,0 +1,253 @@
+import os
+import time
+import argparse
+import tempfile
+import threading
+from collections import deque
+
+from converter import WhisperConverter
+from features import FeatureStage
+from hardware import available_ram_bytes
+from memory_planner import MODEL_SPECS
+
+# 프리페치에 쓸 수 있는 메모리 (현재 여유 RAM 대비 비율, 최대값)
+PREFETCH_RAM_FRACTION = 0.1
+MAX_PREFETCH_BYTES = 2 * 1024**3
+DEFAULT_PREFETCH_DEPTH = 2
+
+
+def n_mels_for(model_size):
+    """모델이 사용하는 멜 빈 수 (자동 모드 등 알 수 없으면 80)"""
+    return MODEL_SPECS.get(model_size, {}).get("n_mels", 80)
+
+
+def default_prefetch_budget():
+    """프리페치 메모리 한도 기본값"""
+    available = available_ram_bytes()
+    if available is None:
+        return MAX_PREFETCH_BYTES // 4
+    return int(min(available * PREFETCH_RAM_FRACTION, MAX_PREFETCH_BYTES))
+
+
+class AudioPrefetcher:
+    """다음 파일들의 음성 디코딩과 멜 특징 계산을 미리 해 두는 백그라운드 단계
+
+    현재 파일이 모델을 통과하는 동안 최대 depth개 파일을 준비하며, 준비된 멜 특징이
+    memory_budget 바이트를 넘으면 소비(release)될 때까지 더 준비하지 않습니다.
+    준비된 특징은 FeatureStage 메모리에 올라가므로 변환기는 그대로 get_mel()을 부르면 됩니다.
+    """
+
+    def __init__(self, feature_stage, n_mels=80, depth=DEFAULT_PREFETCH_DEPTH, memory_budget=None):
+        self.feature_stage = feature_stage
+        self.n_mels = n_mels
+        self.depth = depth
+        self.memory_budget = memory_budget or default_prefetch_budget()
+        self._pending = deque()
+        self._ready = {}     # 경로 → 메모리 사용량
+        self._failed = {}    # 경로 → 예외 (변환기가 직접 다시 시도하면서 오류를 보고함)
+        self._preparing = None
+        self._discard = set()  # 준비 중에 이미 소비(release)된 파일
+        self._held_bytes = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"prepared": 0, "prepare_seconds": 0.0, "peak_bytes": 0, "budget_waits": 0}
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, paths):
+        """준비할 파일 추가 (처리 순서대로)"""
+        with self._cond:
+            self._pending.extend(paths)
+            self._cond.notify_all()
+
+    def _can_prepare(self):
+        if not self._pending:
+            return False
+        if len(self._ready) >= self.depth:
+            return False
+        # 준비된 것이 하나도 없으면 한도를 넘더라도 다음 한 개는 준비
+        if self._ready and self._held_bytes >= self.memory_budget:
+            return False
+        return True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closed and not self._can_prepare():
+                    if self._pending:
+                        self.stats["budget_waits"] += 1
+                    self._cond.wait()
+                if self._closed:
+                    return
+                path = self._pending.popleft()
+                self._preparing = path
+
+            start = time.time()
+            try:
+                nbytes = self.feature_stage.preload_mel(path, self.n_mels)
+                error = None
+            except Exception as e:
+                nbytes, error = 0, e
+
+            with self._cond:
+                self._preparing = None
+                if error is not None:
+                    self._failed[path] = error
+                elif self._closed or path in self._discard:
+                    self._discard.discard(path)
+                    self.feature_stage.release_mel(path)
+                else:
+                    self._ready[path] = nbytes
+                    self._held_bytes += nbytes
+                    self.stats["prepared"] += 1
+                    self.stats["prepare_seconds"] += time.time() - start
+                    self.stats["peak_bytes"] = max(self.stats["peak_bytes"], self._held_bytes)
+                self._cond.notify_all()
+
+    def wait(self, path, timeout=None):
+        """해당 파일 준비가 끝날 때까지 대기 (기다린 시간 반환, 제출하지 않은 파일은 바로 반환)"""
+        start = time.time()
+        with self._cond:
+            self._cond.wait_for(
+                lambda: path in self._ready or path in self._failed or
+                (path not in self._pending and path != self._preparing),
+                timeout
+            )
+            self._failed.pop(path, None)
+        return time.time() - start
+
+    def release(self, path):
+        """변환이 끝난 파일의 특징을 메모리에서 내리고 다음 준비를 허용"""
+        with self._cond:
+            nbytes = self._ready.pop(path, 0)
+            self._held_bytes -= nbytes
+            if path in self._pending:
+                self._pending.remove(path)
+            if path == self._preparing:
+                self._discard.add(path)
+            self._cond.notify_all()
+        self.feature_stage.release_mel(path)
+
+    def close(self):
+        """준비 중단 및 메모리 해제"""
+        with self._cond:
+            self._closed = True
+            ready = list(self._ready)
+            self._ready.clear()
+            self._pending.clear()
+            self._held_bytes = 0
+            self._cond.notify_all()
+        self._thread.join()
+        for path in ready:
+            self.feature_stage.release_mel(path)
+
+
+def output_paths(audio_paths, output_dir):
+    """입력 파일별 결과 파일 경로 (다른 폴더의 같은 이름 파일이 서로 덮어쓰면 ValueError)"""
+    paths = {}
+    owners = {}
+    for audio_path in audio_paths:
+        stem = os.path.splitext(os.path.basename(audio_path))[0]
+        output_path = os.path.join(output_dir, f"{stem}_변환결과.txt")
+        owner = owners.setdefault(os.path.normcase(output_path), audio_path)
+        if os.path.abspath(owner) != os.path.abspath(audio_path):
+            raise ValueError(f"결과 파일 이름이 겹칩니다: {owner}, {audio_path} → {output_path}")
+        paths[audio_path] = output_path
+    return paths
+
+
+def batch_convert(audio_paths, output_dir, model_size="base", optimize_speed=True,
+                  prefetch_depth=DEFAULT_PREFETCH_DEPTH, feature_stage=None, log_callback=print):
+    """여러 파일을 순서대로 변환하며 다음 파일을 미리 준비 (prefetch_depth=0이면 준비 없이 순차 실행)
+
+    모델 유휴 시간(전체 시간 - 모델이 디코딩한 시간) 통계를 반환합니다.
+    변환에 실패한 파일은 기록하고 건너뛰며 stats["failed"]에 셉니다.
+    결과 파일 이름이 겹치는 입력이 있으면 변환을 시작하기 전에 ValueError를 발생시킵니다.
+    """
+    log = log_callback or (lambda message: None)
+    outputs = output_paths(audio_paths, output_dir)
+    feature_stage = feature_stage or FeatureStage(keep_audio=False)
+    converter = WhisperConverter(feature_stage=feature_stage)
+    prefetcher = None
+    if prefetch_depth > 0:
+        prefetcher = AudioPrefetcher(feature_stage, n_mels_for(model_size), prefetch_depth)
+        prefetcher.submit(audio_paths)
+
+    os.makedirs(output_dir, exist_ok=True)
+    stats = {"files": 0, "failed": 0, "wall_seconds": 0.0, "decode_seconds": 0.0, "prefetch_wait_seconds": 0.0}
+    start = time.time()
+    try:
+        for audio_path in audio_paths:
+            if prefetcher:
+                stats["prefetch_wait_seconds"] += prefetcher.wait(audio_path)
+            file_start = time.time()
+            try:
+                converter.convert_audio(audio_path, outputs[audio_path], model_size, optimize_speed)
+            except Exception as e:
+                # 손상된 파일 하나 때문에 나머지 파일을 포기하지 않음
+                stats["failed"] += 1
+                log(f"❌ {os.path.basename(audio_path)} 변환 실패: {e}")
+                continue
+            finally:
+                if prefetcher:
+                    prefetcher.release(audio_path)
+            decode_seconds = converter.get_metrics_snapshot()["decode_seconds"]
+            stats["decode_seconds"] += decode_seconds
+            stats["files"] += 1
+            log(f"✅ {os.path.basename(audio_path)} ({time.time() - file_start:.1f}초, 모델 {decode_seconds:.1f}초)")
+    finally:
+        if prefetcher:
+            prefetcher.close()
+
+    stats["wall_seconds"] = time.time() - start
+    stats["model_idle_seconds"] = max(stats["wall_seconds"] - stats["decode_seconds"], 0.0)
+    stats["model_idle_fraction"] = stats["model_idle_seconds"] / stats["wall_seconds"] if stats["wall_seconds"] else 0.0
+    if prefetcher:
+        stats["prefetch"] = dict(prefetcher.stats, depth=prefetch_depth, budget_bytes=prefetcher.memory_budget)
+    return stats
+
+
+def _print_stats(title, stats):
+    print(f"📊 {title}: 전체 {stats['wall_seconds']:.1f}초, 모델 디코딩 {stats['decode_seconds']:.1f}초, "
+          f"모델 유휴 {stats['model_idle_seconds']:.1f}초 ({stats['model_idle_fraction'] * 100:.0f}%)")
+    if stats["failed"]:
+        print(f"   ❌ 실패 {stats['failed']}개 (완료 {stats['files']}개)")
+    if "prefetch" in stats:
+        prefetch = stats["prefetch"]
+        print(f"   프리페치 대기 {stats['prefetch_wait_seconds']:.1f}초, 준비 {prefetch['prepared']}개 "
+              f"({prefetch['prepare_seconds']:.1f}초), 최대 메모리 {prefetch['peak_bytes'] / 1024**2:.0f}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="여러 음성 파일 일괄 변환 (다음 파일 미리 준비)")
+    parser.add_argument("files", nargs="+", help="변환할 음성 파일")
+    parser.add_argument("--output-dir", required=True, help="결과 저장 폴더")
+    parser.add_argument("--model", default="base", help="모델 크기")
+    parser.add_argument("--no-optimize", action="store_true", help="정확도 우선 옵션 사용")
+    parser.add_argument("--depth", type=int, default=DEFAULT_PREFETCH_DEPTH, help="미리 준비할 파일 수 (0이면 끔)")
+    parser.add_argument("--compare", action="store_true",
+                        help="프리페치 없이 한 번, 있이 한 번 실행해 모델 유휴 시간 비교 (각각 빈 특징 캐시 사용)")
+    args = parser.parse_args()
+    try:
+        output_paths(args.files, args.output_dir)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if not args.compare:
+        _print_stats("일괄 변환", batch_convert(args.files, args.output_dir, args.model,
+                                              not args.no_optimize, args.depth))
+        return
+
+    results = {}
+    for title, depth in [("프리페치 없음", 0), (f"프리페치 {args.depth}개", args.depth)]:
+        # 멜 캐시가 이전 실행 결과로 채워지지 않도록 실행마다 빈 캐시 폴더 사용
+        with tempfile.TemporaryDirectory() as cache_dir:
+            stage = FeatureStage(cache_dir=cache_dir, keep_audio=False)
+            results[title] = batch_convert(args.files, args.output_dir, args.model, not args.no_optimize,
+                                           depth, feature_stage=stage)
+    for title, stats in results.items():
+        _print_stats(title, stats)
+
+
+if __name__ == "__main__":
+    main()
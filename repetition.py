@@ -0,0 +1,145 @@
+import threading
+from contextlib import contextmanager
+
+import torch
+from whisper.decoding import LogitFilter
+
+from whisper_hooks import extra_logit_filter
+
+# 반복으로 보는 최대 주기 (텍스트 토큰 수)
+MAX_PERIOD = 24
+# 주기와 상관없이 필요한 최소 반복 횟수
+MIN_REPEATS = 3
+# 반복 구간 전체가 이 토큰 수 이상이어야 반복으로 판단 ("네 네 네" 같은 짧은 반복 허용)
+MIN_LOOP_TOKENS = 16
+
+
+def new_repetition_stats():
+    """반복 감지 통계 초기값"""
+    return {"loops": 0, "saved_steps": 0, "dropped_tokens": 0}
+
+
+def find_loop(tokens, max_period=MAX_PERIOD, min_repeats=MIN_REPEATS, min_loop_tokens=MIN_LOOP_TOKENS):
+    """토큰 목록 끝에서 같은 구절이 연속 반복되는지 확인
+
+    (주기, 반복 횟수)를 반환하며 반복이 아니면 None을 반환합니다.
+    짧은 주기부터 확인하므로 가장 작은 반복 단위가 선택됩니다.
+    """
+    length = len(tokens)
+    for period in range(1, min(max_period, length // min_repeats) + 1):
+        required = max(min_repeats, -(-min_loop_tokens // period))
+        if required * period > length:
+            continue
+        tail = tokens[length - period:]
+        repeats = 1
+        while (repeats + 1) * period <= length and \
+                tokens[length - (repeats + 1) * period:length - repeats * period] == tail:
+            repeats += 1
+        if repeats >= required:
+            return period, repeats
+    return None
+
+
+class RepetitionFilter(LogitFilter):
+    """디코딩 중 토큰 흐름을 보고 반복 루프를 발견하면 창을 바로 끝내는 로짓 필터
+
+    타임스탬프를 뺀 텍스트 토큰 끝에서 반복을 찾으면 두 번째 반복이 시작되는 위치에
+    EOT를 써 넣고 이번 단계의 출력도 EOT로 고정합니다. whisper는 첫 EOT까지만
+    결과로 쓰므로 반복 구간은 한 번만 남고, 잘린 위치 앞에 타임스탬프 쌍이 있으면
+    transcribe()가 그 시각부터 다음 창을 다시 디코딩합니다.
+
+    디코더는 버린 토큰의 로그 확률도 이미 sum_logprobs에 더했으므로, 토큰별 로그 확률을
+    따로 기록해 두었다가 자른 만큼 다음 update() 전에 빼 줍니다. 그래야 avg_logprob이 남은
+    토큰만으로 계산되어 온도 재시도(fallback)가 잘라낸 반복 때문에 잘못 일어나지 않습니다.
+    """
+
+    def __init__(self, task, stats, lock):
+        self.tokenizer = task.tokenizer
+        self.sample_begin = task.sample_begin
+        self.sample_len = task.sample_len
+        self.eot = task.tokenizer.eot
+        self.stats = stats
+        self.lock = lock
+        self._prev_logprobs = None  # 직전 단계의 행별 로그 확률 (필터 적용 후, 디코더가 쓰는 값과 같음)
+        self._prev_rows = {}        # 직전 단계 토큰 열 → 행 번호 (빔 검색은 행 순서가 바뀜)
+        self._histories = {}        # 토큰 열 → 토큰별 로그 확률 목록
+        self._corrections = {}      # 행 번호 → sum_logprobs에서 뺄 값
+
+        # 이 창의 디코더 update()가 sum_logprobs를 쓰기 전에 보정값을 반영하도록 감쌈
+        update = task.decoder.update
+
+        def update_without_dropped(tokens, logits, sum_logprobs):
+            for row, value in self._corrections.items():
+                sum_logprobs[row] -= value
+            self._corrections.clear()
+            return update(tokens, logits, sum_logprobs)
+
+        task.decoder.update = update_without_dropped
+
+    def _track_logprobs(self, sequences):
+        """직전 단계에 뽑힌 토큰의 로그 확률을 토큰 열별 기록에 이어 붙임"""
+        histories = {}
+        if self._prev_logprobs is not None:
+            lookups = []
+            for sequence in sequences:
+                source = self._prev_rows.get(tuple(sequence[:-1]))
+                if source is not None and sequence:
+                    lookups.append((sequence, source))
+            if lookups:
+                rows = torch.tensor([source for _, source in lookups], device=self._prev_logprobs.device)
+                picked = torch.tensor([sequence[-1] for sequence, _ in lookups], device=self._prev_logprobs.device)
+                values = self._prev_logprobs[rows, picked].tolist()
+                for (sequence, source), value in zip(lookups, values):
+                    history = self._histories.get(tuple(sequence[:-1]))
+                    if history is not None:
+                        histories[tuple(sequence)] = history + [value]
+        else:
+            histories = {tuple(sequence): [] for sequence in sequences if not sequence}
+        self._histories = histories
+
+    def apply(self, logits, tokens):
+        generated = tokens.shape[1] - self.sample_begin
+        sequences = [tokens[row, self.sample_begin:].tolist() for row in range(tokens.shape[0])]
+        self._track_logprobs(sequences)
+        if generated >= MIN_LOOP_TOKENS:
+            self._cut_loops(logits, tokens, sequences, generated)
+        self._prev_logprobs = torch.log_softmax(logits.float(), dim=-1)
+        self._prev_rows = {tuple(sequence): row for row, sequence in enumerate(sequences)}
+
+    def _cut_loops(self, logits, tokens, sequences, generated):
+        for row, sequence in enumerate(sequences):
+            if sequence and sequence[-1] == self.eot:
+                continue
+            # 타임스탬프 등 특수 토큰(eot 이상)은 빼고 텍스트 토큰만 비교
+            positions = [i for i, token in enumerate(sequence) if token < self.eot]
+            text_tokens = [sequence[i] for i in positions]
+            loop = find_loop(text_tokens)
+            if loop is None:
+                continue
+
+            period, repeats = loop
+            # 첫 번째 반복만 남기고 두 번째 반복 시작 위치에서 자름
+            cut = positions[len(text_tokens) - (repeats - 1) * period]
+            tokens[row, self.sample_begin + cut] = self.eot
+            logits[row, :] = -float("inf")
+            logits[row, self.eot] = 0
+            history = self._histories.get(tuple(sequence))
+            if history is not None:
+                self._corrections[row] = sum(history[cut:])
+            with self.lock:
+                self.stats["loops"] += 1
+                self.stats["saved_steps"] += max(self.sample_len - generated, 0)
+                self.stats["dropped_tokens"] += len(sequence) - cut
+
+
+@contextmanager
+def repetition_guard(stats=None):
+    """현재 스레드의 transcribe()/decode()에 반복 루프 감지 적용
+
+    stats dict(new_repetition_stats 형식)에 감지 횟수, 아낀 디코딩 단계 수(토큰 한도까지
+    남은 단계), 버린 토큰 수가 누적됩니다.
+    """
+    stats = stats if stats is not None else new_repetition_stats()
+    lock = threading.Lock()
+    with extra_logit_filter(lambda task: RepetitionFilter(task, stats, lock)):
+        yield stats
@@ -0,0 +1,359 @@
+import os
+import re
+import math
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import threading
+import unicodedata
+from itertools import accumulate
+from collections import Counter
+
+from cache_utils import get_cache_dir
+
+# 변환 결과 파일 이름 패턴 (GUI/감시 폴더 기본 저장 이름)
+TRANSCRIPT_SUFFIX = "_변환결과.txt"
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 질의 문자열이 그대로 들어 있는 세그먼트에 곱하는 가중치
+PHRASE_BOOST = 1.5
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def normalize(text):
+    """검색용 정규화 (유니코드 NFKC + 소문자)"""
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def tokenize(text):
+    """한국어용 토큰화: 어절마다 글자 bigram (한 글자 어절은 그대로)
+
+    조사/어미가 붙은 어절("제품명을")도 어간의 bigram("제품", "품명")을 공유하므로
+    형태소 분석기 없이 부분 일치 검색이 됩니다.
+    """
+    tokens = []
+    for word in _WORD_RE.findall(normalize(text)):
+        if len(word) == 1:
+            tokens.append(word)
+        else:
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+class SearchIndex:
+    """변환 결과 전문 검색용 역색인 (SQLite)
+
+    세그먼트(시작/끝 시각 포함) 단위로 bigram 포스팅을 저장하고, 파일을 다시 색인하면
+    그 파일의 기존 세그먼트만 교체합니다. 질의는 모든 토큰을 포함한 세그먼트를
+    BM25로 순위를 매겨 (파일, 시각) 목록으로 돌려줍니다.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(get_cache_dir("search"), "index.sqlite3")
+        self._lock = threading.Lock()
+        self._stats = None  # (세그먼트 수, 평균 길이) 캐시, 쓰기 시 무효화
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "CREATE TABLE IF NOT EXISTS files ("
+            " id INTEGER PRIMARY KEY, path TEXT UNIQUE, size INTEGER, mtime_ns INTEGER, indexed_at REAL);"
+            "CREATE TABLE IF NOT EXISTS segments ("
+            " id INTEGER PRIMARY KEY, file_id INTEGER, start REAL, end REAL, text TEXT, length INTEGER);"
+            "CREATE INDEX IF NOT EXISTS segments_file ON segments(file_id);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT, segment_id INTEGER, tf INTEGER, PRIMARY KEY (term, segment_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_segment ON postings(segment_id);"
+        )
+        self.conn.commit()
+
+    def _remove_file(self, file_id):
+        self.conn.execute(
+            "DELETE FROM postings WHERE segment_id IN (SELECT id FROM segments WHERE file_id = ?)", (file_id,)
+        )
+        self.conn.execute("DELETE FROM segments WHERE file_id = ?", (file_id,))
+
+    def add_transcript(self, path, segments):
+        """변환 결과 한 건 색인 (이미 있으면 교체)
+
+        segments는 start/end/text를 가진 dict 목록이며, 시각을 모르면 start/end는 None일 수 있습니다.
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+            size, mtime_ns = stat.st_size, stat.st_mtime_ns
+        except OSError:
+            size, mtime_ns = None, None
+
+        with self._lock:
+            with self.conn:
+                row = self.conn.execute("SELECT id FROM files WHERE path = ?", (path,)).fetchone()
+                if row:
+                    file_id = row[0]
+                    self._remove_file(file_id)
+                    self.conn.execute("UPDATE files SET size = ?, mtime_ns = ?, indexed_at = ? WHERE id = ?",
+                                      (size, mtime_ns, time.time(), file_id))
+                else:
+                    file_id = self.conn.execute(
+                        "INSERT INTO files (path, size, mtime_ns, indexed_at) VALUES (?, ?, ?, ?)",
+                        (path, size, mtime_ns, time.time())
+                    ).lastrowid
+
+                postings = []
+                for seg in segments:
+                    text = seg["text"].strip()
+                    tokens = tokenize(text)
+                    if not tokens:
+                        continue
+                    segment_id = self.conn.execute(
+                        "INSERT INTO segments (file_id, start, end, text, length) VALUES (?, ?, ?, ?, ?)",
+                        (file_id, seg.get("start"), seg.get("end"), text, len(tokens))
+                    ).lastrowid
+                    postings.extend((term, segment_id, tf) for term, tf in Counter(tokens).items())
+                self.conn.executemany("INSERT INTO postings VALUES (?, ?, ?)", postings)
+            self._stats = None
+
+    def remove(self, path):
+        """파일을 색인에서 제거"""
+        with self._lock:
+            with self.conn:
+                row = self.conn.execute("SELECT id FROM files WHERE path = ?", (os.path.abspath(path),)).fetchone()
+                if row:
+                    self._remove_file(row[0])
+                    self.conn.execute("DELETE FROM files WHERE id = ?", (row[0],))
+            self._stats = None
+
+    def update_directory(self, directory):
+        """폴더의 변환 결과 파일 중 새로 생기거나 바뀐 것만 색인 (시각 정보가 없으므로 줄 단위)
+
+        사라진 파일은 색인에서 제거합니다. (추가, 제거) 개수를 반환합니다.
+        """
+        directory = os.path.abspath(directory)
+        # LIKE는 폴더 이름의 %, _ 를 와일드카드로 해석하므로 접두사를 그대로 비교
+        prefix = os.path.join(directory, "")
+        with self._lock:
+            known = {path: (size, mtime_ns) for path, size, mtime_ns in
+                     self.conn.execute("SELECT path, size, mtime_ns FROM files WHERE substr(path, 1, ?) = ?",
+                                       (len(prefix), prefix))}
+
+        added = 0
+        seen = set()
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if not name.endswith(TRANSCRIPT_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                seen.add(path)
+                stat = os.stat(path)
+                if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    lines = [{"start": None, "end": None, "text": line} for line in f if line.strip()]
+                self.add_transcript(path, lines)
+                added += 1
+
+        removed = 0
+        for path in known:
+            if path not in seen:
+                self.remove(path)
+                removed += 1
+        return added, removed
+
+    def _corpus_stats(self):
+        if self._stats is None:
+            count, avg_length = self.conn.execute("SELECT COUNT(*), AVG(length) FROM segments").fetchone()
+            self._stats = (count, avg_length or 1.0)
+        return self._stats
+
+    def search(self, query, limit=20):
+        """질의와 일치하는 세그먼트를 점수 순으로 반환
+
+        결과는 path, start, end, text, score를 가진 dict 목록입니다.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+
+        with self._lock:
+            total, avg_length = self._corpus_stats()
+            doc_freq = {}
+            for term in terms:
+                doc_freq[term] = self.conn.execute(
+                    "SELECT COUNT(*) FROM postings WHERE term = ?", (term,)
+                ).fetchone()[0]
+                if doc_freq[term] == 0:
+                    return []
+
+            # 희귀한 토큰부터 교집합을 좁혀 흔한 토큰의 포스팅은 후보 안에서만 조회
+            scores = None
+            for term in sorted(terms, key=doc_freq.get):
+                if scores is None:
+                    rows = self.conn.execute(
+                        "SELECT p.segment_id, p.tf, s.length FROM postings p JOIN segments s ON s.id = p.segment_id"
+                        " WHERE p.term = ?", (term,)
+                    ).fetchall()
+                    lengths = {segment_id: length for segment_id, _, length in rows}
+                    scores = {segment_id: 0.0 for segment_id, _, _ in rows}
+                    rows = [(segment_id, tf) for segment_id, tf, _ in rows]
+                else:
+                    candidates = list(scores)
+                    rows = []
+                    for i in range(0, len(candidates), 500):
+                        batch = candidates[i:i + 500]
+                        rows += self.conn.execute(
+                            f"SELECT segment_id, tf FROM postings WHERE term = ? AND segment_id IN "
+                            f"({','.join('?' * len(batch))})", [term] + batch
+                        ).fetchall()
+                    scores = {segment_id: scores[segment_id] for segment_id, _ in rows}
+                    if not scores:
+                        return []
+
+                df = doc_freq[term]
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                for segment_id, tf in rows:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[segment_id] / avg_length)
+                    scores[segment_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+            # 상위 후보만 본문을 읽어 질의 문자열이 그대로 있으면 가중치 부여
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit * 3]
+            ids = [segment_id for segment_id, _ in top]
+            rows = self.conn.execute(
+                f"SELECT s.id, f.path, s.start, s.end, s.text FROM segments s JOIN files f ON f.id = s.file_id"
+                f" WHERE s.id IN ({','.join('?' * len(ids))})", ids
+            ).fetchall()
+
+        phrase = normalize(query).strip()
+        results = []
+        for segment_id, path, start, end, text in rows:
+            score = scores[segment_id]
+            if phrase and phrase in normalize(text):
+                score *= PHRASE_BOOST
+            results.append({"path": path, "start": start, "end": end, "text": text, "score": score})
+        results.sort(key=lambda r: r["score"], reverse=True)
+        return results[:limit]
+
+    def stats(self):
+        """색인 크기 정보"""
+        with self._lock:
+            files = self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            segments, _ = self._corpus_stats()
+            terms = self.conn.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+        return {"files": files, "segments": segments, "terms": terms,
+                "db_mb": os.path.getsize(self.db_path) / 1024**2}
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def _format_offset(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+def _synthetic_corpus(file_count, segments_per_file, seed=0):
+    """벤치마크용 합성 말뭉치 (한글 음절로 만든 어휘를 지프 분포로 뽑음)"""
+    rng = random.Random(seed)
+    syllables = [chr(code) for code in range(0xAC00, 0xD7A4, 7)]
+    vocabulary = ["".join(rng.choice(syllables) for _ in range(rng.randint(1, 4))) for _ in range(20000)]
+    particles = ["", "은", "는", "이", "가", "을", "를", "에서", "으로", "입니다"]
+    cum_weights = list(accumulate(1 / (rank + 1) for rank in range(len(vocabulary))))
+    for file_index in range(file_count):
+        segments = []
+        for seg_index in range(segments_per_file):
+            words = rng.choices(vocabulary, cum_weights=cum_weights, k=rng.randint(6, 16))
+            text = " ".join(word + rng.choice(particles) for word in words)
+            segments.append({"start": seg_index * 5.0, "end": seg_index * 5.0 + 5.0, "text": text})
+        yield f"/synthetic/call_{file_index:05d}{TRANSCRIPT_SUFFIX}", segments, vocabulary
+
+
+def run_benchmark(file_count=2000, segments_per_file=120, queries=200):
+    """합성 말뭉치로 색인 속도와 질의 지연 시간 측정"""
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(os.path.join(tmp, "bench.sqlite3"))
+        start = time.time()
+        vocabulary = None
+        for path, segments, vocabulary in _synthetic_corpus(file_count, segments_per_file):
+            index.add_transcript(path, segments)
+        index_seconds = time.time() - start
+
+        rng = random.Random(1)
+        latencies = []
+        hits = 0
+        for i in range(queries):
+            # 흔한 단어 / 드문 단어 / 두 단어 구를 섞어서 질의
+            kind = i % 3
+            if kind == 0:
+                query = rng.choice(vocabulary[:200])
+            elif kind == 1:
+                query = rng.choice(vocabulary[5000:])
+            else:
+                query = " ".join(rng.sample(vocabulary[:2000], 2))
+            query_start = time.perf_counter()
+            hits += bool(index.search(query, limit=10))
+            latencies.append((time.perf_counter() - query_start) * 1000)
+
+        stats = index.stats()
+        index.close()
+
+    latencies.sort()
+    return {
+        "files": stats["files"],
+        "segments": stats["segments"],
+        "terms": stats["terms"],
+        "db_mb": stats["db_mb"],
+        "index_seconds": index_seconds,
+        "segments_per_second": stats["segments"] / index_seconds if index_seconds else None,
+        "queries": queries,
+        "queries_with_hits": hits,
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[int(len(latencies) * 0.95)],
+        "max_ms": latencies[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="변환 결과 전문 검색")
+    parser.add_argument("--db", help="색인 파일 경로 (기본: 캐시 폴더)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search_parser = commands.add_parser("search", help="검색")
+    search_parser.add_argument("query", help="검색어")
+    search_parser.add_argument("--limit", type=int, default=20, help="최대 결과 수")
+    index_parser = commands.add_parser("index", help="폴더의 변환 결과 파일 색인 (바뀐 파일만)")
+    index_parser.add_argument("directory", help="변환 결과 폴더")
+    bench_parser = commands.add_parser("benchmark", help="합성 말뭉치로 질의 지연 시간 측정")
+    bench_parser.add_argument("--files", type=int, default=2000, help="합성 파일 수")
+    bench_parser.add_argument("--segments", type=int, default=120, help="파일당 세그먼트 수")
+    bench_parser.add_argument("--queries", type=int, default=200, help="질의 수")
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        result = run_benchmark(args.files, args.segments, args.queries)
+        print("📊 검색 색인 벤치마크:")
+        for key, value in result.items():
+            print(f"   {key}: {value if isinstance(value, int) else round(value, 3)}")
+        return
+
+    index = SearchIndex(args.db)
+    try:
+        if args.command == "index":
+            added, removed = index.update_directory(args.directory)
+            print(f"✅ {added}개 색인, {removed}개 제거 ({index.stats()['segments']}개 세그먼트)")
+        else:
+            start = time.perf_counter()
+            results = index.search(args.query, args.limit)
+            elapsed = (time.perf_counter() - start) * 1000
+            for result in results:
+                print(f"{result['score']:6.2f}  {result['path']}  [{_format_offset(result['start'])}]  {result['text']}")
+            print(f"🔍 {len(results)}개 결과 ({elapsed:.1f}ms)")
+    finally:
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
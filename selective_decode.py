@@ -0,0 +1,155 @@
+import time
+
+from whisper.audio import N_SAMPLES
+
+from chunking import transcribe_range
+from whisper_hooks import precomputed_mel
+
+# 재변환 대상 판정 기준 (whisper 기본 fallback 기준과 동일한 값)
+DEFAULT_THRESHOLDS = {
+    "avg_logprob": -1.0,        # 이보다 낮으면 자신 없는 결과
+    "compression_ratio": 2.4,   # 이보다 높으면 반복/환각 의심
+    "no_speech_prob": 0.6,      # 이보다 높은데 텍스트가 있으면 무음 환각 의심
+}
+# 재변환 구간 앞뒤로 덧붙이는 여유 (초, 인접한 정상 세그먼트를 넘지 않음)
+SPAN_PADDING = 0.5
+# 바로 이어진 약한 세그먼트끼리 이 간격 이하로 떨어져 있으면 한 구간으로 묶음 (초)
+MERGE_GAP = 1.0
+
+
+def weak_reasons(segment, thresholds=DEFAULT_THRESHOLDS):
+    """세그먼트가 재변환 대상인 이유 목록 반환 (빈 목록이면 정상)"""
+    reasons = []
+    avg_logprob = segment.get("avg_logprob")
+    compression_ratio = segment.get("compression_ratio")
+    no_speech_prob = segment.get("no_speech_prob")
+    low_logprob = avg_logprob is not None and avg_logprob < thresholds["avg_logprob"]
+    no_speech = no_speech_prob is not None and no_speech_prob > thresholds["no_speech_prob"]
+
+    if compression_ratio is not None and compression_ratio > thresholds["compression_ratio"]:
+        reasons.append("compression_ratio")
+    if low_logprob and not no_speech:
+        reasons.append("avg_logprob")
+    if no_speech and not low_logprob:
+        reasons.append("no_speech_prob")
+    return reasons
+
+
+def weak_spans(segments, duration, thresholds=DEFAULT_THRESHOLDS):
+    """재변환할 시간 구간 목록 [(start, end, [세그먼트 번호...]), ...] 반환
+
+    구간은 연속된 세그먼트만 묶습니다. 사이에 정상 세그먼트가 끼어 있으면 따로 나누므로,
+    재변환 결과로 교체할 때 정상 세그먼트가 사라지지 않습니다.
+    """
+    spans = []
+    for i, segment in enumerate(segments):
+        if not weak_reasons(segment, thresholds):
+            continue
+        if spans and i == spans[-1][2][-1] + 1 and segment["start"] - spans[-1][1] <= MERGE_GAP:
+            start, _, indices = spans[-1]
+            spans[-1] = (start, segment["end"], indices + [i])
+        else:
+            spans.append((segment["start"], segment["end"], [i]))
+
+    padded = []
+    for start, end, indices in spans:
+        # 앞뒤 정상 세그먼트와 겹치지 않는 범위에서만 여유를 둠
+        prev_end = segments[indices[0] - 1]["end"] if indices[0] > 0 else 0.0
+        next_start = segments[indices[-1] + 1]["start"] if indices[-1] + 1 < len(segments) else duration
+        padded.append((max(start - SPAN_PADDING, prev_end), min(end + SPAN_PADDING, next_start), indices))
+    return padded
+
+
+def _mean_logprob(segments):
+    values = [seg["avg_logprob"] for seg in segments if seg.get("avg_logprob") is not None]
+    return sum(values) / len(values) if values else float("-inf")
+
+
+class SelectiveRedecoder:
+    """전체를 그리디로 한 번 변환한 뒤 약한 세그먼트만 빔 검색으로 재변환
+
+    재변환 결과는 원래 세그먼트보다 평균 로그 확률이 나을 때만 교체합니다.
+    """
+
+    def __init__(self, model, greedy_options, redecode_options, thresholds=None,
+                 progress_callback=None, cancel_callback=None):
+        self.model = model
+        self.greedy_options = greedy_options      # 1차 그리디 변환 옵션
+        self.redecode_options = redecode_options  # 재변환 옵션 (빔 검색 등)
+        self.thresholds = thresholds or DEFAULT_THRESHOLDS
+        self.progress_callback = progress_callback
+        self.cancel_callback = cancel_callback
+        self.stats = {}
+
+    def _report(self, message, done=None, total=None):
+        if self.progress_callback:
+            self.progress_callback(message, done, total)
+
+    def _cancelled(self):
+        return bool(self.cancel_callback and self.cancel_callback())
+
+    def run(self, audio_path, mel, duration):
+        """선택적 재변환 실행 후 (세그먼트 목록, 통계) 반환 (취소 시 (None, 통계))"""
+        # 1) 그리디 변환
+        greedy_start = time.time()
+        options = dict(self.greedy_options)
+        options["verbose"] = None
+        with precomputed_mel(mel, N_SAMPLES):
+            result = self.model.transcribe(audio_path, **options)
+        segments = [
+            {
+                "start": seg["start"],
+                "end": seg["end"],
+                "text": seg["text"].strip(),
+                "tokens": seg.get("tokens", []),
+                "avg_logprob": seg.get("avg_logprob"),
+                "compression_ratio": seg.get("compression_ratio"),
+                "no_speech_prob": seg.get("no_speech_prob"),
+            }
+            for seg in result["segments"]
+        ]
+        greedy_time = time.time() - greedy_start
+
+        # 2) 약한 구간만 재변환
+        spans = weak_spans(segments, duration, self.thresholds)
+
+        redecode_start = time.time()
+        replacements = {}
+        accepted = 0
+        for done, (start, end, indices) in enumerate(spans):
+            if self._cancelled():
+                return None, self.stats
+            self._report(f"🎯 약한 구간 재변환 {done + 1}/{len(spans)} ({start:.1f}-{end:.1f}초)", done, len(spans))
+            new_segments = transcribe_range(self.model, audio_path, mel, start, end, self.redecode_options)
+            old_segments = [segments[i] for i in indices]
+            if new_segments and _mean_logprob(new_segments) >= _mean_logprob(old_segments):
+                replacements[indices[0]] = (indices, new_segments)
+                accepted += 1
+        redecode_time = time.time() - redecode_start
+
+        # 3) 결과 이어 붙이기
+        spliced = []
+        skip = set()
+        for i, segment in enumerate(segments):
+            if i in skip:
+                continue
+            if i in replacements:
+                indices, new_segments = replacements[i]
+                skip.update(indices)
+                spliced.extend(new_segments)
+            else:
+                spliced.append(segment)
+
+        redecoded_audio = sum(end - start for start, end, _ in spans)
+        self.stats = {
+            "audio_seconds": duration,
+            "segments": len(segments),
+            "weak_segments": sum(len(indices) for _, _, indices in spans),
+            "spans": len(spans),
+            "accepted_spans": accepted,
+            "redecoded_audio_seconds": redecoded_audio,
+            "redecoded_fraction": redecoded_audio / duration if duration > 0 else 0.0,
+            "greedy_time": greedy_time,
+            "redecode_time": redecode_time,
+        }
+        return [seg for seg in spliced if seg["text"]], self.stats
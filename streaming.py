@@ -0,0 +1,311 @@
+import sys
+import time
+import socket
+import argparse
+import threading
+from collections import deque
+
+import numpy as np
+import whisper
+from whisper.audio import SAMPLE_RATE
+
+from converter import WhisperConverter
+from hardware import get_hardware_profile, configure_torch_threads
+from repetition import repetition_guard, new_repetition_stats
+from encoder_reuse import reuse_encoder_features
+
+# 16비트 PCM 바이트를 float32로 바꿀 때 나누는 값
+PCM16_SCALE = 32768.0
+# 지연 시간 계산을 위해 보관하는 도착 기록 수
+ARRIVAL_HISTORY = 10000
+
+
+def pcm16_to_float(data):
+    """s16le PCM 바이트를 [-1, 1] float32 배열로 변환"""
+    return np.frombuffer(data, dtype=np.int16).astype(np.float32) / PCM16_SCALE
+
+
+def pipe_source(stream, block_bytes=3200):
+    """파이프/stdin에서 s16le 16kHz 모노 PCM을 읽는 소스 (기본 0.1초 단위)"""
+    pending = b""
+    while True:
+        data = stream.read(block_bytes)
+        if not data:
+            break
+        data = pending + data
+        # 샘플 경계(2바이트)에 맞춰 자르고 남는 바이트는 다음 블록으로
+        usable = len(data) - len(data) % 2
+        pending = data[usable:]
+        if usable:
+            yield data[:usable]
+
+
+def socket_source(host, port, block_bytes=3200):
+    """TCP 소켓에 접속해 s16le 16kHz 모노 PCM을 읽는 소스"""
+    with socket.create_connection((host, port)) as sock:
+        yield from pipe_source(sock.makefile("rb"), block_bytes)
+
+
+def replay_source(audio_path, speed=1.0, block_seconds=0.1):
+    """음성 파일을 실시간(speed=1) 또는 가속 속도로 흘려보내는 테스트용 가짜 소스"""
+    audio = whisper.load_audio(audio_path)
+    block = int(block_seconds * SAMPLE_RATE)
+    start = time.time()
+    for offset in range(0, len(audio), block):
+        # 실제 입력처럼 도착 시각에 맞춰 내보냄
+        due = start + offset / SAMPLE_RATE / speed
+        delay = due - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        yield audio[offset:offset + block]
+
+
+class RingBuffer:
+    """고정 크기 float32 링 버퍼 (절대 샘플 위치로 접근)"""
+
+    def __init__(self, capacity_seconds):
+        self.capacity = int(capacity_seconds * SAMPLE_RATE)
+        self.buffer = np.zeros(self.capacity, dtype=np.float32)
+        self.total = 0  # 지금까지 들어온 전체 샘플 수
+        self.lock = threading.Lock()
+
+    def write(self, samples):
+        with self.lock:
+            count = len(samples)
+            if count >= self.capacity:
+                samples = samples[-self.capacity:]
+            start = (self.total + count - len(samples)) % self.capacity
+            first = min(len(samples), self.capacity - start)
+            self.buffer[start:start + first] = samples[:first]
+            self.buffer[:len(samples) - first] = samples[first:]
+            self.total += count
+
+    @property
+    def oldest(self):
+        """버퍼에 남아 있는 가장 오래된 절대 샘플 위치"""
+        return max(0, self.total - self.capacity)
+
+    def read(self, start, end):
+        """[start, end) 절대 샘플 구간 복사 (버퍼에서 밀려난 부분은 잘림)"""
+        with self.lock:
+            start = max(start, self.oldest)
+            end = min(end, self.total)
+            if end <= start:
+                return np.zeros(0, dtype=np.float32)
+            first = start % self.capacity
+            length = end - start
+            if first + length <= self.capacity:
+                return self.buffer[first:first + length].copy()
+            head = self.capacity - first
+            return np.concatenate([self.buffer[first:], self.buffer[:length - head]])
+
+
+class StreamingTranscriber:
+    """연속 음성 입력을 겹치는 창 단위로 변환해 확정/임시 세그먼트를 내보내는 클래스
+
+    입력 스레드가 소스를 읽어 링 버퍼에 쌓고, 변환 스레드는 step_seconds마다
+    마지막 확정 지점부터 현재까지를 변환합니다. 창 끝에서 stable_margin보다
+    앞에서 끝난 세그먼트는 확정(stable)되고 나머지는 임시(provisional)로 내보냅니다.
+    변환이 밀려 창이 max_window_seconds를 넘으면 오래된 음성을 버려 지연을 제한합니다.
+    끝없이 이어지는 입력을 전제로 하므로 확정 텍스트는 쌓아 두지 않습니다 (stable_callback으로 받음).
+    """
+
+    def __init__(self, model_size="base", step_seconds=2.0, stable_margin=1.5, max_window_seconds=20.0,
+                 buffer_seconds=60.0, stable_callback=None, provisional_callback=None, model=None):
+        self.hardware = get_hardware_profile()
+        self.device = self.hardware.device
+        if model is None:
+            configure_torch_threads(self.hardware)
+            model = whisper.load_model(model_size, device=self.device)
+        self.model = model
+        self.step = step_seconds
+        self.stable_margin = stable_margin
+        self.max_window = max_window_seconds
+        self.ring = RingBuffer(max(buffer_seconds, max_window_seconds + step_seconds))
+        self.stable_callback = stable_callback
+        self.provisional_callback = provisional_callback
+        self.options = WhisperConverter.build_transcribe_options(self.device, optimize_speed=True)
+        self.options.update({"verbose": None, "condition_on_previous_text": False})
+
+        self.committed = 0  # 확정된 마지막 절대 샘플 위치
+        self.last_stable_text = None  # 다음 창의 프롬프트로 쓰는 직전 확정 문장
+        self._arrivals = deque(maxlen=ARRIVAL_HISTORY)  # (절대 샘플 위치, 도착 시각)
+        self._arrivals_lock = threading.Lock()
+        self._ended = threading.Event()
+        self._stopped = threading.Event()
+        self._source_error = None
+        self.stats = {"windows": 0, "decode_seconds": 0.0, "audio_seconds": 0.0,
+                      "dropped_seconds": 0.0, "stable_segments": 0, "latency_sum": 0.0, "max_latency": None}
+        self.repetition_stats = new_repetition_stats()
+
+    def _feed(self, source):
+        """입력 스레드: 소스를 읽어 링 버퍼에 씀"""
+        try:
+            for block in source:
+                if self._stopped.is_set():
+                    break
+                samples = pcm16_to_float(block) if isinstance(block, (bytes, bytearray)) else np.asarray(block, dtype=np.float32)
+                self.ring.write(samples)
+                with self._arrivals_lock:
+                    self._arrivals.append((self.ring.total, time.time()))
+        except Exception as e:
+            self._source_error = e
+        finally:
+            self._ended.set()
+
+    def _arrival_time(self, sample):
+        """해당 샘플이 도착한 시각 (지연 시간 계산용)"""
+        with self._arrivals_lock:
+            while len(self._arrivals) > 1 and self._arrivals[1][0] <= sample:
+                self._arrivals.popleft()
+            for position, arrived in self._arrivals:
+                if position >= sample:
+                    return arrived
+        return time.time()
+
+    def _decode_window(self, final):
+        """확정 지점부터 현재까지 변환하고 확정/임시 세그먼트 분리"""
+        now = self.ring.total
+        # 지연 제한: 창이 너무 길어지면 오래된 음성은 버림
+        window_start = max(self.committed, now - int(self.max_window * SAMPLE_RATE), self.ring.oldest)
+        if window_start > self.committed:
+            self.stats["dropped_seconds"] += (window_start - self.committed) / SAMPLE_RATE
+            self.committed = window_start
+        audio = self.ring.read(window_start, now)
+        if len(audio) < SAMPLE_RATE * 0.5:
+            return
+
+        options = dict(self.options)
+        if self.last_stable_text:
+            # 직전 확정 문장을 프롬프트로 넘겨 창 사이 문맥 유지
+            options["initial_prompt"] = self.last_stable_text
+        decode_start = time.time()
+        with repetition_guard(self.repetition_stats), reuse_encoder_features():
+            result = self.model.transcribe(audio, **options)
+        self.stats["windows"] += 1
+        self.stats["decode_seconds"] += time.time() - decode_start
+        self.stats["audio_seconds"] += len(audio) / SAMPLE_RATE
+
+        offset = window_start / SAMPLE_RATE
+        window_end = now / SAMPLE_RATE
+        stable, provisional = [], []
+        for seg in result["segments"]:
+            text = seg["text"].strip()
+            if not text:
+                continue
+            segment = {"start": offset + seg["start"], "end": offset + seg["end"], "text": text}
+            if final or segment["end"] <= window_end - self.stable_margin:
+                stable.append(segment)
+            else:
+                provisional.append(segment)
+
+        for segment in stable:
+            end_sample = int(segment["end"] * SAMPLE_RATE)
+            segment["latency"] = time.time() - self._arrival_time(end_sample)
+            self._record_latency(segment["latency"])
+            self.last_stable_text = segment["text"]
+            if self.stable_callback:
+                self.stable_callback(segment)
+        if stable:
+            self.committed = max(self.committed, int(stable[-1]["end"] * SAMPLE_RATE))
+        elif not provisional:
+            # 말소리가 없으면 여유 구간만 남기고 확정 지점을 앞으로 옮김
+            self.committed = max(self.committed, now - int(self.stable_margin * SAMPLE_RATE))
+        if self.provisional_callback:
+            self.provisional_callback(provisional)
+
+    def _record_latency(self, latency):
+        """확정 지연 시간 누적 (개수/합계/최댓값만 보관)"""
+        stats = self.stats
+        stats["stable_segments"] += 1
+        stats["latency_sum"] += latency
+        stats["max_latency"] = latency if stats["max_latency"] is None else max(stats["max_latency"], latency)
+
+    def run(self, source):
+        """소스가 끝날 때까지 변환 (확정 세그먼트는 stable_callback으로 전달, 통계 반환)"""
+        feeder = threading.Thread(target=self._feed, args=(source,), daemon=True)
+        feeder.start()
+        last_decoded = 0
+        step_samples = int(self.step * SAMPLE_RATE)
+
+        while not self._stopped.is_set():
+            ended = self._ended.is_set()
+            if not ended and self.ring.total - last_decoded < step_samples:
+                self._ended.wait(0.05)
+                continue
+            last_decoded = self.ring.total
+            self._decode_window(final=ended)
+            if ended:
+                break
+
+        feeder.join(timeout=1)
+        if self._source_error:
+            raise self._source_error
+        return self.summary()
+
+    def stop(self):
+        """스트리밍 중지"""
+        self._stopped.set()
+
+    def summary(self):
+        """지연/처리 속도 통계"""
+        count = self.stats["stable_segments"]
+        return {
+            "windows": self.stats["windows"],
+            "stream_seconds": self.ring.total / SAMPLE_RATE,
+            # 입력 음성 길이 대비 변환에 쓴 시간 (1보다 작아야 실시간 유지)
+            "real_time_factor": (self.stats["decode_seconds"] / (self.ring.total / SAMPLE_RATE)
+                                 if self.ring.total else None),
+            "decoded_window_seconds": self.stats["audio_seconds"],
+            "stable_segments": count,
+            "mean_latency": self.stats["latency_sum"] / count if count else None,
+            "max_latency": self.stats["max_latency"],
+            "dropped_seconds": self.stats["dropped_seconds"],
+            "repetition_loops": self.repetition_stats["loops"],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="연속 음성 입력 실시간 자막 변환")
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--stdin", action="store_true", help="stdin에서 s16le 16kHz 모노 PCM 읽기")
+    source_group.add_argument("--connect", metavar="HOST:PORT", help="TCP 소켓에서 s16le 16kHz 모노 PCM 읽기")
+    source_group.add_argument("--replay", metavar="FILE", help="음성 파일을 실시간으로 재생해 테스트")
+    parser.add_argument("--speed", type=float, default=1.0, help="--replay 재생 속도 배수")
+    parser.add_argument("--model", default="base", help="모델 크기")
+    parser.add_argument("--step", type=float, default=2.0, help="변환 간격(초)")
+    parser.add_argument("--max-window", type=float, default=20.0, help="최대 창 길이(초), 지연 상한")
+    args = parser.parse_args()
+
+    if args.stdin:
+        source = pipe_source(sys.stdin.buffer)
+    elif args.connect:
+        host, _, port = args.connect.rpartition(":")
+        source = socket_source(host, int(port))
+    else:
+        source = replay_source(args.replay, args.speed)
+
+    def on_stable(segment):
+        sys.stdout.write(f"\r\033[K[{segment['start']:7.1f}s] {segment['text']}  (지연 {segment['latency']:.1f}초)\n")
+        sys.stdout.flush()
+
+    def on_provisional(segments):
+        if segments:
+            sys.stdout.write("\r\033[K… " + " ".join(seg["text"] for seg in segments)[-100:])
+            sys.stdout.flush()
+
+    transcriber = StreamingTranscriber(args.model, step_seconds=args.step, max_window_seconds=args.max_window,
+                                       stable_callback=on_stable, provisional_callback=on_provisional)
+    try:
+        transcriber.run(source)
+    except KeyboardInterrupt:
+        transcriber.stop()
+
+    summary = transcriber.summary()
+    print("\n📊 스트리밍 통계:")
+    for key, value in summary.items():
+        print(f"   {key}: {value if value is None or isinstance(value, int) else round(value, 3)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import os
+import json
+import random
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from accuracy import AccuracyConfig, check_budget, edit_distance, error_counts, error_rate, load_fixtures
+
+
+def _reference_distance(reference, hypothesis):
+    previous = list(range(len(hypothesis) + 1))
+    for i, token in enumerate(reference, start=1):
+        current = [i]
+        for j, other in enumerate(hypothesis, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (token != other)))
+        previous = current
+    return previous[-1]
+
+
+@pytest.mark.parametrize("reference, hypothesis, expected", [
+    ("", "", 0),
+    ("abc", "", 3),
+    ("", "abc", 3),
+    ("kitten", "sitting", 3),
+    ("안녕하세요", "안녕하세요", 0),
+    ("안녕하세요", "안녕세요", 1),
+    ("회의", "회의록입니다", 4),
+])
+def test_edit_distance_known_values(reference, hypothesis, expected):
+    assert edit_distance(list(reference), list(hypothesis)) == expected
+
+
+def test_edit_distance_matches_plain_dynamic_programming():
+    rng = random.Random(0)
+    for _ in range(200):
+        reference = [rng.choice("가나다라") for _ in range(rng.randint(0, 12))]
+        hypothesis = [rng.choice("가나다라") for _ in range(rng.randint(0, 12))]
+        assert edit_distance(reference, hypothesis) == _reference_distance(reference, hypothesis)
+
+
+def test_error_counts_ignore_punctuation_and_spacing():
+    assert error_counts("안녕하세요, 여러분!", "안녕 하세요 여러분") == (0, 8, 2, 2)
+
+
+def test_config_parse_and_budget():
+    config = AccuracyConfig.parse("small:fast:fp32")
+    assert (config.model_size, config.optimize_speed, config.fp16) == ("small", True, False)
+    with pytest.raises(ValueError):
+        AccuracyConfig.parse("small:turbo")
+
+    results = [{"label": "small:accurate", "cer": 0.10}, {"label": "small:fast", "cer": 0.11},
+               {"label": "base:fast", "cer": 0.15}]
+    assert [r["label"] for r in check_budget(results, "small:accurate", 0.02)] == ["base:fast"]
+
+
+def test_error_rate_counts_output_on_empty_reference():
+    assert error_rate(*error_counts("", "")[:2]) == 0.0
+    assert error_rate(*error_counts("", "감사합니다")[:2]) == 5.0
+    assert error_rate(*error_counts("회의록", "회의")[:2]) == pytest.approx(1 / 3)
+
+
+def _write_fixtures(folder, references):
+    entries = []
+    for i, reference in enumerate(references):
+        (folder / f"clip{i}.wav").write_bytes(b"RIFF")
+        (folder / f"clip{i}.txt").write_text(reference, encoding="utf-8")
+        entries.append({"id": f"clip{i}", "audio": f"clip{i}.wav", "reference": f"clip{i}.txt"})
+    (folder / "manifest.json").write_text(json.dumps(entries), encoding="utf-8")
+    return str(folder)
+
+
+def test_load_fixtures_reads_references(tmp_path):
+    fixtures = load_fixtures(_write_fixtures(tmp_path, ["", "안녕하세요"]))
+    assert [fixture["reference_text"] for fixture in fixtures] == ["", "안녕하세요"]
+
+
+def test_load_fixtures_rejects_set_without_reference_text(tmp_path):
+    # 정답 글자 수가 0이면 CER 예산을 넘을 수 없으므로 통과로 보고하지 않음
+    with pytest.raises(ValueError):
+        load_fixtures(_write_fixtures(tmp_path, ["", " ,. "]))
+
+
+def test_load_fixtures_reports_missing_files(tmp_path):
+    folder = _write_fixtures(tmp_path, ["안녕하세요"])
+    os.remove(os.path.join(folder, "clip0.wav"))
+    with pytest.raises(ValueError):
+        load_fixtures(folder)
@@ -0,0 +1,51 @@
+import pytest
+
+from auto_planner import AutoPlanner, PerformanceProfile, Plan
+
+
+@pytest.fixture
+def profile(tmp_path):
+    profile = PerformanceProfile(str(tmp_path / "profile.json"))
+    for model_size, rtf in (("large", 0.5), ("medium", 0.2), ("small", 0.1), ("base", 0.05)):
+        profile.record("cpu", model_size, True, 100.0, 100.0 * rtf)
+        profile.record("cpu", model_size, False, 100.0, 200.0 * rtf)
+        profile.record_load_time("cpu", model_size, 1.0)
+    return profile
+
+
+def test_plan_picks_most_accurate_config_within_deadline(profile):
+    planner = AutoPlanner(profile, "cpu")
+    plan = planner.plan(100.0, 60.0)
+    # large+빠름 = 1 + 50초 (안전 계수 포함 58.65초)
+    assert (plan.model_size, plan.optimize_speed, plan.meets_deadline) == ("large", True, True)
+    assert planner.plan(100.0, 1.0).model_size == "base"
+    assert planner.plan(100.0, 1.0).meets_deadline is False
+
+
+def test_replan_keeps_current_plan_when_on_schedule(profile):
+    planner = AutoPlanner(profile, "cpu")
+    current = Plan("medium", True, 20.0, True)
+    new_plan = planner.replan(current, 30.0, 6.0, 70.0, 40.0)
+    assert (new_plan.model_size, new_plan.optimize_speed) == ("medium", True)
+    assert planner.slowdown == pytest.approx(1.0)
+
+
+def test_replan_downgrades_when_running_slow(profile):
+    planner = AutoPlanner(profile, "cpu")
+    current = Plan("medium", True, 20.0, True)
+    # 프로필은 0.2배인데 실제로는 0.6배 → 모든 후보가 3배 느리다고 보고 더 빠른 설정 선택
+    new_plan = planner.replan(current, 30.0, 18.0, 70.0, 30.0)
+    assert planner.slowdown == pytest.approx(3.0)
+    # small+빠름 = 1 + 70 × 0.1 × 3 = 22초 (안전 계수 포함 25.3초)
+    assert (new_plan.model_size, new_plan.optimize_speed, new_plan.meets_deadline) == ("small", True, True)
+
+
+def test_replan_uses_profile_before_current_chunk_is_recorded(profile):
+    planner = AutoPlanner(profile, "cpu")
+    current = Plan("medium", True, 20.0, True)
+    planner.replan(current, 30.0, 18.0, 70.0, 30.0)
+    slowdown = planner.slowdown
+    # 구간 측정값을 먼저 반영하면 기대값이 관측값 쪽으로 끌려가 느려진 정도를 작게 봄
+    profile.record("cpu", "medium", True, 30.0, 18.0)
+    planner.replan(current, 30.0, 18.0, 70.0, 30.0)
+    assert planner.slowdown < slowdown
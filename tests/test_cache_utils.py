@@ -0,0 +1,40 @@
+import cache_utils
+from cache_utils import atomic_write_json, file_content_hash, read_json
+
+
+def test_file_content_hash_tracks_content(tmp_path):
+    path = tmp_path / "a.wav"
+    path.write_bytes(b"one")
+    first = file_content_hash(str(path))
+    assert file_content_hash(str(path)) == first
+
+    path.write_bytes(b"two!")
+    assert file_content_hash(str(path)) != first
+
+
+def test_hash_memo_is_bounded_lru(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_utils, "HASH_MEMO_SIZE", 3)
+    monkeypatch.setattr(cache_utils, "_hash_memo", type(cache_utils._hash_memo)())
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"{i}.wav"
+        path.write_bytes(bytes([i]))
+        paths.append(str(path))
+
+    for path in paths[:3]:
+        file_content_hash(path)
+    file_content_hash(paths[0])  # 최근 사용으로 갱신되어 남아야 함
+    for path in paths[3:]:
+        file_content_hash(path)
+
+    remembered = {key[0] for key in cache_utils._hash_memo}
+    assert len(remembered) == 3
+    assert str(tmp_path / "0.wav") in remembered
+    assert str(tmp_path / "1.wav") not in remembered
+
+
+def test_json_round_trip_and_default(tmp_path):
+    path = str(tmp_path / "data.json")
+    atomic_write_json(path, {"이름": 1})
+    assert read_json(path) == {"이름": 1}
+    assert read_json(str(tmp_path / "missing.json"), default={}) == {}
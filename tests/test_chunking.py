@@ -0,0 +1,33 @@
+import pytest
+
+pytest.importorskip("whisper")
+
+from chunking import CHUNK_OVERLAP_SECONDS, plan_chunks  # noqa: E402
+
+
+def test_chunks_tile_duration_and_overlap_neighbours():
+    chunks = plan_chunks(70.0, 30.0)
+    assert [(c.start, c.end) for c in chunks] == [(0.0, 30.0), (30.0, 60.0), (60.0, 70.0)]
+    assert chunks[0].decode_start == 0.0 and chunks[0].decode_end == 30.0 + CHUNK_OVERLAP_SECONDS
+    assert chunks[1].decode_start == 30.0 - CHUNK_OVERLAP_SECONDS
+    assert chunks[2].decode_end == 70.0
+
+
+def test_no_overlap_decodes_nominal_range():
+    chunks = plan_chunks(45.0, 30.0, overlap=0.0)
+    assert [(c.decode_start, c.decode_end) for c in chunks] == [(0.0, 30.0), (30.0, 45.0)]
+
+
+def test_seam_segment_is_kept_by_exactly_one_chunk():
+    first, second = plan_chunks(60.0, 30.0)
+    # 경계(30초)에 걸친 말은 양쪽 구간 모두 디코딩하지만 한 구간에만 남음
+    seam = {"start": 28.5, "end": 31.0}
+    assert [first.owns(seam), second.owns(seam)] == [True, False]
+    seam = {"start": 29.5, "end": 31.5}
+    assert [first.owns(seam), second.owns(seam)] == [False, True]
+
+
+def test_last_chunk_keeps_segments_past_the_end():
+    last = plan_chunks(40.0, 30.0)[-1]
+    assert last.owns({"start": 39.0, "end": 41.0})
+    assert not plan_chunks(40.0, 30.0)[0].owns({"start": 39.0, "end": 41.0})
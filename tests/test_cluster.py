@@ -0,0 +1,144 @@
+import os
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from cluster import (JOB_DONE, JOB_FAILED, JOB_LEASED, JOB_QUEUED, OUTPUT_SUFFIX, TOKEN_HEADER,
+                     BrokerClient, BrokerServer, JobBroker)
+from search_index import SearchIndex
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    inbox = tmp_path / "inbox"
+    outbox = tmp_path / "outbox"
+    inbox.mkdir()
+    outbox.mkdir()
+    (inbox / "회의.wav").write_bytes(b"RIFF")
+    return inbox, outbox
+
+
+@pytest.fixture
+def broker(tmp_path, dirs):
+    inbox, outbox = dirs
+    broker = JobBroker(str(tmp_path / "broker.sqlite3"), lease_seconds=60, max_attempts=2,
+                       search_index=SearchIndex(":memory:"), input_roots=[str(inbox)], output_roots=[str(outbox)])
+    yield broker
+    broker.close()
+
+
+def job_row(broker, job_id):
+    return broker.conn.execute(
+        "SELECT status, worker, attempts, finished_at FROM jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+
+
+def expire_now(broker, job_id):
+    broker.conn.execute("UPDATE jobs SET lease_expires = 0 WHERE id = ?", (job_id,))
+    broker.conn.commit()
+
+
+def test_lease_complete_writes_output(broker, dirs):
+    inbox, outbox = dirs
+    job_id = broker.submit(str(inbox / "회의.wav"), str(outbox))
+    job = broker.lease("w1")
+    assert job["id"] == job_id and job["attempt"] == 1
+    assert broker.lease("w2") is None
+    assert broker.complete("w1", job_id, "안녕하세요", [{"start": 0.0, "end": 1.0, "text": "안녕하세요"}], 1.0)
+    assert job_row(broker, job_id)[0] == JOB_DONE
+    assert (outbox / ("회의" + OUTPUT_SUFFIX)).read_text(encoding="utf-8") == "안녕하세요"
+
+
+def test_expired_lease_requeues_then_fails(broker, dirs):
+    inbox, outbox = dirs
+    job_id = broker.submit(str(inbox / "회의.wav"), str(outbox))
+    broker.lease("w1")
+    expire_now(broker, job_id)
+
+    job = broker.lease("w2")
+    assert job["id"] == job_id and job["attempt"] == 2
+    status, worker, attempts, finished_at = job_row(broker, job_id)
+    assert (status, worker, attempts, finished_at) == (JOB_LEASED, "w2", 2, None)
+    assert broker.heartbeat("w1", job_id) is False
+    assert broker.heartbeat("w2", job_id) is True
+
+    expire_now(broker, job_id)
+    assert broker.lease("w3") is None
+    status, worker, attempts, finished_at = job_row(broker, job_id)
+    assert status == JOB_FAILED and worker is None and finished_at is not None
+
+
+def test_late_result_after_expiry_is_discarded(broker, dirs):
+    inbox, outbox = dirs
+    job_id = broker.submit(str(inbox / "회의.wav"), str(outbox))
+    broker.lease("w1")
+    expire_now(broker, job_id)
+    assert broker.complete("w1", job_id, "늦은 결과", [], 1.0) is False
+    assert not (outbox / ("회의" + OUTPUT_SUFFIX)).exists()
+    assert job_row(broker, job_id)[0] == JOB_QUEUED
+    assert os.listdir(outbox) == []
+
+
+def test_fail_retry_and_worker_shutdown(broker, dirs):
+    inbox, outbox = dirs
+    job_id = broker.submit(str(inbox / "회의.wav"), str(outbox))
+    broker.lease("w1")
+    # 작업자 종료로 돌려준 작업은 시도 횟수에 넣지 않음
+    assert broker.fail("w1", job_id, "종료", retry=False)
+    assert job_row(broker, job_id)[:3] == (JOB_QUEUED, None, 0)
+    assert broker.fail("w1", job_id, "임대 없음") is False
+
+    broker.lease("w1")
+    broker.fail("w1", job_id, "오류")
+    broker.lease("w1")
+    broker.fail("w1", job_id, "오류")
+    status, _, attempts, finished_at = job_row(broker, job_id)
+    assert status == JOB_FAILED and attempts == 2 and finished_at is not None
+
+
+def test_submit_rejects_paths_outside_roots(broker, dirs, tmp_path):
+    inbox, outbox = dirs
+    with pytest.raises(ValueError):
+        broker.submit("/etc/passwd")
+    (inbox / "link.wav").symlink_to("/etc/passwd")
+    with pytest.raises(ValueError):
+        broker.submit(str(inbox / "link.wav"))
+    with pytest.raises(ValueError):
+        broker.submit(str(inbox / "회의.wav"), str(tmp_path))
+    with pytest.raises(ValueError):
+        broker.submit(str(inbox / ".." / "inbox" / ".." / "broker.sqlite3"))
+
+
+def test_http_requires_token_and_rejects_bad_paths(broker, dirs):
+    inbox, outbox = dirs
+    server = BrokerServer(broker, port=0).start()
+    try:
+        assert server.httpd.server_address[0] == "127.0.0.1"
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(f"{server.url}/stats", timeout=5)
+        assert error.value.code == 401
+        with pytest.raises(urllib.error.HTTPError) as error:
+            BrokerClient(server.url, "wrong-token").stats()
+        assert error.value.code == 401
+
+        client = BrokerClient(server.url, server.token)
+        with pytest.raises(urllib.error.HTTPError) as error:
+            client.post("submit", audio_path="/etc/passwd")
+        assert error.value.code == 400
+
+        job_id = client.post("submit", audio_path=str(inbox / "회의.wav"), output_dir=str(outbox))["id"]
+        request = urllib.request.Request(f"{server.url}/audio/{job_id}/evil", headers={TOKEN_HEADER: server.token})
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(request, timeout=5)
+        assert error.value.code == 404
+
+        assert client.post("lease", worker="w 1")["job"]["id"] == job_id
+        target = inbox / "받은.wav"
+        client.download_audio(job_id, "w 1", str(target))
+        assert target.read_bytes() == b"RIFF"
+        assert client.stats()["leased"] == 1
+        assert json.loads(json.dumps(client.post("heartbeat", worker="w 1", job=job_id))) == {"ok": True}
+    finally:
+        server.stop()
@@ -0,0 +1,48 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+
+import hardware
+from cache_utils import CACHE_ENV_VAR
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv(CACHE_ENV_VAR, str(tmp_path))
+    monkeypatch.setattr(hardware, "_profile", None)
+    return tmp_path
+
+
+def _fake_cuda(monkeypatch, available, count=1):
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: available)
+    monkeypatch.setattr(torch.cuda, "device_count", lambda: count if available else 0)
+    monkeypatch.setattr(hardware, "_probe_cuda", lambda: [{
+        "index": i, "name": "GPU", "total_bytes": 16 * 1024**3, "free_bytes": None, "capability": "8.0",
+    } for i in range(count)] if available else [])
+
+
+def test_cached_profile_reused_when_cuda_unchanged(cache_dir, monkeypatch):
+    _fake_cuda(monkeypatch, True)
+    first = hardware.get_hardware_profile()
+    monkeypatch.setattr(hardware, "_profile", None)
+    assert hardware.get_hardware_profile().data["probed_at"] == first.data["probed_at"]
+
+
+def test_cached_cuda_profile_dropped_when_driver_missing(cache_dir, monkeypatch):
+    _fake_cuda(monkeypatch, True)
+    assert hardware.get_hardware_profile().device == "cuda"
+
+    _fake_cuda(monkeypatch, False)
+    assert hardware.get_hardware_profile().device == "cpu"
+    monkeypatch.setattr(hardware, "_profile", None)
+    assert hardware.get_hardware_profile().device == "cpu"
+
+
+def test_cached_profile_dropped_when_visible_devices_change(cache_dir, monkeypatch):
+    monkeypatch.setenv(hardware.CUDA_VISIBLE_ENV, "0,1")
+    _fake_cuda(monkeypatch, True, count=2)
+    assert len(hardware.get_hardware_profile().cuda) == 2
+
+    monkeypatch.setenv(hardware.CUDA_VISIBLE_ENV, "1")
+    _fake_cuda(monkeypatch, True, count=1)
+    assert len(hardware.get_hardware_profile().cuda) == 1
@@ -0,0 +1,16 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from metrics import MetricsCollector, _TokenCounter  # noqa: E402
+
+
+def test_token_counter_counts_one_token_per_audio_per_step():
+    metrics = MetricsCollector()
+    greedy = _TokenCounter(metrics)
+    beam = _TokenCounter(metrics, n_group=5)
+    for _ in range(3):
+        greedy.apply(torch.zeros(1, 51865), torch.zeros(1, 4, dtype=torch.long))
+        beam.apply(torch.zeros(5, 51865), torch.zeros(5, 4, dtype=torch.long))
+    assert metrics.snapshot()["tokens"] == 6
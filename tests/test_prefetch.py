@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+import prefetch
+from prefetch import batch_convert, output_paths
+
+
+class _FakeConverter:
+    def __init__(self, feature_stage=None):
+        self.converted = []
+
+    def convert_audio(self, audio_path, output_path, model_size, optimize_speed=True):
+        if "broken" in audio_path:
+            raise RuntimeError("손상된 파일")
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(audio_path)
+
+    def get_metrics_snapshot(self):
+        return {"decode_seconds": 0.0}
+
+
+def test_output_paths_reject_same_name_from_different_folders(tmp_path):
+    paths = output_paths(["a/회의.wav", "b/통화.mp3"], str(tmp_path))
+    assert paths["a/회의.wav"] == os.path.join(str(tmp_path), "회의_변환결과.txt")
+    with pytest.raises(ValueError):
+        output_paths(["a/회의.wav", "b/회의.m4a"], str(tmp_path))
+
+
+def test_batch_convert_continues_after_failure(tmp_path, monkeypatch):
+    monkeypatch.setattr(prefetch, "WhisperConverter", _FakeConverter)
+    logs = []
+    stats = batch_convert(["one.wav", "broken.wav", "two.wav"], str(tmp_path), prefetch_depth=0,
+                          log_callback=logs.append)
+
+    assert (stats["files"], stats["failed"]) == (2, 1)
+    assert sorted(os.listdir(tmp_path)) == ["one_변환결과.txt", "two_변환결과.txt"]
+    assert any("broken.wav" in line and "실패" in line for line in logs)
@@ -0,0 +1,58 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("whisper")
+
+from repetition import MIN_LOOP_TOKENS, find_loop, new_repetition_stats  # noqa: E402
+
+
+def test_no_loop_in_short_or_varied_text():
+    assert find_loop([]) is None
+    assert find_loop(list(range(40))) is None
+    # "네 네 네"처럼 짧은 반복은 전체 길이가 MIN_LOOP_TOKENS보다 짧으면 허용
+    assert find_loop([7, 7, 7]) is None
+
+
+def test_finds_smallest_period_at_the_end():
+    phrase = [11, 12, 13, 14]
+    assert find_loop([1, 2, 3] + phrase * 4) == (4, 4)
+    assert find_loop([5] * MIN_LOOP_TOKENS) == (1, MIN_LOOP_TOKENS)
+
+
+def test_requires_enough_repeats_and_loop_tokens():
+    phrase = [21, 22, 23, 24, 25, 26, 27, 28]
+    # 주기 8 × 2회 = 16토큰이어도 최소 반복 횟수(3)를 채워야 함
+    assert find_loop(phrase * 2) is None
+    assert find_loop(phrase * 3) == (8, 3)
+    # 반복이 끝에 있어야 함
+    assert find_loop(phrase * 3 + [99]) is None
+
+
+def test_dropped_tokens_are_removed_from_sum_logprobs():
+    torch = pytest.importorskip("torch")
+    from whisper.decoding import GreedyDecoder
+    from repetition import RepetitionFilter
+
+    eot, vocab, pattern = 100, 120, [1, 2, 3, 4]
+    task = SimpleNamespace(tokenizer=SimpleNamespace(eot=eot), sample_begin=1, sample_len=64,
+                           decoder=GreedyDecoder(0.0, eot))
+    stats = new_repetition_stats()
+    repetition = RepetitionFilter(task, stats, threading.Lock())
+
+    tokens = torch.tensor([[99]])
+    sum_logprobs = torch.zeros(1)
+    for step in range(40):
+        logits = torch.full((1, vocab), -5.0)
+        logits[0, pattern[step % len(pattern)]] = 5.0
+        token_logprob = torch.log_softmax(logits, dim=-1)[0, pattern[0]].item()
+        repetition.apply(logits, tokens)
+        tokens, completed = task.decoder.update(tokens, logits, sum_logprobs)
+        if completed:
+            break
+
+    assert stats["loops"] == 1 and stats["dropped_tokens"] == 12
+    assert tokens[0, 1 + len(pattern)].item() == eot
+    # 남은 첫 반복(4토큰)과 강제 EOT(로그 확률 0)만 합계에 남음
+    assert sum_logprobs.item() == pytest.approx(len(pattern) * token_logprob, abs=1e-4)
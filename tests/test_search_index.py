@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from search_index import TRANSCRIPT_SUFFIX, SearchIndex, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = SearchIndex(str(tmp_path / "index.sqlite3"))
+    yield index
+    index.close()
+
+
+def _write(path, lines):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_tokenize_uses_bigrams():
+    assert tokenize("회의록 A") == ["회의", "의록", "a"]
+
+
+def test_search_ranks_matching_segments(index, tmp_path):
+    index.add_transcript(str(tmp_path / "a.txt"), [
+        {"start": 0.0, "end": 2.0, "text": "예산 회의를 시작하겠습니다"},
+        {"start": 2.0, "end": 4.0, "text": "점심 메뉴 이야기"},
+    ])
+    index.add_transcript(str(tmp_path / "b.txt"), [{"start": None, "end": None, "text": "다음 회의 일정"}])
+
+    results = index.search("예산 회의")
+    assert [(os.path.basename(r["path"]), r["start"]) for r in results] == [("a.txt", 0.0)]
+    assert {os.path.basename(r["path"]) for r in index.search("회의")} == {"a.txt", "b.txt"}
+    assert index.search("없는단어") == []
+
+
+def test_reindex_replaces_and_remove_drops(index, tmp_path):
+    path = str(tmp_path / "a.txt")
+    index.add_transcript(path, [{"start": 0.0, "end": 1.0, "text": "예전 내용"}])
+    index.add_transcript(path, [{"start": 0.0, "end": 1.0, "text": "새로운 내용"}])
+    assert index.search("예전") == []
+    assert len(index.search("새로운")) == 1
+
+    index.remove(path)
+    assert index.search("새로운") == []
+
+
+def test_update_directory_adds_changes_and_removes(index, tmp_path):
+    folder = tmp_path / "calls"
+    first = _write(folder / f"one{TRANSCRIPT_SUFFIX}", ["고객 상담 기록"])
+    _write(folder / "notes.txt", ["색인 대상 아님"])
+    assert index.update_directory(str(folder)) == (1, 0)
+    assert index.update_directory(str(folder)) == (0, 0)
+
+    os.remove(first)
+    _write(folder / "sub" / f"two{TRANSCRIPT_SUFFIX}", ["배송 문의"])
+    assert index.update_directory(str(folder)) == (1, 1)
+    assert index.search("상담") == []
+    assert len(index.search("배송")) == 1
+
+
+@pytest.mark.parametrize("name", ["50%_off", "a_b"])
+def test_update_directory_does_not_treat_wildcards_in_folder_name(index, tmp_path, name):
+    # "50%_off"의 LIKE 패턴은 형제 폴더 "50X-off"의 파일도 포함하므로 그 파일을 지우면 안 됨
+    sibling_name = name.replace("%", "X").replace("_", "-")
+    sibling = _write(tmp_path / sibling_name / f"other{TRANSCRIPT_SUFFIX}", ["형제 폴더 기록"])
+    _write(tmp_path / name / f"mine{TRANSCRIPT_SUFFIX}", ["대상 폴더 기록"])
+    index.add_transcript(sibling, [{"start": None, "end": None, "text": "형제 폴더 기록"}])
+
+    assert index.update_directory(str(tmp_path / name)) == (1, 0)
+    assert len(index.search("형제")) == 1
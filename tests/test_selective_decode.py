@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("whisper")
+
+from selective_decode import weak_spans  # noqa: E402
+
+GOOD = {"avg_logprob": -0.2, "compression_ratio": 1.2, "no_speech_prob": 0.1}
+WEAK = {"avg_logprob": -1.5, "compression_ratio": 1.2, "no_speech_prob": 0.1}
+
+
+def segments(*kinds):
+    """1초 간격으로 붙은 세그먼트 목록 ("w"는 약한 세그먼트)"""
+    return [dict(WEAK if kind == "w" else GOOD, start=float(i), end=i + 1.0) for i, kind in enumerate(kinds)]
+
+
+def test_no_weak_segments():
+    assert weak_spans(segments("g", "g"), 2.0) == []
+
+
+def test_adjacent_weak_segments_merge():
+    assert weak_spans(segments("g", "w", "w", "g"), 4.0) == [(1.0, 3.0, [1, 2])]
+
+
+def test_weak_segments_around_good_one_stay_separate():
+    # 사이의 정상 세그먼트(1번)가 재변환 교체로 사라지지 않도록 구간을 나눔
+    spans = weak_spans(segments("w", "g", "w"), 3.0)
+    assert [indices for _, _, indices in spans] == [[0], [2]]
+    assert spans[0][1] <= 1.0 and spans[1][0] >= 2.0
+
+
+def test_padding_stops_at_neighbours_and_file_edges():
+    segs = segments("g", "w", "g")
+    segs[0]["end"] = 0.8
+    segs[2]["start"] = 2.3
+    assert weak_spans(segs, 3.0) == [(0.8, 2.3, [1])]
+    assert weak_spans(segments("w"), 1.2) == [(0.0, 1.2, [0])]
+
+
+def test_adjacent_weak_segments_far_apart_split():
+    segs = segments("w", "w")
+    segs[1]["start"], segs[1]["end"] = 5.0, 6.0
+    assert [indices for _, _, indices in weak_spans(segs, 6.0)] == [[0], [1]]
@@ -0,0 +1,93 @@
+import random
+
+import numpy as np
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+from whisper.audio import SAMPLE_RATE
+
+from streaming import RingBuffer, pcm16_to_float
+
+
+def _ring(capacity):
+    return RingBuffer(capacity / SAMPLE_RATE)
+
+
+def test_pcm16_to_float_scales_to_unit_range():
+    samples = np.array([0, 16384, -32768], dtype=np.int16).tobytes()
+    assert pcm16_to_float(samples).tolist() == [0.0, 0.5, -1.0]
+
+
+def test_read_within_capacity():
+    ring = _ring(10)
+    ring.write(np.arange(6, dtype=np.float32))
+    assert ring.oldest == 0
+    assert ring.read(2, 5).tolist() == [2, 3, 4]
+    assert ring.read(4, 100).tolist() == [4, 5]
+    assert len(ring.read(6, 8)) == 0
+
+
+def test_wraparound_drops_oldest_samples():
+    ring = _ring(10)
+    ring.write(np.arange(8, dtype=np.float32))
+    ring.write(np.arange(8, 14, dtype=np.float32))
+    assert ring.total == 14
+    assert ring.oldest == 4
+    # 밀려난 구간은 잘리고 감긴 구간은 순서대로 이어짐
+    assert ring.read(0, 14).tolist() == list(range(4, 14))
+    assert ring.read(7, 12).tolist() == [7, 8, 9, 10, 11]
+
+
+def test_write_larger_than_capacity_keeps_tail():
+    ring = _ring(10)
+    ring.write(np.arange(3, dtype=np.float32))
+    ring.write(np.arange(3, 28, dtype=np.float32))
+    assert ring.total == 28
+    assert ring.read(0, 28).tolist() == list(range(18, 28))
+
+
+def test_random_writes_match_full_history():
+    rng = random.Random(0)
+    ring = _ring(17)
+    history = []
+    for _ in range(300):
+        count = rng.randint(0, 40)
+        block = np.arange(len(history), len(history) + count, dtype=np.float32)
+        ring.write(block)
+        history.extend(block.tolist())
+        start = rng.randint(0, len(history) + 2)
+        end = rng.randint(start, len(history) + 5)
+        assert ring.read(start, end).tolist() == history[max(start, ring.oldest):end]
+
+
+class _CountingModel:
+    """창마다 세그먼트 하나를 돌려주고 받은 프롬프트를 기록하는 가짜 모델"""
+
+    def __init__(self):
+        self.prompts = []
+
+    def transcribe(self, audio, **options):
+        self.prompts.append(options.get("initial_prompt"))
+        duration = len(audio) / SAMPLE_RATE
+        return {"segments": [{"start": 0.0, "end": duration, "text": f"문장{len(self.prompts)}"}]}
+
+
+def test_stream_keeps_only_running_aggregates():
+    from streaming import StreamingTranscriber
+
+    model = _CountingModel()
+    stable = []
+    transcriber = StreamingTranscriber(step_seconds=1.0, stable_margin=0.0, model=model,
+                                       stable_callback=stable.append)
+    source = (np.zeros(SAMPLE_RATE, dtype=np.float32) for _ in range(5))
+    summary = transcriber.run(source)
+
+    assert summary["stable_segments"] == len(stable) > 0
+    assert summary["max_latency"] == max(segment["latency"] for segment in stable)
+    assert summary["mean_latency"] == pytest.approx(sum(s["latency"] for s in stable) / len(stable))
+    # 프롬프트는 직전 확정 문장 하나만 사용
+    assert model.prompts[0] is None
+    assert model.prompts[1:] == [f"문장{i}" for i in range(1, len(model.prompts))]
+    assert not any(isinstance(value, list) for value in transcriber.stats.values())
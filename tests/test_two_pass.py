@@ -0,0 +1,41 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("whisper")
+
+import two_pass
+from two_pass import DRAFT_PASS, REFINE_PASS, TwoPassTranscriber
+
+
+class _LockedIndex:
+    def add_transcript(self, path, segments):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def _fake_run_pass(self, pass_name, model_size, audio_path, optimize_speed):
+    target = self.draft_segments if pass_name == DRAFT_PASS else self.refined_segments
+    with self._lock:
+        target[0] = [{"start": 0.0, "end": 1.0, "text": f"{pass_name} 결과"}]
+
+
+def test_index_failure_does_not_fail_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(TwoPassTranscriber, "_run_pass", _fake_run_pass)
+    reports = []
+    transcriber = TwoPassTranscriber(search_index=_LockedIndex(), device="cpu",
+                                     pass_progress_callback=lambda *args: reports.append(args))
+    output = tmp_path / "결과.txt"
+
+    assert transcriber.run("audio.wav", str(output)) == "refine 결과"
+    assert output.read_text(encoding="utf-8") == "refine 결과"
+    assert any(name == REFINE_PASS and "색인" in message for name, _, _, message in reports)
+
+
+def test_threads_split_between_passes(monkeypatch):
+    monkeypatch.setattr(TwoPassTranscriber, "_run_pass", _fake_run_pass)
+    calls = []
+    monkeypatch.setattr(two_pass, "configure_torch_threads",
+                        lambda profile=None, concurrent_jobs=1: calls.append(concurrent_jobs))
+    TwoPassTranscriber(device="cpu", search_index=_LockedIndex()).run("audio.wav")
+    assert calls == [2]
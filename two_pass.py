@@ -0,0 +1,216 @@
+import time
+import sqlite3
+import threading
+
+import torch
+import whisper
+
+from converter import WhisperConverter
+from features import FeatureStage
+from chunking import plan_chunks, transcribe_chunk, join_segments
+from hardware import get_hardware_profile, configure_torch_threads
+from search_index import SearchIndex
+from repetition import repetition_guard, new_repetition_stats
+from encoder_reuse import reuse_encoder_features
+from metrics import MetricsCollector
+
+DRAFT_PASS = "draft"
+REFINE_PASS = "refine"
+
+
+class TwoPassTranscriber:
+    """빠른 모델로 초안을 먼저 내보내고, 큰 모델로 구간별로 정제하는 2단계 변환
+
+    두 단계는 각자의 스레드에서 동시에 실행됩니다. 초안은 구간이 끝날 때마다
+    draft_callback으로, 정제 결과는 refine_callback으로 전달되며 이미 정제된
+    구간의 초안은 건너뜁니다.
+    metrics_callback을 주면 두 단계를 합친 성능 지표를 1초마다 전달합니다.
+    """
+
+    def __init__(self, draft_model="base", refine_model="medium", feature_stage=None,
+                 draft_callback=None, refine_callback=None, pass_progress_callback=None,
+                 cancel_callback=None, chunk_seconds=30.0, device=None, search_index=None,
+                 metrics_callback=None):
+        self.draft_model = draft_model
+        self.refine_model = refine_model
+        self.feature_stage = feature_stage or FeatureStage()
+        self.draft_callback = draft_callback
+        self.refine_callback = refine_callback
+        self.pass_progress_callback = pass_progress_callback
+        self.cancel_callback = cancel_callback
+        self.chunk_seconds = chunk_seconds
+        self.hardware = get_hardware_profile()
+        self.device = device or self.hardware.device
+        self.search_index = search_index or SearchIndex()
+        self.metrics = MetricsCollector(self.device)  # 두 단계의 디코딩을 함께 집계
+        self.metrics_callback = metrics_callback
+        self.is_cancelled = False
+        self._models = {}
+        self._lock = threading.Lock()
+        self.draft_segments = {}
+        self.refined_segments = {}
+        self.pass_times = {}
+        self.repetition_stats = {}  # 단계별 반복 루프 감지 통계
+
+    def _is_cancelled(self):
+        """취소 여부 확인"""
+        if self.cancel_callback:
+            self.is_cancelled = self.is_cancelled or self.cancel_callback()
+        return self.is_cancelled
+
+    def cancel(self):
+        """변환 취소 (진행 중인 구간이 끝나면 멈춤)"""
+        self.is_cancelled = True
+
+    def _get_model(self, model_size):
+        """모델 로드 (인스턴스 안에서 캐싱)"""
+        with self._lock:
+            model = self._models.get(model_size)
+            if model is None:
+                model = whisper.load_model(model_size, device=self.device)
+                self._models[model_size] = model
+            return model
+
+    def _report_pass(self, pass_name, done, total, message):
+        """단계별 진행 상황 알림"""
+        if self.pass_progress_callback:
+            self.pass_progress_callback(pass_name, done, total, message)
+
+    def _run_pass(self, pass_name, model_size, audio_path, optimize_speed):
+        """한 단계(초안/정제)를 구간 순서대로 실행"""
+        start_time = time.time()
+        self._report_pass(pass_name, 0, 1, f"📥 {model_size} 모델 로드 중...")
+        model = self._get_model(model_size)
+        mel = self.feature_stage.get_mel_tensor(audio_path, model.dims.n_mels)
+        duration = FeatureStage.mel_duration(mel)
+        self.metrics.audio_duration = duration
+        chunks = plan_chunks(duration, self.chunk_seconds)
+        options = WhisperConverter.build_transcribe_options(self.device, optimize_speed)
+        repetition_stats = self.repetition_stats.setdefault(pass_name, new_repetition_stats())
+
+        for done, chunk in enumerate(chunks):
+            if self._is_cancelled():
+                return
+            # 이미 정제된 구간은 초안을 만들 필요가 없음
+            if pass_name == DRAFT_PASS and chunk.index in self.refined_segments:
+                self._report_pass(pass_name, done + 1, len(chunks), "⏭️ 정제 완료 구간 건너뜀")
+                continue
+
+            with repetition_guard(repetition_stats), reuse_encoder_features(), self.metrics.track():
+                segments = transcribe_chunk(model, audio_path, mel, chunk, options)
+
+            with self._lock:
+                if pass_name == DRAFT_PASS:
+                    if chunk.index in self.refined_segments:
+                        continue
+                    self.draft_segments[chunk.index] = segments
+                    callback = self.draft_callback
+                else:
+                    self.refined_segments[chunk.index] = segments
+                    callback = self.refine_callback
+            if callback:
+                callback(chunk, segments)
+            self._report_pass(pass_name, done + 1, len(chunks),
+                              f"🔄 {model_size}: {done + 1}/{len(chunks)} 구간 완료")
+
+        self.pass_times[pass_name] = time.time() - start_time
+        self._report_pass(pass_name, len(chunks), len(chunks),
+                          f"✅ {model_size} 완료 ({self.pass_times[pass_name]:.1f}초)")
+
+    def transcript(self):
+        """현재까지의 결과 (정제된 구간 우선, 없으면 초안)"""
+        with self._lock:
+            indices = sorted(set(self.draft_segments) | set(self.refined_segments))
+            parts = []
+            for index in indices:
+                segments = self.refined_segments.get(index, self.draft_segments.get(index, []))
+                text = join_segments(segments)
+                if text:
+                    parts.append(text)
+            return "\n".join(parts)
+
+    def run(self, audio_path, output_path=None, optimize_speed=True):
+        """2단계 변환 실행 후 최종 텍스트 반환 (취소 시 None)"""
+        self.is_cancelled = False
+        with self._lock:
+            # 같은 인스턴스를 여러 파일에 재사용할 때 이전 결과가 섞이지 않도록 초기화 (모델은 유지)
+            self.draft_segments = {}
+            self.refined_segments = {}
+            self.pass_times = {}
+            self.repetition_stats = {}
+        self.metrics.reset()
+        self.metrics.set_stage("2단계 변환")
+        if self.metrics_callback:
+            self.metrics.start_sampling(self.metrics_callback)
+        try:
+            return self._run_passes(audio_path, output_path, optimize_speed)
+        finally:
+            self.metrics.stop_sampling()
+            if self.metrics_callback:
+                self.metrics_callback(self.metrics.snapshot())
+
+    def get_metrics_snapshot(self):
+        """현재 작업의 성능 지표 (두 단계 합산)"""
+        return self.metrics.snapshot()
+
+    def _run_passes(self, audio_path, output_path, optimize_speed):
+        """초안/정제 단계를 동시에 실행하고 결과 저장"""
+        errors = []
+
+        def run_pass(pass_name, model_size, pass_optimize):
+            try:
+                self._run_pass(pass_name, model_size, audio_path, pass_optimize)
+            except Exception as e:
+                errors.append(e)
+                self.cancel()
+
+        # 두 단계가 동시에 디코딩하므로 CPU 연산 스레드를 나눠 가짐
+        configure_torch_threads(self.hardware, concurrent_jobs=2)
+        # 초안은 항상 속도 최적화, 정제는 사용자 설정을 따름
+        draft_thread = threading.Thread(target=run_pass, args=(DRAFT_PASS, self.draft_model, True), daemon=True)
+        refine_thread = threading.Thread(target=run_pass, args=(REFINE_PASS, self.refine_model, optimize_speed), daemon=True)
+        draft_thread.start()
+        refine_thread.start()
+
+        draft_thread.join()
+        if output_path and not self._is_cancelled() and not errors:
+            # 초안이 끝나면 바로 파일을 저장해 두고, 정제가 끝나면 덮어씀
+            self._save(output_path)
+        refine_thread.join()
+
+        if errors:
+            raise errors[0]
+        if self._is_cancelled():
+            return None
+
+        text = self.transcript()
+        if output_path:
+            self._save(output_path)
+            self._index_transcript(output_path)
+        return text
+
+    def _index_transcript(self, output_path):
+        """저장한 결과를 검색 색인에 반영 (색인 실패는 변환 실패로 보지 않음)"""
+        try:
+            self.search_index.add_transcript(output_path, self.segments())
+        except sqlite3.Error as e:
+            self._report_pass(REFINE_PASS, 1, 1, f"⚠️ 검색 색인 갱신 실패: {e}")
+
+    def segments(self):
+        """현재까지의 세그먼트 목록 (정제된 구간 우선)"""
+        with self._lock:
+            indices = sorted(set(self.draft_segments) | set(self.refined_segments))
+            return [seg for index in indices
+                    for seg in self.refined_segments.get(index, self.draft_segments.get(index, []))]
+
+    def _save(self, output_path):
+        """현재 결과를 파일에 저장"""
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(self.transcript())
+
+    def clear_model_cache(self):
+        """로드한 모델 해제"""
+        with self._lock:
+            self._models.clear()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
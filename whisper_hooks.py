@@ -0,0 +1,193 @@
+"""Whisper 내부 동작에 끼어들기 위한 스레드 로컬 훅 모음
+
+whisper.transcribe()는 내부 함수를 직접 호출하기 때문에 바깥에서 옵션으로
+바꿀 수 없는 부분이 있습니다. 여기서는 해당 모듈 속성을 한 번만 감싸 두고,
+실제 동작 변경은 컨텍스트 매니저를 사용한 스레드에서만 일어나도록 합니다.
+(여러 모델을 동시에 돌려도 서로 영향을 주지 않음)
+"""
+import sys
+import threading
+import importlib
+from contextlib import contextmanager
+
+_state = threading.local()
+_install_lock = threading.Lock()
+_installed = set()
+
+
+def _transcribe_module():
+    """whisper.transcribe 모듈 객체 반환 (같은 이름의 함수와 구분)"""
+    importlib.import_module("whisper.transcribe")
+    return sys.modules["whisper.transcribe"]
+
+
+def _install_mel_hook():
+    """log_mel_spectrogram 감싸기 (프로세스당 한 번)"""
+    with _install_lock:
+        if "mel" in _installed:
+            return
+        module = _transcribe_module()
+        original = module.log_mel_spectrogram
+
+        def log_mel_spectrogram(audio, n_mels=80, padding=0, device=None):
+            mel = getattr(_state, "mel", None)
+            if mel is not None and mel.shape[0] == n_mels and getattr(_state, "mel_padding", None) == padding:
+                return mel if device is None else mel.to(device)
+            return original(audio, n_mels, padding=padding, device=device)
+
+        module.log_mel_spectrogram = log_mel_spectrogram
+        _installed.add("mel")
+
+
+@contextmanager
+def precomputed_mel(mel, padding):
+    """현재 스레드의 transcribe() 호출에서 미리 계산된 멜 스펙트로그램 사용
+
+    mel은 (n_mels, n_frames) 텐서이며, padding은 계산 시 덧붙인 무음 샘플 수입니다.
+    멜 빈 수나 패딩이 다르면 원래 계산 경로로 돌아갑니다.
+    """
+    _install_mel_hook()
+    previous = (getattr(_state, "mel", None), getattr(_state, "mel_padding", None))
+    _state.mel = mel
+    _state.mel_padding = padding
+    try:
+        yield
+    finally:
+        _state.mel, _state.mel_padding = previous
+
+
+def _install_decoding_hook():
+    """DecodingTask.__init__ 감싸기: 현재 스레드에 등록된 로짓 필터/디코더 실행기 적용 (프로세스당 한 번)"""
+    with _install_lock:
+        if "decoding" in _installed:
+            return
+        from whisper.decoding import DecodingTask
+        original_init = DecodingTask.__init__
+
+        def __init__(self, model, options):
+            original_init(self, model, options)
+            for factory in getattr(_state, "logit_filter_factories", ()):
+                self.logit_filters.append(factory(self))
+            inference_factory = getattr(_state, "inference_factory", None)
+            if inference_factory is not None:
+                self.inference = inference_factory(self)
+                # 빔 검색 디코더는 생성 시 받은 inference로 KV 캐시를 재배열하므로 함께 교체
+                if hasattr(self.decoder, "inference"):
+                    self.decoder.inference = self.inference
+
+        DecodingTask.__init__ = __init__
+        _installed.add("decoding")
+
+
+@contextmanager
+def extra_logit_filter(factory):
+    """현재 스레드의 디코딩에 로짓 필터 추가
+
+    factory는 DecodingTask를 받아 LogitFilter를 돌려주는 함수이며, 창(30초)마다
+    새 DecodingTask가 만들어질 때 호출됩니다. 기존 필터 뒤에 적용됩니다.
+    """
+    _install_decoding_hook()
+    previous = getattr(_state, "logit_filter_factories", ())
+    _state.logit_filter_factories = previous + (factory,)
+    try:
+        yield
+    finally:
+        _state.logit_filter_factories = previous
+
+
+@contextmanager
+def custom_inference(factory):
+    """현재 스레드의 디코딩에서 whisper 기본 PyTorchInference 대신 다른 디코더 실행기 사용
+
+    factory는 DecodingTask를 받아 whisper.decoding.Inference 구현을 돌려주는 함수이며,
+    창(30초)마다 새 DecodingTask가 만들어질 때 호출됩니다.
+    """
+    _install_decoding_hook()
+    previous = getattr(_state, "inference_factory", None)
+    _state.inference_factory = factory
+    try:
+        yield
+    finally:
+        _state.inference_factory = previous
+
+
+def _install_progress_hook():
+    """transcribe()의 tqdm 진행 막대 감싸기: 처리한 멜 프레임 수를 콜백으로 전달 (프로세스당 한 번)"""
+    with _install_lock:
+        if "progress" in _installed:
+            return
+        module = _transcribe_module()
+        original_tqdm = module.tqdm
+
+        class _TqdmProxy:
+            """whisper.transcribe가 보는 tqdm 모듈 대신 쓰는 객체 (tqdm.tqdm만 가로챔)"""
+
+            def __getattr__(self, name):
+                return getattr(original_tqdm, name)
+
+            @staticmethod
+            def tqdm(*args, **kwargs):
+                bar = original_tqdm.tqdm(*args, **kwargs)
+                callback = getattr(_state, "progress_callback", None)
+                if callback is not None:
+                    original_update = bar.update
+
+                    def update(n=1):
+                        callback(n)
+                        return original_update(n)
+
+                    bar.update = update
+                return bar
+
+        module.tqdm = _TqdmProxy()
+        _installed.add("progress")
+
+
+@contextmanager
+def decode_progress(callback):
+    """현재 스레드의 transcribe() 호출에서 창 하나를 끝낼 때마다 callback(처리한 멜 프레임 수) 호출
+
+    verbose 설정으로 진행 막대가 꺼져 있어도 호출됩니다.
+    """
+    _install_progress_hook()
+    previous = getattr(_state, "progress_callback", None)
+    _state.progress_callback = callback
+    try:
+        yield
+    finally:
+        _state.progress_callback = previous
+
+
+def _install_audio_features_hook():
+    """DecodingTask._get_audio_features 감싸기: 현재 스레드의 인코더 특징 캐시 사용 (프로세스당 한 번)"""
+    with _install_lock:
+        if "audio_features" in _installed:
+            return
+        from whisper.decoding import DecodingTask
+        original = DecodingTask._get_audio_features
+
+        def _get_audio_features(self, mel):
+            cache = getattr(_state, "audio_features_cache", None)
+            # 이미 인코더 출력 형태면 원래 경로도 인코더를 건너뜀
+            if cache is None or mel.shape[-2:] == (self.model.dims.n_audio_ctx, self.model.dims.n_audio_state):
+                return original(self, mel)
+            return cache.get(mel, self.options.fp16, lambda: original(self, mel))
+
+        DecodingTask._get_audio_features = _get_audio_features
+        _installed.add("audio_features")
+
+
+@contextmanager
+def audio_features_cache(cache):
+    """현재 스레드의 디코딩에서 인코더 특징을 cache.get(mel, fp16, compute)로 얻음
+
+    whisper는 온도 재시도마다 같은 창의 멜로 DecodingTask를 새로 만들어 인코더를 다시 실행하므로,
+    캐시가 같은 멜에 대해 계산해 둔 특징을 돌려주면 재시도는 디코더 비용만 듭니다.
+    """
+    _install_audio_features_hook()
+    previous = getattr(_state, "audio_features_cache", None)
+    _state.audio_features_cache = cache
+    try:
+        yield
+    finally:
+        _state.audio_features_cache = previous
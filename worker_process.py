@@ -0,0 +1,184 @@
+import os
+import threading
+import traceback
+import multiprocessing
+
+from hardware import get_hardware_profile, get_process_rss
+
+JOB_CONVERT = "convert"
+JOB_TWO_PASS = "two_pass"
+# 작업이 끝난 뒤 워커 RSS가 전체 RAM에서 이 비율을 넘으면 워커를 새로 띄워 메모리를 OS에 돌려줌
+RECYCLE_RAM_FRACTION = 0.5
+# 종료 요청 후 정상 종료를 기다리는 시간 (초)
+SHUTDOWN_TIMEOUT = 3.0
+
+
+def _worker_main(conn):
+    """워커 프로세스 본체: 작업을 받아 변환하고 진행 상황을 파이프로 보냄
+
+    변환기(모델 캐시 포함)는 프로세스가 살아 있는 동안 재사용됩니다.
+    메시지 형식은 (종류, 작업 번호, 값...) 튜플입니다.
+    """
+    from converter import WhisperConverter
+    from two_pass import TwoPassTranscriber
+
+    send_lock = threading.Lock()
+    current = {"job": None}
+
+    def send(kind, *payload):
+        # 진행률 타이머/지표 샘플링 스레드도 보내므로 잠금 필요
+        with send_lock:
+            conn.send((kind, current["job"]) + payload)
+
+    converter = WhisperConverter(
+        progress_callback=lambda *progress: send("progress", *progress),
+        metrics_callback=lambda snapshot: send("metrics", snapshot)
+    )
+    two_pass = {}  # 정제 모델별 2단계 변환기 (모델 캐시 유지)
+    send("ready", os.getpid())
+
+    while True:
+        try:
+            kind, job_id, payload = conn.recv()
+        except EOFError:
+            break
+        if kind == "stop":
+            break
+
+        current["job"] = job_id
+        try:
+            if kind == JOB_CONVERT:
+                result = converter.convert_audio(**payload)
+            else:
+                refine_model = payload.pop("refine_model")
+                transcriber = two_pass.get(refine_model)
+                if transcriber is None:
+                    transcriber = TwoPassTranscriber(
+                        refine_model=refine_model,
+                        feature_stage=converter.feature_stage,
+                        search_index=converter.search_index,
+                        draft_callback=lambda chunk, segments: send("chunk", chunk, segments, False),
+                        refine_callback=lambda chunk, segments: send("chunk", chunk, segments, True),
+                        pass_progress_callback=lambda *progress: send("pass", *progress),
+                        metrics_callback=lambda snapshot: send("metrics", snapshot)
+                    )
+                    two_pass[refine_model] = transcriber
+                result = transcriber.run(**payload)
+            send("result", result, get_process_rss())
+        except Exception as e:
+            send("error", str(e), traceback.format_exc())
+    conn.close()
+
+
+class ConverterWorker:
+    """GUI에서 변환 작업을 별도 프로세스로 실행하는 클래스
+
+    워커는 한 번 띄우면 모델을 메모리에 둔 채 여러 작업에 재사용하고,
+    취소하면 프로세스를 바로 종료해 메모리를 모두 회수한 뒤 새 워커를 미리 띄워 둡니다.
+    진행 상황은 파이프로 받은 메시지를 poll()로 꺼내 GUI 스레드에서 처리합니다.
+    """
+
+    def __init__(self):
+        self._context = multiprocessing.get_context("spawn")  # torch/CUDA 상태를 물려받지 않도록
+        self.process = None
+        self.conn = None
+        self.pid = None
+        self.active_job = None
+        self._next_job = 0
+
+    @property
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        """워커 프로세스 시작 (이미 실행 중이면 그대로 사용)"""
+        if self.is_alive:
+            return
+        parent_conn, child_conn = self._context.Pipe()
+        self.process = self._context.Process(target=_worker_main, args=(child_conn,),
+                                             name="stt-worker", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+
+    def submit(self, kind, **payload):
+        """작업 전달 (작업 번호 반환)
+
+        kind가 JOB_CONVERT면 payload는 WhisperConverter.convert_audio 인자,
+        JOB_TWO_PASS면 refine_model과 TwoPassTranscriber.run 인자입니다.
+        """
+        self.start()
+        self._next_job += 1
+        self.active_job = self._next_job
+        self.conn.send((kind, self.active_job, payload))
+        return self.active_job
+
+    def poll(self):
+        """도착한 메시지 목록 반환 (현재 작업이 아닌 메시지는 버림, 워커가 죽었으면 오류 메시지 생성)"""
+        messages = []
+        if self.conn is None:
+            return messages
+        try:
+            while self.conn.poll():
+                message = self.conn.recv()
+                kind, job_id = message[0], message[1]
+                if kind == "ready":
+                    self.pid = message[2]
+                    continue
+                if job_id != self.active_job:
+                    continue
+                if kind in ("result", "error"):
+                    self.active_job = None
+                messages.append(message)
+        except (EOFError, OSError):
+            pass
+
+        if self.active_job is not None and not self.is_alive:
+            exitcode = self.process.exitcode if self.process else None
+            messages.append(("error", self.active_job,
+                             f"변환 프로세스가 비정상 종료되었습니다 (종료 코드 {exitcode})", ""))
+            self.active_job = None
+            self._discard()
+            self.start()
+        return messages
+
+    def recycle_if_needed(self, worker_rss):
+        """작업 후 워커 메모리가 너무 크면 워커를 새로 띄움 (유휴 상태에서만)"""
+        total = get_hardware_profile().ram.get("total_bytes")
+        if self.active_job is None and total and worker_rss > total * RECYCLE_RAM_FRACTION:
+            self._terminate()
+            self.start()
+            return True
+        return False
+
+    def cancel(self):
+        """진행 중인 작업을 즉시 중단 (워커 종료 후 새 워커를 미리 시작)"""
+        self.active_job = None
+        self._terminate()
+        self.start()
+
+    def shutdown(self):
+        """워커 종료 (프로그램 종료 시)"""
+        if self.is_alive and self.active_job is None:
+            try:
+                self.conn.send(("stop", None, None))
+                self.process.join(SHUTDOWN_TIMEOUT)
+            except (BrokenPipeError, OSError):
+                pass
+        self._terminate()
+
+    def _terminate(self):
+        if self.is_alive:
+            self.process.terminate()
+            self.process.join(SHUTDOWN_TIMEOUT)
+            if self.process.is_alive():
+                self.process.kill()
+                self.process.join()
+        self._discard()
+
+    def _discard(self):
+        if self.conn is not None:
+            self.conn.close()
+        self.conn = None
+        self.process = None
+        self.pid = None